@@ -0,0 +1,61 @@
+"""add search_gender vector partitions
+
+Revision ID: 2b9d7e4f6a81
+Revises: c5a1e8f3b260
+Create Date: 2026-10-17 16:42:10.381205
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2b9d7e4f6a81'
+down_revision: Union[str, Sequence[str], None] = 'c5a1e8f3b260'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# frozen copy of utils/gender.CANONICAL at the time of this revision
+CANONICAL = {
+    'men': 'male', 'man': 'male', 'male': 'male',
+    'women': 'female', 'woman': 'female', 'female': 'female',
+    'non-binary': 'non-binary', 'nonbinary': 'non-binary', 'nb': 'non-binary', 'other': 'non-binary',
+}
+PARTITIONS = ('male', 'female', 'non-binary')
+
+
+def _index_name(gender: str) -> str:
+    return f"idx_profiles_embedding_half_hnsw_{gender.replace('-', '_')}"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('profiles', sa.Column('search_gender', sa.String(length=16), nullable=True))
+
+    cases = " ".join(f"WHEN '{k}' THEN '{v}'" for k, v in CANONICAL.items())
+    op.execute(
+        f"UPDATE profiles p SET search_gender = "
+        f"CASE lower(trim(u.gender)) {cases} ELSE lower(trim(u.gender)) END "
+        f"FROM users u WHERE u.id = p.user_id AND u.gender IS NOT NULL"
+    )
+
+    for gender in PARTITIONS:
+        op.create_index(
+            _index_name(gender),
+            'profiles',
+            ['embedding_half'],
+            unique=False,
+            postgresql_using='hnsw',
+            postgresql_with={'m': 16, 'ef_construction': 64},
+            postgresql_ops={'embedding_half': 'halfvec_cosine_ops'},
+            postgresql_where=sa.text(f"search_gender = '{gender}'"),
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for gender in PARTITIONS:
+        op.drop_index(_index_name(gender), table_name='profiles')
+    op.drop_column('profiles', 'search_gender')
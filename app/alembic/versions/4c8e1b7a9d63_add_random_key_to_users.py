@@ -0,0 +1,34 @@
+"""add random_key to users
+
+Revision ID: 4c8e1b7a9d63
+Revises: e3a9f6c2d418
+Create Date: 2026-10-17 11:48:05.216947
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4c8e1b7a9d63'
+down_revision: Union[str, Sequence[str], None] = 'e3a9f6c2d418'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # volatile default → evaluated per existing row during the rewrite
+    op.add_column(
+        'users',
+        sa.Column('random_key', sa.Float(), server_default=sa.text('random()'), nullable=False)
+    )
+    op.create_index(op.f('ix_users_random_key'), 'users', ['random_key'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_users_random_key'), table_name='users')
+    op.drop_column('users', 'random_key')
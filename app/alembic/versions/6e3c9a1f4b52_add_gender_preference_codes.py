@@ -0,0 +1,52 @@
+"""add gender / preference codes to users
+
+Revision ID: 6e3c9a1f4b52
+Revises: 2b9d7e4f6a81
+Create Date: 2026-10-17 18:11:37.902614
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from utils.gender import gender_code, preference_mask
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6e3c9a1f4b52'
+down_revision: Union[str, Sequence[str], None] = '2b9d7e4f6a81'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('gender_code', sa.SmallInteger(), server_default='0', nullable=False))
+    op.add_column('users', sa.Column('preference_mask', sa.SmallInteger(), server_default='0', nullable=False))
+
+    # few distinct (gender, preference) pairs: encode each once, update in bulk
+    conn = op.get_bind()
+    pairs = conn.execute(sa.text(
+        "SELECT DISTINCT gender, preference FROM users "
+        "WHERE gender IS NOT NULL OR preference IS NOT NULL"
+    )).all()
+    for gender, preference in pairs:
+        conn.execute(
+            sa.text(
+                "UPDATE users SET gender_code = :code, preference_mask = :mask "
+                "WHERE gender IS NOT DISTINCT FROM :gender AND preference IS NOT DISTINCT FROM :preference"
+            ),
+            {
+                "code": gender_code(gender),
+                "mask": preference_mask(preference, gender),
+                "gender": gender,
+                "preference": preference,
+            },
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'preference_mask')
+    op.drop_column('users', 'gender_code')
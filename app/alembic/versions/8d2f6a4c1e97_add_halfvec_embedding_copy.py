@@ -0,0 +1,53 @@
+"""add halfvec embedding copy
+
+Revision ID: 8d2f6a4c1e97
+Revises: 4c8e1b7a9d63
+Create Date: 2026-10-17 13:21:37.904112
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from pgvector.sqlalchemy import HALFVEC
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d2f6a4c1e97'
+down_revision: Union[str, Sequence[str], None] = '4c8e1b7a9d63'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Rows are converted afterwards in batches: python -m services.embedding_backfill
+    op.add_column('profiles', sa.Column('embedding_half', HALFVEC(1536), nullable=True))
+
+    # ANN moves to the float16 copy (half the index size); the full-precision
+    # column is only read for re-ranking, so its HNSW index goes away
+    op.create_index(
+        'idx_profiles_embedding_half_hnsw',
+        'profiles',
+        ['embedding_half'],
+        unique=False,
+        postgresql_using='hnsw',
+        postgresql_with={'m': 16, 'ef_construction': 64},
+        postgresql_ops={'embedding_half': 'halfvec_cosine_ops'},
+    )
+    op.drop_index('idx_profiles_embedding_hnsw', table_name='profiles')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index(
+        'idx_profiles_embedding_hnsw',
+        'profiles',
+        ['embedding'],
+        unique=False,
+        postgresql_using='hnsw',
+        postgresql_with={'m': 16, 'ef_construction': 64},
+        postgresql_ops={'embedding': 'vector_cosine_ops'},
+    )
+    op.drop_index('idx_profiles_embedding_half_hnsw', table_name='profiles')
+    op.drop_column('profiles', 'embedding_half')
@@ -0,0 +1,32 @@
+"""add ai_usage speculation counters
+
+Revision ID: b3f8d1c6e927
+Revises: d7c2a9e4b815
+Create Date: 2026-10-17 23:12:40.528317
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3f8d1c6e927'
+down_revision: Union[str, Sequence[str], None] = 'd7c2a9e4b815'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('ai_usage', sa.Column('speculated_count', sa.Integer(), server_default='0', nullable=True))
+    op.add_column('ai_usage', sa.Column('speculation_hits', sa.Integer(), server_default='0', nullable=True))
+    op.create_index('idx_ai_usage_user_day', 'ai_usage', ['user_id', 'last_generated_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_ai_usage_user_day', table_name='ai_usage')
+    op.drop_column('ai_usage', 'speculation_hits')
+    op.drop_column('ai_usage', 'speculated_count')
@@ -0,0 +1,38 @@
+"""add hnsw index on profile embedding
+
+Revision ID: b7d41c9e2f05
+Revises: 321d9d699dea
+Create Date: 2026-10-17 10:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d41c9e2f05'
+down_revision: Union[str, Sequence[str], None] = '321d9d699dea'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # HNSW needs pgvector >= 0.5.0
+    op.execute("CREATE EXTENSION IF NOT EXISTS vector")
+    op.create_index(
+        'idx_profiles_embedding_hnsw',
+        'profiles',
+        ['embedding'],
+        unique=False,
+        postgresql_using='hnsw',
+        postgresql_with={'m': 16, 'ef_construction': 64},
+        postgresql_ops={'embedding': 'vector_cosine_ops'},
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_profiles_embedding_hnsw', table_name='profiles')
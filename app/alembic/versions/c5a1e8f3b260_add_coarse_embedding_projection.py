@@ -0,0 +1,40 @@
+"""add coarse embedding projection
+
+Revision ID: c5a1e8f3b260
+Revises: 8d2f6a4c1e97
+Create Date: 2026-10-17 14:05:52.618430
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from pgvector.sqlalchemy import HALFVEC
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5a1e8f3b260'
+down_revision: Union[str, Sequence[str], None] = '8d2f6a4c1e97'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Existing rows: python -m services.embedding_backfill coarse
+    op.add_column('profiles', sa.Column('embedding_coarse', HALFVEC(256), nullable=True))
+    op.create_index(
+        'idx_profiles_embedding_coarse_hnsw',
+        'profiles',
+        ['embedding_coarse'],
+        unique=False,
+        postgresql_using='hnsw',
+        postgresql_with={'m': 16, 'ef_construction': 64},
+        postgresql_ops={'embedding_coarse': 'halfvec_cosine_ops'},
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_profiles_embedding_coarse_hnsw', table_name='profiles')
+    op.drop_column('profiles', 'embedding_coarse')
@@ -0,0 +1,34 @@
+"""add profiles.embedding_model
+
+Revision ID: c8e2f4a7d913
+Revises: b3f8d1c6e927
+Create Date: 2026-10-18 00:41:05.217364
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c8e2f4a7d913'
+down_revision: Union[str, Sequence[str], None] = 'b3f8d1c6e927'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('profiles', sa.Column('embedding_model', sa.String(length=64), nullable=True))
+    # partial: only the (few) locally embedded rows waiting for a remote re-embed
+    op.create_index(
+        'idx_profiles_local_embedding', 'profiles', ['user_id'], unique=False,
+        postgresql_where=sa.text("embedding_model LIKE 'local-%'"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_profiles_local_embedding', table_name='profiles')
+    op.drop_column('profiles', 'embedding_model')
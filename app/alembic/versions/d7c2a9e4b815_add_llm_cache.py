@@ -0,0 +1,40 @@
+"""add llm_cache table
+
+Revision ID: d7c2a9e4b815
+Revises: a4d8e2f6c1b3
+Create Date: 2026-10-17 21:37:52.114803
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7c2a9e4b815'
+down_revision: Union[str, Sequence[str], None] = 'a4d8e2f6c1b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'llm_cache',
+        sa.Column('kind', sa.String(length=32), nullable=False),
+        sa.Column('user_a', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('user_b', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('version_a', sa.String(length=16), nullable=False),
+        sa.Column('version_b', sa.String(length=16), nullable=False),
+        sa.Column('prompt_version', sa.Integer(), nullable=False),
+        sa.Column('value', sa.Text(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('kind', 'user_a', 'user_b'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('llm_cache')
@@ -0,0 +1,53 @@
+"""add geohash cell to users
+
+Revision ID: e3a9f6c2d418
+Revises: b7d41c9e2f05
+Create Date: 2026-10-17 11:02:19.774031
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from utils.geohash import encode
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3a9f6c2d418'
+down_revision: Union[str, Sequence[str], None] = 'b7d41c9e2f05'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_BATCH = 1000
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # "C" collation so prefix range scans (cell <= geohash < cell || '~') use the btree
+    op.add_column('users', sa.Column('geohash', sa.String(length=12, collation='C'), nullable=True))
+    op.create_index(op.f('ix_users_geohash'), 'users', ['geohash'], unique=False)
+
+    # Backfill existing coordinates (keyset batches, never the whole table in memory)
+    bind = op.get_bind()
+    select = sa.text(
+        "SELECT id, latitude, longitude FROM users "
+        "WHERE latitude IS NOT NULL AND longitude IS NOT NULL AND id > :last_id "
+        "ORDER BY id LIMIT :batch"
+    )
+    update = sa.text("UPDATE users SET geohash = :geohash WHERE id = :id")
+    last_id = '00000000-0000-0000-0000-000000000000'
+    while True:
+        batch = bind.execute(select, {"last_id": last_id, "batch": BACKFILL_BATCH}).fetchall()
+        if not batch:
+            break
+        bind.execute(update, [
+            {"id": r.id, "geohash": encode(r.latitude, r.longitude)} for r in batch
+        ])
+        last_id = batch[-1].id
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_users_geohash'), table_name='users')
+    op.drop_column('users', 'geohash')
@@ -0,0 +1,222 @@
+# benchmarks/population.py
+
+
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import List
+import numpy as np
+from sqlalchemy import func, select, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.base import Base
+from models.user_model import User, UserMedia
+from models.profile_model import Profile
+from models.match_model import Match, Swipe
+from utils.geohash import encode as geohash_encode
+from services.embedding_index import coarse_projection
+from utils.gender import canonical_gender, gender_code, preference_mask
+
+
+EMBEDDING_DIM = 1536
+
+# (lat, lon, share of the population) — metro areas users cluster around
+CITIES = [
+    (40.7128, -74.0060, 0.18),   # New York
+    (34.0522, -118.2437, 0.12),  # Los Angeles
+    (41.8781, -87.6298, 0.08),   # Chicago
+    (51.5074, -0.1278, 0.12),    # London
+    (48.8566, 2.3522, 0.08),     # Paris
+    (52.5200, 13.4050, 0.06),    # Berlin
+    (19.0760, 72.8777, 0.10),    # Mumbai
+    (12.9716, 77.5946, 0.08),    # Bengaluru
+    (35.6762, 139.6503, 0.08),   # Tokyo
+    (-33.8688, 151.2093, 0.05),  # Sydney
+    (-23.5505, -46.6333, 0.05),  # São Paulo
+]
+CITY_SPREAD_DEG = 0.15           # ~15 km standard deviation around the centre
+
+GENDERS = ["male", "female", "non-binary"]
+GENDER_P = [0.48, 0.48, 0.04]
+PREFERENCES = ["women", "men", "everyone", "bi", "straight", "gay"]
+PREFERENCE_P = [0.40, 0.35, 0.10, 0.07, 0.05, 0.03]
+
+PERSONALITY_CLUSTERS = 32        # embeddings are noisy copies of a few archetypes
+SWIPES_PER_USER = 30             # Poisson mean
+LIKE_RATE = 0.4
+RECIPROCAL_LIKE_RATE = 0.3       # share of likes that are liked back (-> match)
+MAX_MEDIA_PER_USER = 6
+
+
+def _uuids(rng: np.random.Generator, n: int) -> List[uuid.UUID]:
+    raw = rng.integers(0, 256, size=(n, 16), dtype=np.uint8)
+    return [uuid.UUID(bytes=bytes(row), version=4) for row in raw]
+
+
+class PopulationGenerator:
+    """
+    Deterministic synthetic population for benchmarks (same seed, same data):
+    users clustered around metro areas, ages, genders, premium tiers,
+    1536-d embeddings, gallery media, swipe graph and the resulting matches.
+    """
+
+    def __init__(self, users: int, seed: int = 7, batch_size: int = 2000):
+        self.users = users
+        self.batch_size = batch_size
+        self.rng = np.random.default_rng(seed)
+
+        shares = np.array([c[2] for c in CITIES])
+        self.city = self.rng.choice(len(CITIES), size=users, p=shares / shares.sum())
+        self.ids = _uuids(self.rng, users)
+        self.archetypes = self.rng.standard_normal((PERSONALITY_CLUSTERS, EMBEDDING_DIM)).astype(np.float32)
+        self.genders = self.rng.choice(GENDERS, size=users, p=GENDER_P)
+
+        # per-city member lists, so swipes stay mostly local
+        order = np.argsort(self.city, kind="stable")
+        bounds = np.searchsorted(self.city[order], np.arange(len(CITIES) + 1))
+        self.city_members = [order[bounds[i]:bounds[i + 1]] for i in range(len(CITIES))]
+
+    # -------------------------------
+    # 🔹 Row builders
+    # -------------------------------
+    def _user_rows(self, idx: np.ndarray, now: datetime) -> list[dict]:
+        n = len(idx)
+        rng = self.rng
+        centres = np.array([CITIES[c][:2] for c in self.city[idx]])
+        lat = centres[:, 0] + rng.normal(0, CITY_SPREAD_DEG, n)
+        lon = centres[:, 1] + rng.normal(0, CITY_SPREAD_DEG, n)
+        ages = np.clip(rng.normal(29, 7, n), 18, 70).astype(int)
+        prefs = rng.choice(PREFERENCES, size=n, p=PREFERENCE_P)
+        idle_hours = rng.exponential(48, n)
+        tiers = rng.choice([0, 1, 2], size=n, p=[0.87, 0.10, 0.03])
+        hidden = rng.random(n) < 0.02
+
+        rows = []
+        for j, i in enumerate(idx):
+            uid = self.ids[i]
+            rows.append({
+                "id": uid,
+                "email": f"bench-{uid}@example.com",
+                "hashed_password": "!",
+                "full_name": f"Bench User {i}",
+                "age": int(ages[j]),
+                "gender": str(self.genders[i]),
+                "preference": str(prefs[j]),
+                "gender_code": gender_code(str(self.genders[i])),
+                "preference_mask": preference_mask(str(prefs[j]), str(self.genders[i])),
+                "bio": "Synthetic benchmark profile",
+                "latitude": float(lat[j]),
+                "longitude": float(lon[j]),
+                "geohash": geohash_encode(float(lat[j]), float(lon[j])),
+                "is_active": True,
+                "is_profile_hidden": bool(hidden[j]),
+                "last_active": now - timedelta(hours=float(idle_hours[j])),
+                "premium_tier": int(tiers[j]),
+                "token_version": 0,
+            })
+        return rows
+
+    def _profile_rows(self, idx: np.ndarray) -> list[dict]:
+        n = len(idx)
+        base = self.archetypes[self.rng.integers(0, PERSONALITY_CLUSTERS, n)]
+        vectors = base + 0.6 * self.rng.standard_normal((n, EMBEDDING_DIM)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        return [
+            {
+                "user_id": self.ids[i],
+                "raw_prompts": {"about": "benchmark"},
+                "ai_summary": "Synthetic benchmark profile",
+                "preferences": {"interests": [], "values": []},
+                "embedding": vectors[j].tolist(),
+                "embedding_half": vectors[j].tolist(),
+                "embedding_coarse": coarse_projection(vectors[j]).tolist(),
+                "search_gender": canonical_gender(str(self.genders[i])),
+            }
+            for j, i in enumerate(idx)
+        ]
+
+    def _media_rows(self, idx: np.ndarray) -> list[dict]:
+        counts = self.rng.integers(0, MAX_MEDIA_PER_USER + 1, len(idx))
+        return [
+            {
+                "id": uuid.uuid4(),
+                "user_id": self.ids[i],
+                "file_path": f"uploads/bench/{self.ids[i]}/{k}.jpg",
+                "media_type": "image",
+            }
+            for i, count in zip(idx, counts)
+            for k in range(count)
+        ]
+
+    def _swipe_rows(self, idx: np.ndarray, now: datetime) -> tuple[list[dict], list[dict]]:
+        rng = self.rng
+        swipes, matches = [], []
+        for i in idx:
+            members = self.city_members[self.city[i]]
+            n = min(rng.poisson(SWIPES_PER_USER), len(members) - 1)
+            if n <= 0:
+                continue
+            # mostly local, occasionally anywhere
+            targets = np.where(
+                rng.random(n) < 0.9,
+                members[rng.integers(0, len(members), n)],
+                rng.integers(0, self.users, n),
+            )
+            for t in np.unique(targets[targets != i]):
+                liked = bool(rng.random() < LIKE_RATE)
+                swipes.append({
+                    "id": uuid.uuid4(), "swiper_id": self.ids[i], "swiped_id": self.ids[t],
+                    "liked": liked, "undone": False,
+                })
+                if liked and rng.random() < RECIPROCAL_LIKE_RATE:
+                    swipes.append({
+                        "id": uuid.uuid4(), "swiper_id": self.ids[t], "swiped_id": self.ids[i],
+                        "liked": True, "undone": False,
+                    })
+                    score = float(rng.uniform(0.4, 0.95))
+                    for a, b in ((i, t), (t, i)):
+                        matches.append({
+                            "id": uuid.uuid4(), "user_id": self.ids[a], "target_id": self.ids[b],
+                            "score": score, "is_mutual": True, "is_active": True, "matched_at": now,
+                        })
+        return swipes, matches
+
+    # -------------------------------
+    # 🔹 Seeding
+    # -------------------------------
+    async def seed(self, db: AsyncSession):
+        """Insert users/profiles/media first, then the swipe + match graph."""
+        now = datetime.now(timezone.utc)
+
+        for start in range(0, self.users, self.batch_size):
+            idx = np.arange(start, min(start + self.batch_size, self.users))
+            await db.execute(insert(User), self._user_rows(idx, now))
+            await db.execute(insert(Profile), self._profile_rows(idx))
+            media = self._media_rows(idx)
+            if media:
+                await db.execute(insert(UserMedia), media)
+            await db.commit()
+            print(f"👥 users {idx[-1] + 1}/{self.users}")
+
+        for start in range(0, self.users, self.batch_size):
+            idx = np.arange(start, min(start + self.batch_size, self.users))
+            swipes, matches = self._swipe_rows(idx, now)
+            if swipes:
+                await db.execute(insert(Swipe).on_conflict_do_nothing(), swipes)
+            if matches:
+                await db.execute(insert(Match).on_conflict_do_nothing(), matches)
+            await db.commit()
+            print(f"💘 swipes {idx[-1] + 1}/{self.users}")
+
+        await db.execute(text("ANALYZE"))
+        await db.commit()
+
+
+async def prepare_schema(engine):
+    """pgvector + every table/index declared on the models (fresh bench DB only)."""
+    async with engine.begin() as conn:
+        await conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+        await conn.run_sync(Base.metadata.create_all)
+
+
+async def population_size(db: AsyncSession) -> int:
+    return await db.scalar(select(func.count()).select_from(User))
@@ -0,0 +1,256 @@
+# benchmarks/run.py
+#
+# Point DATABASE_URL_ASYNC at a throwaway Postgres + pgvector database, then
+# from app/:
+#
+#   python -m benchmarks.run seed --users 100000
+#   python -m benchmarks.run bench --iterations 50 --out benchmarks/results/100k.json
+#
+# Results are JSON so runs from different commits can be diffed.
+
+
+import argparse
+import asyncio
+import json
+import subprocess
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List
+import numpy as np
+import httpx
+from sqlalchemy import event, select, text
+from db.session import async_session, engine
+from models.user_model import User
+from models.profile_model import Profile
+from services import recommend_service
+from services.embedding_index import embedding_index
+from services.exclusion_index import exclusion_index
+from services.discovery_feed import discovery_feed
+from utils.security import create_access_token
+from utils.config import settings
+from benchmarks.population import PopulationGenerator, prepare_schema, population_size
+
+
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+
+ModeCall = Callable[..., Awaitable[list]]
+
+# every mode in services/recommend_service.py, with representative params
+MODES: Dict[str, ModeCall] = {
+    "default": lambda db, u, limit: recommend_service.get_default_recommendations(db, u, limit=limit),
+    "proximity": lambda db, u, limit: recommend_service.get_proximity_first(db, u, radius_km=25.0, limit=limit),
+    "compatibility": lambda db, u, limit: recommend_service.get_compatibility_first_recommendations(db, u, limit=limit),
+    "fresh": lambda db, u, limit: recommend_service.get_fresh_faces_recommendations(db, u, limit=limit),
+    "boosted": lambda db, u, limit: recommend_service.get_boosted_tier_recommendations(db, u, limit=limit),
+    "filtered": lambda db, u, limit: recommend_service.get_age_filtered_recommendations(
+        db, u, limit=limit, min_age=24, max_age=35, gender=["women"]
+    ),
+}
+ENDPOINT = "/api/v1/matches/recommendations"
+
+
+# -------------------------------
+# 🔹 Instrumentation
+# -------------------------------
+class QueryCounter:
+    """Counts statements sent through the app's engine."""
+
+    def __init__(self):
+        self.count = 0
+        event.listen(engine.sync_engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args, **kwargs):
+        self.count += 1
+
+
+async def rows_scanned() -> int:
+    """Tuples read by seq + index scans across user tables (pg_stat, server-wide)."""
+    async with async_session() as db:
+        try:
+            await db.execute(text("SELECT pg_stat_force_next_flush()"))   # PG15+
+        except Exception:
+            await db.rollback()
+        await db.execute(text("SELECT pg_stat_clear_snapshot()"))
+        total = await db.scalar(text(
+            "SELECT COALESCE(SUM(seq_tup_read + COALESCE(idx_tup_fetch, 0)), 0) "
+            "FROM pg_stat_user_tables"
+        ))
+    return int(total)
+
+
+def summarize(latencies_ms: List[float], queries: int, scanned: int, errors: int) -> dict:
+    calls = max(1, len(latencies_ms))
+    lat = np.array(latencies_ms) if latencies_ms else np.array([np.nan])
+    return {
+        "iterations": len(latencies_ms),
+        "errors": errors,
+        "p50_ms": round(float(np.percentile(lat, 50)), 2),
+        "p95_ms": round(float(np.percentile(lat, 95)), 2),
+        "p99_ms": round(float(np.percentile(lat, 99)), 2),
+        "mean_ms": round(float(np.mean(lat)), 2),
+        "queries_per_call": round(queries / calls, 2),
+        "rows_scanned_per_call": round(scanned / calls, 1),
+    }
+
+
+# -------------------------------
+# 🔹 Runners
+# -------------------------------
+async def pick_viewers(n: int) -> List[User]:
+    """Random visible users that have an embedding and a location."""
+    async with async_session() as db:
+        return (await db.execute(
+            select(User)
+            .join(Profile, Profile.user_id == User.id)
+            .where(
+                User.is_active.is_(True),
+                User.is_profile_hidden.is_(False),
+                User.latitude.isnot(None),
+                Profile.embedding.isnot(None),
+            )
+            .order_by(User.random_key)
+            .limit(n)
+        )).scalars().all()
+
+
+async def bench_mode(call: ModeCall, viewers: List[User], limit: int, counter: QueryCounter) -> dict:
+    latencies, errors = [], 0
+    queries_before, scanned_before = counter.count, await rows_scanned()
+
+    for user in viewers:
+        exclusion_index._sets.clear()   # cold per-user state, like a first deck of the day
+        async with async_session() as db:
+            start = time.perf_counter()
+            try:
+                await call(db, user, limit)
+            except Exception as e:
+                errors += 1
+                print(f"⚠️ {e}")
+                continue
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    queries = counter.count - queries_before
+    await asyncio.sleep(1.1)   # let backends flush their pg_stat counters
+    scanned = await rows_scanned() - scanned_before
+    return summarize(latencies, queries, scanned, errors)
+
+
+async def bench_endpoint(viewers: List[User], limit: int, counter: QueryCounter) -> dict:
+    from main import app   # deferred: importing main wires every router
+
+    latencies, errors = [], 0
+    queries_before, scanned_before = counter.count, await rows_scanned()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for user in viewers:
+            exclusion_index._sets.clear()
+            discovery_feed.invalidate_owner(user.id)
+            token = create_access_token(data={"user_id": str(user.id)})
+            start = time.perf_counter()
+            res = await client.get(
+                ENDPOINT, params={"limit": limit}, headers={"Authorization": f"Bearer {token}"}
+            )
+            elapsed = (time.perf_counter() - start) * 1000
+            if res.status_code != 200:
+                errors += 1
+                print(f"⚠️ {ENDPOINT} -> {res.status_code}: {res.text[:200]}")
+                continue
+            latencies.append(elapsed)
+
+    queries = counter.count - queries_before
+    await asyncio.sleep(1.1)
+    scanned = await rows_scanned() - scanned_before
+    return summarize(latencies, queries, scanned, errors)
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+async def bench(args):
+    async with async_session() as db:
+        population = await population_size(db)
+    if not population:
+        raise SystemExit("Empty database: run `python -m benchmarks.run seed` first.")
+
+    if args.no_index:
+        embedding_index.ready = False
+    else:
+        await embedding_index.load(async_session)
+
+    viewers = await pick_viewers(args.iterations + args.warmup)
+    warmup, viewers = viewers[:args.warmup], viewers[args.warmup:]
+    counter = QueryCounter()
+    modes = args.modes or list(MODES) + ["endpoint"]
+
+    results = {}
+    for name in modes:
+        if name == "endpoint":
+            await bench_endpoint(warmup, args.limit, counter)
+            name = ENDPOINT
+            results[name] = await bench_endpoint(viewers, args.limit, counter)
+        else:
+            await bench_mode(MODES[name], warmup, args.limit, counter)
+            results[name] = await bench_mode(MODES[name], viewers, args.limit, counter)
+        r = results[name]
+        print(f"⏱️ {name:<14} p50={r['p50_ms']}ms p95={r['p95_ms']}ms p99={r['p99_ms']}ms "
+              f"queries={r['queries_per_call']} rows={r['rows_scanned_per_call']}")
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "population": population,
+        "limit": args.limit,
+        "embedding_index": not args.no_index,
+        "settings": {
+            "VECTOR_HNSW_EF_SEARCH": settings.VECTOR_HNSW_EF_SEARCH,
+            "EMBEDDING_INDEX_DTYPE": settings.EMBEDDING_INDEX_DTYPE,
+        },
+        "results": results,
+    }
+    out = Path(args.out or f"benchmarks/results/{report['commit']}-{population}.json")
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2))
+    print(f"✅ Results written to {out}")
+
+
+async def seed(args):
+    users = SIZES.get(str(args.users).lower()) or int(args.users)
+    await prepare_schema(engine)
+    async with async_session() as db:
+        existing = await population_size(db)
+        if existing and not args.force:
+            raise SystemExit(f"Database already has {existing} users (use --force to add more).")
+        await PopulationGenerator(users, seed=args.seed, batch_size=args.batch_size).seed(db)
+    print(f"✅ Seeded {users} users")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recommendation benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_seed = sub.add_parser("seed", help="generate a synthetic population")
+    p_seed.add_argument("--users", default="10k", help="10k / 100k / 1m or an exact count")
+    p_seed.add_argument("--seed", type=int, default=7)
+    p_seed.add_argument("--batch-size", type=int, default=2000)
+    p_seed.add_argument("--force", action="store_true")
+
+    p_bench = sub.add_parser("bench", help="time every recommendation mode")
+    p_bench.add_argument("--iterations", type=int, default=50)
+    p_bench.add_argument("--warmup", type=int, default=3)
+    p_bench.add_argument("--limit", type=int, default=20)
+    p_bench.add_argument("--modes", nargs="*", choices=list(MODES) + ["endpoint"])
+    p_bench.add_argument("--no-index", action="store_true", help="bench the SQL-only path")
+    p_bench.add_argument("--out")
+
+    args = parser.parse_args()
+    asyncio.run(seed(args) if args.command == "seed" else bench(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,7 @@
 # aureole/app/main.py
 import os
 import mimetypes, os
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
@@ -24,6 +24,14 @@ from routers.insights_router import router as insight_router
 from routers.media_router import router as media_router
 from routers.rtc_router import router as rtc_router
 from web.signal.router import router as call_router
+from db.session import async_session
+from services.embedding_index import embedding_index
+from services.discovery_feed import discovery_feed
+from services.embedding_cache import start_cache_pruner
+from services.job_queue import job_queue
+from services.ai_gateway import ai_gateway
+from services.ai_scheduler import ai_scheduler
+from services.ai_metrics import ai_metrics
 
 
 
@@ -75,9 +83,41 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],   # deck paging cursor (routers/match_router.py)
 )
 
 
+@app.on_event("startup")
+async def warm_embedding_index():
+    # Non-blocking: recommendation modes use SQL until the matrix is ready
+    if settings.EMBEDDING_INDEX_ENABLED:
+        embedding_index.start_background_load(async_session)
+
+
+@app.on_event("startup")
+async def start_feed_scheduler():
+    # Activity-tiered rebuilds of precomputed discovery decks
+    discovery_feed.start_scheduler(async_session)
+
+
+@app.on_event("startup")
+async def start_embedding_cache_pruner():
+    # TTL + LRU eviction for the embedding_cache table
+    start_cache_pruner(async_session)
+
+
+@app.on_event("startup")
+async def start_ai_job_workers():
+    # Durable AI profile processing (ai_jobs table, SKIP LOCKED workers)
+    job_queue.start(async_session)
+
+
+@app.on_event("shutdown")
+async def close_ai_gateway():
+    # Drain the pooled AI connections
+    await ai_gateway.aclose()
+
+
 @app.get("/health")
 async def health_check():
     return {
@@ -86,6 +126,23 @@ async def health_check():
         "environment": "local"
     }
 
+
+@app.get("/metrics/ai")
+async def ai_call_metrics(format: str = "json"):
+    # Per call site latency histograms, outcomes, tokens, cost, cache hits / fallbacks
+    if format == "prometheus":
+        return PlainTextResponse(ai_metrics.prometheus(), media_type="text/plain; version=0.0.4")
+    return ai_metrics.snapshot()
+
+
+@app.get("/health/ai")
+async def ai_health():
+    # Scheduler queue depth / wait times and the provider circuit state
+    return {
+        "circuit": ai_gateway.breaker.state,
+        "scheduler": ai_scheduler.stats(),
+    }
+
 # You'll add routers here later, e.g.:
 
 # -------------------------
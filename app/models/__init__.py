@@ -1,9 +1,10 @@
 from .base import Base
 
 from .user_model import User, VerificationAttempt, Notification
-from .profile_model import Profile
+from .profile_model import Profile, EmbeddingCache, LLMCacheEntry
 from .match_model import Match, Swipe
 from .message_model import Message
 from .block_model import UserBlock
 from .report_model import Report
 from .subscription_model import Subscription
+from .job_model import AIJob
@@ -0,0 +1,42 @@
+# models/job_model.py
+
+# Durable background jobs (services/job_queue.py)
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, JSON, String, Text, text
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+from sqlalchemy.sql import func
+from .base import Base
+import uuid
+
+
+class AIJob(Base):
+    __tablename__ = "ai_jobs"
+
+    id = Column(PG_UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    kind = Column(String(32), nullable=False)                  # e.g. "profile_ai"
+    user_id = Column(PG_UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    payload = Column(JSON, nullable=True)
+    status = Column(String(16), nullable=False, default="queued")  # queued / running / done / failed
+    attempts = Column(Integer, nullable=False, default=0)
+    run_after = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    locked_at = Column(DateTime(timezone=True), nullable=True)
+    last_error = Column(Text, nullable=True)
+    result = Column(JSON, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        # what workers poll: due, queued jobs in order
+        Index(
+            "idx_ai_jobs_due",
+            "run_after",
+            postgresql_where=text("status = 'queued'"),
+        ),
+        # idempotency: at most one queued job per (kind, user)
+        Index(
+            "uq_ai_jobs_queued_per_user",
+            "kind",
+            "user_id",
+            unique=True,
+            postgresql_where=text("status = 'queued'"),
+        ),
+    )
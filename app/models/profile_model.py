@@ -1,13 +1,15 @@
 # models/profile_model.py
 
 # AI-generated profile understanding
-from sqlalchemy import Column, Text, JSON, ForeignKey,Integer
-from pgvector.sqlalchemy import VECTOR # type: ignore 
+from sqlalchemy import Column, Text, JSON, ForeignKey,Integer, Index, String, text
+from pgvector.sqlalchemy import VECTOR, HALFVEC # type: ignore 
 from sqlalchemy.dialects.postgresql import UUID as PG_UUID
 from .base import Base
 import uuid
 from sqlalchemy import DateTime
 from sqlalchemy.sql import func
+from sqlalchemy.orm import deferred
+from utils.gender import PARTITION_GENDERS
 
 
 class Profile(Base):
@@ -18,9 +20,82 @@ class Profile(Base):
     ai_summary = Column(Text, nullable=True)         # Natural language summary by OpenAI
     mini_traits = Column(JSON, nullable=True)
     preferences = Column(JSON, nullable=True)        # Structured: {"interests": [...], "values": [...], "dealbreakers": [...]}
-    embedding = Column(VECTOR(1536), nullable=True)  # OpenAI text-embedding-3-small
+    # OpenAI text-embedding-3-small; deferred (~6 KB/row): undefer() where full precision is read
+    embedding = deferred(Column(VECTOR(1536), nullable=True))
+    # float16 copy used for ANN retrieval (half the size); full precision is kept for re-ranking
+    embedding_half = deferred(Column(HALFVEC(1536), nullable=True))
+    # 256-d prefix projection for two-stage retrieval (services/embedding_index.coarse_projection)
+    embedding_coarse = deferred(Column(HALFVEC(256), nullable=True))
+    # canonical users.gender (utils/gender.py), keys the per-gender partial ANN indexes
+    search_gender = Column(String(16), nullable=True)
+    # hash of the raw_prompts the current ai_summary was generated from (services/embedding_cache.py)
+    prompts_hash = Column(String(64), nullable=True)
+    embedding_model = Column(String(64), nullable=True)   # which model's space `embedding` is in
     last_edited_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=True)
 
+    __table_args__ = (
+        # ANN index for cosine top-K (see services/vector_search.py)
+        Index(
+            "idx_profiles_embedding_half_hnsw",
+            "embedding_half",
+            postgresql_using="hnsw",
+            postgresql_with={"m": 16, "ef_construction": 64},
+            postgresql_ops={"embedding_half": "halfvec_cosine_ops"},
+        ),
+        Index(
+            "idx_profiles_embedding_coarse_hnsw",
+            "embedding_coarse",
+            postgresql_using="hnsw",
+            postgresql_with={"m": 16, "ef_construction": 64},
+            postgresql_ops={"embedding_coarse": "halfvec_cosine_ops"},
+        ),
+        *(
+            Index(
+                f"idx_profiles_embedding_half_hnsw_{g.replace('-', '_')}",
+                "embedding_half",
+                postgresql_using="hnsw",
+                postgresql_with={"m": 16, "ef_construction": 64},
+                postgresql_ops={"embedding_half": "halfvec_cosine_ops"},
+                postgresql_where=text(f"search_gender = '{g}'"),
+            )
+            for g in PARTITION_GENDERS
+        ),
+        # locally embedded rows waiting for `embedding_backfill reembed-local`
+        Index(
+            "idx_profiles_local_embedding",
+            "user_id",
+            postgresql_where=text("embedding_model LIKE 'local-%'"),
+        ),
+    )
+
+
+class EmbeddingCache(Base):
+    """Embedding per (sha256 of the exact input text, model); LRU/TTL pruned."""
+    __tablename__ = "embedding_cache"
+
+    text_hash = Column(String(64), primary_key=True)
+    model = Column(String(64), primary_key=True)
+    embedding = Column(VECTOR(1536), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_used_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+
+class LLMCacheEntry(Base):
+    """
+    Last LLM answer per (kind, user_a, user_b) with the profile versions and
+    prompt version it was generated from (services/llm_cache.py).
+    """
+    __tablename__ = "llm_cache"
+
+    kind = Column(String(32), primary_key=True)      # "compatibility_reason" / "conversation_starter"
+    user_a = Column(PG_UUID(as_uuid=True), primary_key=True)
+    user_b = Column(PG_UUID(as_uuid=True), primary_key=True)
+    version_a = Column(String(16), nullable=False)
+    version_b = Column(String(16), nullable=False)
+    prompt_version = Column(Integer, nullable=False)
+    value = Column(Text, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
+
 
 class AIUsage(Base):
     __tablename__ = "ai_usage"
@@ -28,4 +103,10 @@ class AIUsage(Base):
     id = Column(PG_UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id = Column(PG_UUID(as_uuid=True), nullable=False)
     ai_generated_count = Column(Integer, default=0)   # count for the day
-    last_generated_at = Column(DateTime(timezone=True), server_default=func.now())
\ No newline at end of file
+    last_generated_at = Column(DateTime(timezone=True), server_default=func.now())
+    speculated_count = Column(Integer, default=0, server_default="0")   # background pre-generations
+    speculation_hits = Column(Integer, default=0, server_default="0")   # ...that were actually requested
+
+    __table_args__ = (
+        Index("idx_ai_usage_user_day", "user_id", "last_generated_at"),
+    )
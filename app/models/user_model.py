@@ -4,11 +4,13 @@
 from sqlalchemy import (
     ForeignKey, Column, String, 
     Boolean, Integer, Float, 
-    DateTime, Text, JSON, Index
+    DateTime, Text, JSON, Index, SmallInteger
     )
 from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+from sqlalchemy.orm import validates
 from sqlalchemy.sql import func
 import uuid
+from utils.gender import gender_code, preference_mask
 from .base import Base
 
 class User(Base):
@@ -29,9 +31,14 @@ class User(Base):
     preference = Column(String, nullable=True)      # e.g., straight, gay, bi, custom
     relationship_status = Column(String, nullable=True)  # e.g., single, dating, custom
 
+    # Encoded on write (utils/gender.py) so batch scoring never parses text
+    gender_code = Column(SmallInteger, default=0, server_default="0", nullable=False)
+    preference_mask = Column(SmallInteger, default=0, server_default="0", nullable=False)
+
     # Location
     latitude = Column(Float, nullable=True)
     longitude = Column(Float, nullable=True)
+    geohash = Column(String(12, collation="C"), nullable=True, index=True)  # utils/geohash.py, kept in sync with lat/lon
 
     # Verification & Safety
     is_verified = Column(Boolean, default=False)
@@ -47,6 +54,7 @@ class User(Base):
     is_active = Column(Boolean, default=True)
     is_profile_hidden = Column(Boolean, default=False)
     last_active = Column(DateTime(timezone=True), server_default=func.now())
+    random_key = Column(Float, server_default=func.random(), nullable=False, index=True)  # services/sampling.py
     token_version = Column(Integer, default=0, nullable=False)
 
 
@@ -54,6 +62,17 @@ class User(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+    @validates("gender")
+    def _encode_gender(self, key, value):
+        self.gender_code = gender_code(value)
+        self.preference_mask = preference_mask(self.preference, value)
+        return value
+
+    @validates("preference")
+    def _encode_preference(self, key, value):
+        self.preference_mask = preference_mask(value, self.gender)
+        return value
+
 
 
 class UserMedia(Base):
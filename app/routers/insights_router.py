@@ -3,13 +3,14 @@
 
 from fastapi import APIRouter, Depends, HTTPException, Query
 from typing import List, Optional
-from sqlalchemy import select, func
+from sqlalchemy import select
+from sqlalchemy.orm import undefer
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from services.insights_service import (
     generate_compatibility_reason,
     generate_conversation_starter,
-    build_enriched_match_item
+    build_enriched_feed
 )
 from models.user_model import User
 from utils.deps import get_db, get_current_user  # adapt to your dependency names
@@ -50,57 +51,17 @@ async def my_enriched_matches(
     current_user=Depends(get_current_user)
 ):
     # 1) ensure current user's embedding exists
-    profile = await db.scalar(select(Profile).where(Profile.user_id == current_user.id))
+    profile = await db.scalar(
+        select(Profile).where(Profile.user_id == current_user.id).options(undefer(Profile.embedding))
+    )
     if profile is None or profile.embedding is None:
         raise HTTPException(status_code=400, detail="Complete profile to get recommendations.")
 
-    # 2) fetch candidates (sample simple query; reuse your own selection if present)
-    candidates_stmt = (
-        select(User.id, User.full_name, User.age, User.latitude, User.longitude)
-        .join(Profile, Profile.user_id == User.id)
-        .where(
-            User.id != current_user.id,
-            User.is_profile_hidden.is_(False),
-            User.age >= min_age,
-            User.age <= max_age,
-            Profile.embedding.isnot(None)
-        )
-        .order_by(func.random())
-        .limit(limit * 3)  # fetch extra to allow filtering
+    # 2) candidates, batched loads, concurrent LLM enrichment under a deadline
+    return await build_enriched_feed(
+        db, current_user, profile,
+        limit=limit, min_age=min_age, max_age=max_age, max_distance_km=max_distance_km,
     )
-    res = await db.execute(candidates_stmt)
-    rows = res.all()
-
-    results = []
-    for r in rows:
-        # compute embedding similarity quickly using Postgres vector op if available
-        try:
-            sim_stmt = select( (1 - (Profile.embedding.l2_distance(profile.embedding))).label("similarity") ).where(Profile.user_id == r.id)
-            sim_row = await db.execute(sim_stmt)
-            similarity = sim_row.scalar_one_or_none() or 0.0
-        except Exception:
-            similarity = 0.0
-
-        # distance calc (simple haversine if coordinates exist)
-        distance_km = None
-        if all([current_user.latitude, current_user.longitude, r.latitude, r.longitude]):
-            # simple haversine import if you have; otherwise compute manually here
-            from utils.location import haversine_distance
-            distance_km = haversine_distance(current_user.latitude, current_user.longitude, r.latitude, r.longitude)
-
-        # skip if far
-        if distance_km is not None and distance_km > max_distance_km:
-            continue
-
-        enriched = await build_enriched_match_item(db, str(current_user.id), r, embedding_similarity=similarity, distance_km=distance_km)
-        if enriched:
-            results.append(enriched)
-        if len(results) >= limit:
-            break
-
-    # sort by internal heuristic: online first then by presence of compatibility text
-    results.sort(key=lambda x: (not x["is_online"], 0 if x["compatibility_reason"] else 1))
-    return results
 
 
 @router.get("/enriched")
@@ -16,6 +16,7 @@ from services.notification_service import (
 from services.match_service import(
     record_view,record_like,get_user_matches
 )
+from services.exclusion_index import exclusion_index
 from db.session import get_db
 from utils.deps import get_current_user  # adjust import if needed
 
@@ -189,6 +190,7 @@ async def reject_swipe(
         delete(Swipe).where(Swipe.swiper_id == swiper_id_str, Swipe.swiped_id == recipient_id)
     )
     await db.commit()
+    exclusion_index.invalidate(swiper_id_str)
 
     # Also delete the stored swipe_request notification (so it won't be replayed)
     await db.execute(
@@ -273,6 +275,10 @@ async def unblock_user(
 
     await db.commit()
 
+    # block lifted, match restored: recompute both exclusion sets
+    exclusion_index.invalidate(current_user.id)
+    exclusion_index.invalidate(blocked_id)
+
     return {
         "status": "unblocked_and_matched_restored",
         "unblocked_user": str(blocked_id)
@@ -8,9 +8,11 @@ from models.message_model import Message, ChatMedia
 from moderation import schedule_post_moderation
 from services.ai_service import (
     generate_ai_replies_service,
+    stream_ai_replies_service,
     send_ai_reply_service,
     send_user_message_service,
 )
+from services.reply_speculation import reply_speculator
 from utils.socket_manager import manager
 from utils.ws_safe import safe_payload
 from db.session import async_session
@@ -79,6 +81,8 @@ async def websocket_chat(websocket: WebSocket, user_id: str):
                     if sent:
                         msg.is_delivered = True
                         delivered_count += 1
+                        if msg.message_type.value == "text":
+                            reply_speculator.speculate(msg.receiver_id, msg.id, msg.content)
 
                         await manager.send_personal_message(str(msg.sender_id), {
                             "type": "delivery_receipt",
@@ -200,6 +204,9 @@ async def websocket_chat(websocket: WebSocket, user_id: str):
                             "message_id": str(new_msg.id),
                         })
 
+                        if message_type == "text" and content:
+                            reply_speculator.speculate(receiver_id, new_msg.id, content)
+
                     else:
                         print(f"📭 Receiver {receiver_id} offline → queued")
 
@@ -239,8 +246,28 @@ async def websocket_chat(websocket: WebSocket, user_id: str):
                             })
                             continue
 
-                        ai_response = await generate_ai_replies_service(
-                            db, user_id, msg.id, tone)
+                        async def push_partial(index: int, reply: str):
+                            await websocket.send_json({
+                                "type": "ai_suggestion_partial",
+                                "original_message_id": original_msg_id,
+                                "index": index,
+                                "reply": reply,
+                            })
+
+                        # pre-generated on delivery (premium)
+                        ai_response = await reply_speculator.serve(db, user_id, msg.id, tone)
+
+                        if ai_response is not None:
+                            if data.get("stream"):
+                                for index, reply in enumerate(ai_response["replies"]):
+                                    await push_partial(index, reply)
+                        elif data.get("stream"):
+                            # opt-in: each reply is pushed as soon as it's generated
+                            ai_response = await stream_ai_replies_service(
+                                db, user_id, msg.id, tone, push_partial)
+                        else:
+                            ai_response = await generate_ai_replies_service(
+                                db, user_id, msg.id, tone)
 
                         await websocket.send_json({
                             "type": "ai_suggestions",
@@ -13,6 +13,7 @@ from models.profile_model import Profile
 from schemas.profile_schema import UserProfileOut, ProfileUpdate, MediaOut
 from utils.deps import get_current_user
 from db.session import get_db
+from services.vector_search import sync_search_partition
 
 router = APIRouter(prefix="/getprofile", tags=["Get Profile"])
 
@@ -90,13 +91,17 @@ async def update_profile(
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    for field, value in payload.dict(exclude_unset=True).items():
+    changes = payload.dict(exclude_unset=True)
+    for field, value in changes.items():
         setattr(user, field, value)
 
     db.add(user)
     await db.commit()
     await db.refresh(user)
 
+    if changes.keys() & {"gender", "age"}:
+        await sync_search_partition(db, user)
+
     return {"msg": "Profile updated and AI reprocessed successfully"}
 
 
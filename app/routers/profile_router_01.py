@@ -14,7 +14,10 @@ from models.profile_model import Profile
 from models.user_model import User
 from utils.deps import get_current_user
 from datetime import datetime, timedelta, timezone
-from services.ai_service import run_ai_profile_process
+from services.job_queue import job_queue, job_status
+from services.embedding_index import embedding_index
+from services.discovery_feed import discovery_feed
+from services.vector_search import sync_search_partition
 from uuid import UUID
 
 router = APIRouter(prefix="/profile", tags=["Profile Setup"])
@@ -91,13 +94,12 @@ async def setup_profile(
     # --- Commit both user and profile ---
     await db.commit()
 
-    # --- Trigger AI summarization ---
-    ai_result = await run_ai_profile_process(db, current_user)
+    # --- Queue AI summarization (WS notification when done) ---
+    job_id = await job_queue.enqueue(db, "profile_ai", current_user.id)
 
     return {
-        "msg": "Profile setup complete and AI summary generated",
-        "summary": ai_result["summary"],
-        "preferences": ai_result["preferences"],
+        "msg": "Profile setup complete. AI summary is being generated.",
+        "job_id": str(job_id),
     }
 
 
@@ -137,8 +139,8 @@ async def edit_profile(
         if field in editable_user_fields:
             setattr(current_user, field, value)
 
-    # --- Update profile details ---
-    raw_prompts = profile.raw_prompts or {}
+    # --- Update profile details (new dict, so the JSON column is flagged dirty) ---
+    raw_prompts = dict(profile.raw_prompts or {})
     for field, value in updates.items():
         if field in editable_profile_fields:
             raw_prompts[field] = value
@@ -149,14 +151,16 @@ async def edit_profile(
 
     await db.commit()
 
-    # --- Run AI reprocess only if edit was successful ---
-    try:
-        await run_ai_profile_process(db=db, current_user=current_user)
-    except Exception as e:
-        # Non-fatal — don’t block the edit
-        print(f"[AI REPROCESS WARNING] Failed to regenerate summary: {e}")
+    if updates.keys() & {"gender", "age"}:
+        await sync_search_partition(db, current_user)
 
-    return {"msg": "Profile updated and AI reprocessed successfully"}
+    # --- Decks ranked with the old profile are stale ---
+    discovery_feed.invalidate_user(current_user.id)
+
+    # --- Queue AI reprocess (non-blocking) ---
+    job_id = await job_queue.enqueue(db, "profile_ai", current_user.id)
+
+    return {"msg": "Profile updated. AI reprocessing queued.", "job_id": str(job_id)}
 
 
 
@@ -197,13 +201,15 @@ async def delete_profile_field(
         for attr in user_fields:
             setattr(current_user, attr, None)
         await db.commit()
+        embedding_index.remove(current_user.id)
+        discovery_feed.invalidate_user(current_user.id)
         return {"msg": "Profile and user details cleared"}
 
     # --- Handle field-specific deletion ---
     if field in user_fields:
         setattr(current_user, field, None)
     elif field in profile_fields:
-        raw_prompts = profile.raw_prompts or {}
+        raw_prompts = dict(profile.raw_prompts or {})
         raw_prompts.pop(field, None)
         profile.raw_prompts = raw_prompts
     else:
@@ -213,11 +219,24 @@ async def delete_profile_field(
     profile.last_edited_at = datetime.now(timezone.utc)
     await db.commit()
 
-    # --- 🔥 Trigger AI reprocess (after delete) ---
-    try:
-        await run_ai_profile_process(db, current_user)
-    except Exception as e:
-        # Log, don’t block
-        print(f"[AI REPROCESS WARNING] Failed after delete: {e}")
+    if field in ("gender", "age"):
+        await sync_search_partition(db, current_user)
+
+    discovery_feed.invalidate_user(current_user.id)
+
+    # --- 🔥 Queue AI reprocess (after delete) ---
+    job_id = await job_queue.enqueue(db, "profile_ai", current_user.id)
+
+    return {"msg": f"{field} removed. AI summary update queued.", "job_id": str(job_id)}
 
-    return {"msg": f"{field} removed and AI summary updated"}
\ No newline at end of file
+
+@router.get("/jobs/{job_id}")
+async def get_profile_job(
+    job_id: UUID,
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    job = await job_queue.get(db, job_id, current_user.id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_status(job)
\ No newline at end of file
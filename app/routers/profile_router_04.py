@@ -11,6 +11,8 @@ from sqlalchemy import select
 from db.session import get_db
 from models.user_model import User
 from utils.deps import get_current_user
+from utils.geohash import encode as geohash_encode
+from services.discovery_feed import discovery_feed
 
 router = APIRouter(prefix="/profile", tags=["Profile Location"])
 
@@ -38,14 +40,18 @@ async def update_location(
     if payload.share_location is False:
         user.latitude = None
         user.longitude = None
+        user.geohash = None
         await db.commit()
+        discovery_feed.invalidate_user(user_id)
         return {"msg": "Location sharing disabled"}
 
     # --- Update if coords provided ---
     if payload.latitude is not None and payload.longitude is not None:
         user.latitude = payload.latitude
         user.longitude = payload.longitude
+        user.geohash = geohash_encode(payload.latitude, payload.longitude)
         await db.commit()
+        discovery_feed.invalidate_user(user_id)
         return {
             "msg": "Location updated successfully",
             "latitude": user.latitude,
@@ -1,11 +1,11 @@
 # schemas/match_schema.py
 
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional
 
 class MatchFilters(BaseModel):
-    max_distance_km: float = 50.0
+    max_distance_km: float = Field(50.0, gt=0)   # proximity_score divides by it
     min_age: int = 18
     max_age: int = 100
     limit: int = 20
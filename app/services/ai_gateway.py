@@ -0,0 +1,256 @@
+# services/ai_gateway.py
+
+
+import asyncio
+import random
+import time
+from typing import Awaitable, Callable, Optional
+import httpx
+from openai import (
+    AsyncOpenAI, APIConnectionError, APIStatusError, RateLimitError, InternalServerError
+)
+from utils.config import settings
+from services.ai_scheduler import ai_scheduler
+from services.ai_metrics import ai_metrics
+
+
+STUB_BASE_URL = "stub"   # AI_BASE_URL value that routes to the in-process stub (services/ai_stub_server.py)
+
+
+class AIUnavailable(RuntimeError):
+    """Raised without touching the network while the circuit is open."""
+
+
+def is_transient(e: Exception) -> bool:
+    """Timeouts, connection drops, 429 and 5xx: worth a retry and counted by the breaker."""
+    if isinstance(e, (APIConnectionError, RateLimitError, InternalServerError, asyncio.TimeoutError)):
+        return True
+    return isinstance(e, APIStatusError) and e.status_code >= 500
+
+
+class CircuitBreaker:
+    """
+    closed -> (failure_threshold consecutive transient failures) -> open
+    open   -> (reset_timeout elapsed) -> half-open: one trial call
+    trial succeeds -> closed, trial fails -> open again
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half-open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self._trial_in_flight or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+        self._trial_in_flight = False
+
+    def abandon(self):
+        """The call was cancelled before an outcome: no verdict, the next call may be the trial."""
+        self._trial_in_flight = False
+
+
+class AIGateway:
+    """
+    The one AI client for the app (replaces the per-module AsyncOpenAI
+    instances).
+
+    - One pooled httpx client for every call (keep-alive, bounded
+      connections, connect / read timeouts from settings).
+    - Transient failures are retried (AI_MAX_RETRIES, jittered backoff).
+    - A circuit breaker fails fast with AIUnavailable while the provider is
+      down, so handlers go straight to their fallbacks instead of piling up.
+    - hedge=True (interactive calls): if the first attempt hasn't answered
+      within AI_HEDGE_DELAY_MS a second identical request is raced against
+      it; the first success wins and the other is cancelled. The hedge
+      takes its own scheduler slot and is skipped when none is free.
+    - Every attempt first takes a slot from the AI scheduler (priority
+      class + per-user fairness, services/ai_scheduler.py); 429s shrink the
+      scheduler's background concurrency.
+    - Every call is recorded in ai_metrics under its `site` label (latency,
+      outcome, tokens, cost).
+    - AI_BASE_URL="stub" serves every call from the local stub app
+      in-process (no network); pointing AI_BASE_URL at a running stub
+      server (`uvicorn services.ai_stub_server:app`) works the same way.
+    """
+
+    def __init__(self):
+        stub = settings.AI_BASE_URL == STUB_BASE_URL
+        transport = None
+        if stub:
+            from services.ai_stub_server import app as stub_app
+            transport = httpx.ASGITransport(app=stub_app)
+
+        self.http = httpx.AsyncClient(
+            transport=transport,
+            limits=httpx.Limits(
+                max_connections=settings.AI_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.AI_MAX_KEEPALIVE,
+                keepalive_expiry=30,
+            ),
+            timeout=httpx.Timeout(settings.AI_TIMEOUT_SECONDS, connect=settings.AI_CONNECT_TIMEOUT_SECONDS),
+        )
+        self.client = AsyncOpenAI(
+            base_url="http://ai-stub/v1" if stub else settings.AI_BASE_URL,
+            api_key=settings.OPENAI_API_KEY,
+            http_client=self.http,
+            max_retries=0,   # retries are ours (breaker-aware)
+        )
+        self.breaker = CircuitBreaker(settings.AI_BREAKER_FAILURES, settings.AI_BREAKER_RESET_SECONDS)
+
+    # -------------------------------
+    # 🔹 Public calls (same kwargs as the OpenAI SDK)
+    # -------------------------------
+    async def chat_completion(self, site: str = "chat", hedge: bool = False, priority: str = "background",
+                              user_id=None, **kwargs):
+        return await self._measured(
+            site, kwargs.get("model"), priority,
+            lambda: self._call(lambda: self.client.chat.completions.create(**kwargs), hedge, priority, user_id, site),
+        )
+
+    async def embeddings(self, site: str = "embeddings", priority: str = "background", user_id=None, **kwargs):
+        return await self._measured(
+            site, kwargs.get("model"), priority,
+            lambda: self._call(lambda: self.client.embeddings.create(**kwargs), False, priority, user_id, site),
+        )
+
+    async def stream_chat_completion(self, site: str = "chat_stream", priority: str = "background",
+                                     user_id=None, **kwargs):
+        """
+        Streamed chat completion: yields content deltas as they arrive. The
+        scheduler slot is held for the whole stream; no retries or hedging
+        (tokens may already have been shown to the user).
+        """
+        started, first_token_at, usage = time.monotonic(), None, None
+        if not self.breaker.allow():
+            error = AIUnavailable("AI provider unavailable (circuit open)")
+            ai_metrics.record_call(site, kwargs.get("model"), started, error=error, priority=priority)
+            raise error
+        try:
+            async with ai_scheduler.slot(priority, user_id):
+                stream = await self.client.chat.completions.create(
+                    stream=True, stream_options={"include_usage": True}, **kwargs
+                )
+                async for chunk in stream:
+                    if chunk.usage is not None:
+                        usage = chunk.usage   # final chunk (include_usage)
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        if first_token_at is None:
+                            first_token_at = time.monotonic()
+                        yield chunk.choices[0].delta.content
+        except Exception as e:
+            if isinstance(e, RateLimitError):
+                ai_scheduler.throttle()
+            if is_transient(e):
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            ai_metrics.record_call(site, kwargs.get("model"), started, usage, e, first_token_at, priority)
+            raise
+        except BaseException:   # cancelled, or the consumer closed the generator mid-stream
+            self.breaker.abandon()
+            raise
+        self.breaker.record_success()
+        ai_scheduler.recover()
+        ai_metrics.record_call(site, kwargs.get("model"), started, usage, None, first_token_at, priority)
+
+    async def aclose(self):
+        await self.http.aclose()
+
+    # -------------------------------
+    # 🔹 Policy
+    # -------------------------------
+    async def _measured(self, site: str, model: Optional[str], priority: str, call: Callable[[], Awaitable]):
+        started = time.monotonic()
+        try:
+            result = await call()
+        except Exception as e:
+            ai_metrics.record_call(site, model, started, error=e, priority=priority)
+            raise
+        ai_metrics.record_call(site, model, started, usage=getattr(result, "usage", None), priority=priority)
+        return result
+
+    async def _call(self, request: Callable[[], Awaitable], hedge: bool, priority: str, user_id, site: str):
+        if not self.breaker.allow():
+            raise AIUnavailable("AI provider unavailable (circuit open)")
+
+        try:
+            return await self._attempts(request, hedge, priority, user_id, site)
+        except BaseException as e:
+            if not isinstance(e, Exception):   # cancelled mid-call: don't leave a half-open trial claimed
+                self.breaker.abandon()
+            raise
+
+    async def _attempts(self, request: Callable[[], Awaitable], hedge: bool, priority: str, user_id, site: str):
+        attempt = (lambda r: self._hedged(r, site, priority)) if hedge else (lambda r: r())
+        for n in range(settings.AI_MAX_RETRIES + 1):
+            try:
+                async with ai_scheduler.slot(priority, user_id):
+                    result = await attempt(request)
+            except Exception as e:
+                if isinstance(e, RateLimitError):
+                    ai_scheduler.throttle()
+                if not is_transient(e):
+                    self.breaker.record_success()   # provider answered; the request was bad
+                    raise
+                if n == settings.AI_MAX_RETRIES or self.breaker.state != "closed":
+                    self.breaker.record_failure()
+                    raise
+                await asyncio.sleep(0.2 * 2 ** n * random.uniform(0.5, 1.5))
+                continue
+            self.breaker.record_success()
+            ai_scheduler.recover()
+            return result
+
+    async def _hedged(self, request: Callable[[], Awaitable], site: str, priority: str):
+        first = asyncio.create_task(request())
+        done, _ = await asyncio.wait({first}, timeout=settings.AI_HEDGE_DELAY_MS / 1000)
+        if done:
+            return first.result()
+        if not ai_scheduler.try_acquire(priority):   # at the concurrency cap: no hedge
+            return await first
+
+        ai_metrics.record_event(site, "hedged")
+        hedge = asyncio.create_task(request())
+        hedge.add_done_callback(lambda _: ai_scheduler.release(priority))
+        pending = {first, hedge}
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+
+ai_gateway = AIGateway()
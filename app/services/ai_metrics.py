@@ -0,0 +1,219 @@
+# services/ai_metrics.py
+
+
+import asyncio
+import json
+import logging
+import os
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+from typing import Dict, Optional
+from openai import APIConnectionError, APIStatusError, APITimeoutError, RateLimitError
+from utils.config import settings
+
+
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2000, 5000, 10000, 30000)   # + implicit +Inf
+
+# USD per 1M tokens (prompt, completion); unknown models are counted as 0
+MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "text-embedding-3-small": (0.02, 0.0),
+    "text-embedding-3-large": (0.13, 0.0),
+}
+
+
+def failure_reason(e: BaseException) -> str:
+    """Coarse outcome label for a failed AI call."""
+    from services.ai_gateway import AIUnavailable
+    if isinstance(e, AIUnavailable):
+        return "circuit_open"
+    if isinstance(e, (APITimeoutError, asyncio.TimeoutError)):
+        return "timeout"
+    if isinstance(e, RateLimitError):
+        return "rate_limited"
+    if isinstance(e, APIConnectionError):
+        return "connection"
+    if isinstance(e, APIStatusError):
+        return "server_error" if e.status_code >= 500 else "bad_request"
+    if isinstance(e, ValueError):
+        return "invalid_output"
+    return "error"
+
+
+class SiteStats:
+    def __init__(self):
+        self.calls = 0
+        self.outcomes: Dict[str, int] = defaultdict(int)
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.latency_ms_sum = 0.0
+        self.first_token_ms_sum = 0.0
+        self.first_token_count = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost_usd = 0.0
+        self.models: Dict[str, int] = defaultdict(int)
+        self.events: Dict[str, int] = defaultdict(int)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-th call (ms); None when empty or past the last bound."""
+        if not self.calls:
+            return None
+        target, seen = q * self.calls, 0
+        for i, count in enumerate(self.buckets):
+            seen += count
+            if seen >= target:
+                return LATENCY_BUCKETS_MS[i] if i < len(LATENCY_BUCKETS_MS) else None
+        return None
+
+    def snapshot(self) -> dict:
+        return {
+            "calls": self.calls,
+            "outcomes": dict(self.outcomes),
+            "latency_ms": {
+                "avg": round(self.latency_ms_sum / self.calls, 1) if self.calls else None,
+                "p50_le": self.percentile(0.50),
+                "p95_le": self.percentile(0.95),
+                "p99_le": self.percentile(0.99),
+                "buckets": dict(zip([*map(str, LATENCY_BUCKETS_MS), "+Inf"], self.buckets)),
+            },
+            "first_token_ms_avg": (
+                round(self.first_token_ms_sum / self.first_token_count, 1) if self.first_token_count else None
+            ),
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cost_usd": round(self.cost_usd, 6),
+            "models": dict(self.models),
+            "events": dict(self.events),
+        }
+
+
+class AIMetrics:
+    """
+    Per call site counters for every provider call made through the gateway
+    (latency histogram, outcome incl. timeouts / circuit-open, tokens, cost
+    estimate), plus events the call sites report themselves (cache hits,
+    fallbacks, hedges, speculation hits).
+
+    In-process and since-startup; each call is also appended as a JSON line
+    to AI_METRICS_LOG_PATH (size-rotated) for offline analysis.
+    """
+
+    def __init__(self, log_path: Optional[str] = settings.AI_METRICS_LOG_PATH):
+        self.started_at = datetime.now(timezone.utc)
+        self.sites: Dict[str, SiteStats] = defaultdict(SiteStats)
+        self.log = self._logger(log_path)
+
+    @staticmethod
+    def _logger(path: Optional[str]) -> Optional[logging.Logger]:
+        if not path:
+            return None
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            handler = RotatingFileHandler(
+                path,
+                maxBytes=settings.AI_METRICS_LOG_MAX_MB * 1024 * 1024,
+                backupCount=settings.AI_METRICS_LOG_BACKUPS,
+            )
+        except OSError as e:
+            print(f"⚠️ AI metrics log disabled ({path}): {e}")
+            return None
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger = logging.getLogger("aureole.ai_calls")
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        logger.handlers = [handler]
+        return logger
+
+    # -------------------------------
+    # 🔹 Recording
+    # -------------------------------
+    def record_call(
+        self,
+        site: str,
+        model: Optional[str],
+        started: float,
+        usage=None,
+        error: Optional[BaseException] = None,
+        first_token_at: Optional[float] = None,
+        priority: Optional[str] = None,
+    ):
+        """One provider call (retries and hedges included) that began at time.monotonic() `started`."""
+        latency_ms = (time.monotonic() - started) * 1000
+        outcome = "ok" if error is None else failure_reason(error)
+        prompt_tokens = getattr(usage, "prompt_tokens", None) or 0
+        completion_tokens = getattr(usage, "completion_tokens", None) or 0
+        price_in, price_out = MODEL_PRICES.get(model or "", (0.0, 0.0))
+        cost = (prompt_tokens * price_in + completion_tokens * price_out) / 1_000_000
+
+        stats = self.sites[site]
+        stats.calls += 1
+        stats.outcomes[outcome] += 1
+        stats.buckets[bisect_left(LATENCY_BUCKETS_MS, latency_ms)] += 1
+        stats.latency_ms_sum += latency_ms
+        if first_token_at is not None:
+            stats.first_token_ms_sum += (first_token_at - started) * 1000
+            stats.first_token_count += 1
+        stats.prompt_tokens += prompt_tokens
+        stats.completion_tokens += completion_tokens
+        stats.cost_usd += cost
+        if model:
+            stats.models[model] += 1
+
+        if self.log is not None:
+            self.log.info(json.dumps({
+                "ts": datetime.now(timezone.utc).isoformat(),
+                "site": site,
+                "model": model,
+                "priority": priority,
+                "outcome": outcome,
+                "error": f"{type(error).__name__}: {error}"[:300] if error is not None else None,
+                "latency_ms": round(latency_ms, 1),
+                "first_token_ms": round((first_token_at - started) * 1000, 1) if first_token_at else None,
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "cost_usd": round(cost, 8),
+            }))
+
+    def record_event(self, site: str, event: str, count: int = 1):
+        """Cache hits / fallbacks etc. reported by the call site (no provider call, or instead of one)."""
+        self.sites[site].events[event] += count
+
+    # -------------------------------
+    # 🔹 Export
+    # -------------------------------
+    def snapshot(self) -> dict:
+        return {
+            "since": self.started_at.isoformat(),
+            "sites": {site: stats.snapshot() for site, stats in sorted(self.sites.items())},
+        }
+
+    def prometheus(self) -> str:
+        """Text exposition format (histograms + counters, labelled by site)."""
+        lines = [
+            "# TYPE ai_call_latency_ms histogram",
+            "# TYPE ai_calls_total counter",
+            "# TYPE ai_tokens_total counter",
+            "# TYPE ai_cost_usd_total counter",
+            "# TYPE ai_events_total counter",
+        ]
+        for site, s in sorted(self.sites.items()):
+            cumulative = 0
+            for bound, count in zip([*map(str, LATENCY_BUCKETS_MS), "+Inf"], s.buckets):
+                cumulative += count
+                lines.append(f'ai_call_latency_ms_bucket{{site="{site}",le="{bound}"}} {cumulative}')
+            lines.append(f'ai_call_latency_ms_sum{{site="{site}"}} {s.latency_ms_sum:.1f}')
+            lines.append(f'ai_call_latency_ms_count{{site="{site}"}} {s.calls}')
+            for outcome, count in sorted(s.outcomes.items()):
+                lines.append(f'ai_calls_total{{site="{site}",outcome="{outcome}"}} {count}')
+            lines.append(f'ai_tokens_total{{site="{site}",kind="prompt"}} {s.prompt_tokens}')
+            lines.append(f'ai_tokens_total{{site="{site}",kind="completion"}} {s.completion_tokens}')
+            lines.append(f'ai_cost_usd_total{{site="{site}"}} {s.cost_usd:.6f}')
+            for event, count in sorted(s.events.items()):
+                lines.append(f'ai_events_total{{site="{site}",event="{event}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+
+ai_metrics = AIMetrics()
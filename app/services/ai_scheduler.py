@@ -0,0 +1,161 @@
+# services/ai_scheduler.py
+
+
+import asyncio
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict, Optional, Tuple
+from utils.config import settings
+
+
+PRIORITIES = ("interactive", "enrichment", "background")   # dispatch order
+WAIT_SAMPLES = 1000                                          # rolling window for wait-time percentiles
+
+
+class AIScheduler:
+    """
+    Admission control for every provider call (wrapped by the AI gateway).
+
+    - At most `concurrency` calls in flight across the process.
+    - Strict priority: interactive (chat suggestions) > enrichment
+      (/insights) > background (profile jobs, cache refreshes, embeddings).
+      `interactive_reserved` slots are never handed to the other classes, so
+      a burst of background work can't push chat latency up.
+    - Background concurrency is additionally capped by an adaptive limit:
+      halved on every provider 429, grown back slowly on success (AIMD).
+    - Within a class, waiters are served round-robin per user, so one user's
+      burst queues behind itself instead of in front of everyone else.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = settings.AI_SCHEDULER_CONCURRENCY,
+        interactive_reserved: int = settings.AI_SCHEDULER_INTERACTIVE_RESERVED,
+        background_slots: int = settings.AI_SCHEDULER_BACKGROUND_SLOTS,
+    ):
+        self.concurrency = concurrency
+        self.shared = max(1, concurrency - interactive_reserved)
+        self.background_max = max(1, background_slots)
+        self.background_limit = float(self.background_max)
+
+        self._queues: Dict[str, "OrderedDict[str, Deque[Tuple[asyncio.Future, float]]]"] = {
+            p: OrderedDict() for p in PRIORITIES
+        }
+        self._in_flight = {p: 0 for p in PRIORITIES}
+        self._granted = {p: 0 for p in PRIORITIES}
+        self._waits = {p: deque(maxlen=WAIT_SAMPLES) for p in PRIORITIES}
+        self._throttled = 0
+
+    # -------------------------------
+    # 🔹 Admission
+    # -------------------------------
+    def _can_run(self, priority: str) -> bool:
+        total = sum(self._in_flight.values())
+        if total >= self.concurrency:
+            return False
+        if priority != "interactive" and total >= self.shared:
+            return False
+        if priority == "background" and self._in_flight["background"] >= int(self.background_limit):
+            return False
+        return True
+
+    def _queued(self, priority: str) -> int:
+        return sum(len(q) for q in self._queues[priority].values())
+
+    def _grant(self, priority: str, waited: float):
+        self._in_flight[priority] += 1
+        self._granted[priority] += 1
+        self._waits[priority].append(waited)
+
+    def _dispatch(self):
+        for priority in PRIORITIES:
+            users = self._queues[priority]
+            while users and self._can_run(priority):
+                user, waiters = next(iter(users.items()))
+                future, enqueued_at = waiters.popleft()
+                if waiters:
+                    users.move_to_end(user)   # round-robin: this user goes to the back
+                else:
+                    del users[user]
+                if future.done():             # cancelled while queued
+                    continue
+                self._grant(priority, time.monotonic() - enqueued_at)
+                future.set_result(None)
+
+    def _release(self, priority: str):
+        self._in_flight[priority] -= 1
+        self._dispatch()
+
+    def try_acquire(self, priority: str) -> bool:
+        """Take a slot only if one is free right now (no queueing); pair with `release`."""
+        ahead = any(self._queues[p] for p in PRIORITIES[:PRIORITIES.index(priority) + 1])
+        if ahead or not self._can_run(priority):
+            return False
+        self._grant(priority, 0.0)
+        return True
+
+    def release(self, priority: str):
+        self._release(priority)
+
+    @asynccontextmanager
+    async def slot(self, priority: str = "background", user_id=None):
+        if priority not in self._queues:
+            raise ValueError(f"Unknown AI priority '{priority}'")
+
+        if not self.try_acquire(priority):
+            future = asyncio.get_running_loop().create_future()
+            self._queues[priority].setdefault(str(user_id), deque()).append((future, time.monotonic()))
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    self._release(priority)   # granted just as we were cancelled
+                else:
+                    future.cancel()           # _dispatch skips it
+                raise
+
+        try:
+            yield
+        finally:
+            self._release(priority)
+
+    # -------------------------------
+    # 🔹 Provider feedback (AIMD on background concurrency)
+    # -------------------------------
+    def throttle(self):
+        self._throttled += 1
+        self.background_limit = max(1.0, self.background_limit / 2)
+
+    def recover(self):
+        if self.background_limit < self.background_max:
+            self.background_limit = min(self.background_max, self.background_limit + 1 / self.background_limit)
+            self._dispatch()
+
+    # -------------------------------
+    # 🔹 Metrics
+    # -------------------------------
+    def stats(self) -> dict:
+        classes = {}
+        for p in PRIORITIES:
+            waits = sorted(self._waits[p])
+            pct = lambda q: round(waits[min(len(waits) - 1, int(q * len(waits)))] * 1000, 1) if waits else 0.0
+            classes[p] = {
+                "queued": self._queued(p),
+                "queued_users": len(self._queues[p]),
+                "in_flight": self._in_flight[p],
+                "granted": self._granted[p],
+                "wait_ms_p50": pct(0.50),
+                "wait_ms_p95": pct(0.95),
+                "wait_ms_max": round(waits[-1] * 1000, 1) if waits else 0.0,
+            }
+        return {
+            "concurrency": self.concurrency,
+            "in_flight": sum(self._in_flight.values()),
+            "background_limit": int(self.background_limit),
+            "throttled": self._throttled,
+            "classes": classes,
+        }
+
+
+ai_scheduler = AIScheduler()
@@ -2,9 +2,11 @@
 
 import json
 import uuid
+from typing import Awaitable, Callable, List, Optional
 from fastapi import HTTPException
 from datetime import datetime, timezone
-from db.session import client
+from services.ai_gateway import ai_gateway
+from services.ai_metrics import ai_metrics
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from models.profile_model import Profile, AIUsage
@@ -12,15 +14,34 @@ from utils.premium_utils import is_premium_user
 from models.message_model import Message
 from models.user_model import Notification, User
 from utils.config import settings
-from utils.prompts import AI_PROFILE_SYSTEM_PROMPT, make_compatibility_user_prompt, make_single_user_prompt
+from utils.json_stream import JSONArrayStreamParser
+from utils.prompts import AI_PROFILE_SYSTEM_PROMPT, make_compatibility_user_prompt, make_single_user_prompt, make_embedding_text
 from services.notification_service import create_and_push_notification, assert_can_send
+from services.embedding_index import embedding_index
+from services.vector_search import store_embedding
+from services.embedding_cache import prompts_hash
+from services.embedding_providers import embedding_provider, is_comparable
 
 
 
 MAX_DAILY_FREE = 3
 
-
-async def run_ai_profile_process(db: AsyncSession, user):
+# served when the AI provider is down / slow (not counted against the daily limit)
+FALLBACK_REPLIES = {
+    "flirty": ["You just made me smile 😏", "Okay, now I'm curious — tell me more?", "Careful, I could get used to this."],
+    "funny": ["Ha! You win this round 😂", "Okay that made me laugh out loud.", "I'm stealing that line, just so you know."],
+    "serious": ["That's really interesting — what made you think of it?", "I appreciate you sharing that.", "Tell me more, I'd like to understand."],
+}
+DEFAULT_FALLBACK_REPLIES = ["That sounds great — tell me more!", "Ha, I love that 😊", "What made you think of that?"]
+
+
+async def run_ai_profile_process(db: AsyncSession, user, force: bool = False):
+    """
+    Summarize raw_prompts and (re)embed the profile. The summary call is
+    skipped when raw_prompts are unchanged since the last run (unless
+    `force`), and the embedding comes from the content-hash cache when the
+    embedding text is too.
+    """
     # --- Fetch profile ---
     result = await db.execute(select(Profile).where(Profile.user_id == user.id))
     profile = result.scalar_one_or_none()
@@ -29,14 +50,59 @@ async def run_ai_profile_process(db: AsyncSession, user):
         raise ValueError("Profile prompts missing")
 
     raw = profile.raw_prompts
+    raw_hash = prompts_hash(raw)
+
+    if not force and profile.ai_summary and profile.prompts_hash == raw_hash:
+        # ---- Prompts unchanged: reuse the existing summary ----
+        summary = profile.ai_summary
+        mini_traits = profile.mini_traits or []
+        preferences = profile.preferences or {}
+    else:
+        summary, mini_traits, preferences = await _summarize_prompts(raw, user.id)
+
+    # ---- Build embedding text ----
+    # Fully psychology-weighted embedding (much better for matching)
+    emb_text = make_embedding_text(summary, mini_traits, raw, preferences)
+
+    # ---- Create Embedding (configured provider; local fallback while the remote one is down) ----
+    try:
+        embedding, embedding_model = await embedding_provider.embed(db, emb_text)
+    except Exception as e:
+        raise RuntimeError(f"Embedding generation failed: {e}")
+
+    # ---- Update DB ----
+    profile.ai_summary = summary
+    profile.mini_traits = mini_traits
+    profile.preferences = preferences
+    profile.prompts_hash = raw_hash
+    store_embedding(profile, embedding, user, model=embedding_model)
+
+    await db.commit()
+
+    # ---- Keep in-process embedding matrix in sync (degraded-mode vectors stay out) ----
+    if is_comparable(embedding_model):
+        embedding_index.sync_user(user, embedding)
+    else:
+        embedding_index.remove(user.id)
 
+    return {
+        "summary": summary,
+        "mini_traits": mini_traits,
+        "preferences": preferences
+    }
+
+
+async def _summarize_prompts(raw: dict, user_id=None):
+    """LLM summary of raw_prompts -> (summary, mini_traits, preferences)."""
     # ---- Build prompts ----
     system_prompt = AI_PROFILE_SYSTEM_PROMPT
     user_prompt = make_single_user_prompt(raw)
 
     # ---- AI Summarization ----
     try:
-        chat_response = await client.chat.completions.create(
+        chat_response = await ai_gateway.chat_completion(
+            site="profile_summary",
+            user_id=user_id,
             model="gpt-4o-mini",
             messages=[
                 {"role": "system", "content": system_prompt},
@@ -59,45 +125,20 @@ async def run_ai_profile_process(db: AsyncSession, user):
     except Exception as e:
         raise RuntimeError(f"AI returned invalid JSON: {e}")
 
-    # ---- Build embedding text ----
-    # Fully psychology-weighted embedding (much better for matching)
-    emb_text = (
-        f"Summary: {summary} "
-        f"Traits: {', '.join(mini_traits)} "
-        f"About: {raw.get('about', '')} "
-        f"Looking for: {raw.get('looking_for', '')} "
-        f"Interests: {', '.join(preferences.get('interests', []))} "
-        f"Values: {', '.join(preferences.get('values', []))} "
-        f"Dealbreakers: {', '.join(preferences.get('dealbreakers', []))}"
-    )
+    return summary, mini_traits, preferences
 
-    # ---- Create Embedding ----
-    try:
-        emb_response = await client.embeddings.create(
-            model="text-embedding-3-small",
-            input=emb_text,
-            encoding_format="float"
-        )
-        embedding = emb_response.data[0].embedding
-    except Exception as e:
-        raise RuntimeError(f"Embedding generation failed: {e}")
 
-    # ---- Update DB ----
-    profile.ai_summary = summary
-    profile.mini_traits = mini_traits
-    profile.preferences = preferences
-    profile.embedding = embedding
-
-    await db.commit()
-
-    return {
-        "summary": summary,
-        "mini_traits": mini_traits,
-        "preferences": preferences
-    }
+async def usage_today(db: AsyncSession, user_id) -> Optional[AIUsage]:
+    """Today's ai_usage row for user_id (None before their first generation today)."""
+    today_start = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    result = await db.execute(
+        select(AIUsage).where(AIUsage.user_id == user_id, AIUsage.last_generated_at >= today_start)
+    )
+    return result.scalars().first()
 
 
-async def generate_ai_replies_service(db: AsyncSession, user_id: str, message_id: str, tone: str):
+async def _reply_context(db: AsyncSession, user_id: str, message_id: str):
+    """Validate user/message and the daily limit -> (message, premium, usage)."""
     # 1. Check user and message validity
     user = (await db.execute(select(User).where(User.id == user_id))).scalar_one_or_none()
     if not user:
@@ -111,48 +152,131 @@ async def generate_ai_replies_service(db: AsyncSession, user_id: str, message_id
     premium = await is_premium_user(db, user_id)
 
     # 3. Enforce daily limit for non-premium
-    today_start = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
-    result = await db.execute(
-        select(AIUsage).where(AIUsage.user_id == user_id, AIUsage.last_generated_at >= today_start)
-    )
-    usage = result.scalar_one_or_none()
+    usage = await usage_today(db, user_id)
 
     if not premium and usage and usage.ai_generated_count >= MAX_DAILY_FREE:
         raise HTTPException(status_code=403, detail="Daily AI reply limit reached. Upgrade to premium.")
 
-    # 4. Generate replies via OpenAI
+    return message, premium, usage
+
+
+def _reply_request(content: str, tone: str) -> dict:
     system_prompt = (
         f"You are a helpful dating chat assistant. "
         f"Provide 3 {tone} replies in JSON format: {{'replies': ['','', '']}}"
     )
-
-    chat_response = await client.chat.completions.create(
+    return dict(
         model="gpt-4o-mini",
         messages=[
             {"role": "system", "content": system_prompt},
-            {"role": "user", "content": f"Incoming message: {message.content}"}
+            {"role": "user", "content": f"Incoming message: {content}"}
         ],
         response_format={"type": "json_object"},
         timeout=30
     )
 
-    ai_output = chat_response.choices[0].message.content
-    ai_data = json.loads(ai_output)
-    replies = ai_data.get("replies", [])
+
+async def generate_replies(content: str, tone: str, user_id=None, priority: str = "interactive",
+                           hedge: bool = True, site: str = "reply_suggestions") -> List[str]:
+    """One reply-suggestion completion for `content`; raises on provider / JSON failure."""
+    chat_response = await ai_gateway.chat_completion(
+        site=site,
+        hedge=hedge,
+        priority=priority,
+        user_id=user_id,
+        **_reply_request(content, tone),
+    )
+    ai_data = json.loads(chat_response.choices[0].message.content)
+    return ai_data.get("replies", [])
+
+
+async def record_reply_usage(db: AsyncSession, user_id: str, premium: bool, usage,
+                              speculation_hit: bool = False) -> Optional[int]:
+    """
+    Count one generation (premium too: it feeds the speculation budget);
+    returns what's left today for the free tier (None = unlimited).
+    """
+    if usage:
+        usage.ai_generated_count += 1
+        usage.last_generated_at = datetime.now(timezone.utc)
+    else:
+        usage = AIUsage(user_id=user_id, ai_generated_count=1, last_generated_at=datetime.now(timezone.utc))
+        db.add(usage)
+    if speculation_hit:
+        usage.speculation_hits = (usage.speculation_hits or 0) + 1
+    await db.commit()
+    if premium:
+        return None
+    return MAX_DAILY_FREE - usage.ai_generated_count
+
+
+def _fallback_replies(tone: str, premium: bool, usage, site: str = "reply_suggestions") -> dict:
+    ai_metrics.record_event(site, "fallback")
+    replies = FALLBACK_REPLIES.get(tone, DEFAULT_FALLBACK_REPLIES)
+    remaining = None if premium else MAX_DAILY_FREE - (usage.ai_generated_count if usage else 0)
+    return {"replies": replies, "remaining_today": remaining}
+
+
+async def generate_ai_replies_service(db: AsyncSession, user_id: str, message_id: str, tone: str):
+    message, premium, usage = await _reply_context(db, user_id, message_id)
+
+    # 4. Generate replies via OpenAI
+    try:
+        replies = await generate_replies(message.content, tone, user_id)
+    except Exception as e:
+        print(f"⚠️ AI replies unavailable, serving fallback: {e}")
+        return _fallback_replies(tone, premium, usage)
 
     # 5. Update usage
-    if not premium:
-        if usage:
-            usage.ai_generated_count += 1
-            usage.last_generated_at = datetime.now(timezone.utc)
-        else:
-            db.add(AIUsage(user_id=user_id, ai_generated_count=1, last_generated_at=datetime.now(timezone.utc)))
-        await db.commit()
-
-    remaining = None
-    if not premium:
-        remaining = MAX_DAILY_FREE - (usage.ai_generated_count if usage else 1)
+    remaining = await record_reply_usage(db, user_id, premium, usage)
+    return {"replies": replies, "remaining_today": remaining}
+
 
+async def stream_ai_replies_service(
+    db: AsyncSession,
+    user_id: str,
+    message_id: str,
+    tone: str,
+    on_reply: Callable[[int, str], Awaitable[None]],
+):
+    """
+    Same contract as generate_ai_replies_service, but the completion is
+    streamed and `on_reply(index, text)` is awaited as soon as each reply in
+    the JSON array is complete. Returns the final {"replies", "remaining_today"}.
+    """
+    message, premium, usage = await _reply_context(db, user_id, message_id)
+
+    parser = JSONArrayStreamParser("replies")
+    replies: List[str] = []
+    stream = ai_gateway.stream_chat_completion(
+        site="reply_suggestions_stream", priority="interactive", user_id=user_id,
+        **_reply_request(message.content, tone)
+    )
+    try:
+        while True:
+            # only the provider stream and the parser count as AI failures;
+            # errors from on_reply (e.g. a closed WebSocket) propagate
+            try:
+                completed = parser.feed(await stream.__anext__())
+            except StopAsyncIteration:
+                break
+            except Exception as e:
+                if not replies:
+                    print(f"⚠️ AI reply stream unavailable, serving fallback: {e}")
+                    fallback = _fallback_replies(tone, premium, usage, site="reply_suggestions_stream")
+                    for i, reply in enumerate(fallback["replies"]):
+                        await on_reply(i, reply)
+                    return fallback
+                print(f"⚠️ AI reply stream cut off after {len(replies)} replies: {e}")
+                break
+
+            for reply in completed:
+                replies.append(reply)
+                await on_reply(len(replies) - 1, reply)
+    finally:
+        await stream.aclose()
+
+    remaining = await record_reply_usage(db, user_id, premium, usage)
     return {"replies": replies, "remaining_today": remaining}
 
 
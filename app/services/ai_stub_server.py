@@ -0,0 +1,179 @@
+# services/ai_stub_server.py
+#
+# OpenAI-compatible stand-in for load tests and local development:
+#   AI_BASE_URL=stub                       -> served in-process by the gateway
+#   uvicorn services.ai_stub_server:app    -> standalone, AI_BASE_URL=http://host:port/v1
+# Answers are deterministic per input (hash-seeded), shaped like the real
+# responses each call site parses, with configurable latency and failures.
+
+
+import asyncio
+import hashlib
+import json
+import random
+import re
+import time
+from typing import Optional
+import numpy as np
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from utils.config import settings
+
+
+EMBEDDING_DIM = 1536
+STREAM_CHUNK_DELAY = 0.01   # seconds between streamed chunks
+
+app = FastAPI(title="AI stub")
+
+
+def _seed(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), "big")
+
+
+async def _simulate():
+    """Latency + injected failures; returns an error response or None."""
+    delay = settings.AI_STUB_LATENCY_MS + random.uniform(0, settings.AI_STUB_JITTER_MS)
+    await asyncio.sleep(delay / 1000)
+    if random.random() < settings.AI_STUB_FAILURE_RATE:
+        return JSONResponse({"error": {"message": "stub: injected failure", "type": "server_error"}}, status_code=503)
+    return None
+
+
+# -------------------------------
+# 🔹 Canned content
+# -------------------------------
+TRAITS = ["curious", "warm", "playful", "grounded", "adventurous", "thoughtful", "witty", "loyal"]
+INTERESTS = ["hiking", "cooking", "live music", "travel", "books", "coffee", "yoga", "film"]
+VALUES = ["honesty", "kindness", "growth", "family", "humour"]
+
+
+def _pick(rng: random.Random, pool, k):
+    return rng.sample(pool, k)
+
+
+def _chat_content(system: str, user: str, json_mode: bool) -> str:
+    rng = random.Random(_seed(system + user))
+
+    if '"candidates"' in system:
+        ids = re.findall(r"Candidate id: (\S+)", user)
+        return json.dumps({"candidates": {
+            cid: {
+                "compatibility_reason": f"You both light up around {_pick(rng, INTERESTS, 1)[0]} and value {_pick(rng, VALUES, 1)[0]}.",
+                "conversation_starter": f"What got you into {_pick(rng, INTERESTS, 1)[0]} in the first place?",
+            }
+            for cid in ids
+        }})
+    if "replies" in system:
+        return json.dumps({"replies": [
+            "That sounds great — tell me more!",
+            f"Ha, I love that. Are you into {_pick(rng, INTERESTS, 1)[0]} too?",
+            "You just made my day a little better 😊",
+        ]})
+    if json_mode:
+        # profile summary (services/ai_service.py, routers/profile_router_03.py)
+        return json.dumps({
+            "summary": f"A {' and '.join(_pick(rng, TRAITS, 2))} person who loves {_pick(rng, INTERESTS, 1)[0]}.",
+            "mini_traits": _pick(rng, TRAITS, 3),
+            "preferences": {
+                "interests": _pick(rng, INTERESTS, 3),
+                "values": _pick(rng, VALUES, 2),
+                "dealbreakers": [],
+            },
+        })
+    return f"You share a love of {_pick(rng, INTERESTS, 1)[0]} and a {_pick(rng, TRAITS, 1)[0]} outlook."
+
+
+def _tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+# -------------------------------
+# 🔹 Endpoints
+# -------------------------------
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    error = await _simulate()
+    if error is not None:
+        return error
+
+    messages = body.get("messages", [])
+    system = "\n".join(m.get("content", "") for m in messages if m.get("role") == "system")
+    user = "\n".join(m.get("content", "") for m in messages if m.get("role") != "system")
+    json_mode = (body.get("response_format") or {}).get("type") == "json_object"
+    content = _chat_content(system, user, json_mode)
+
+    prompt_tokens, completion_tokens = _tokens(system + user), _tokens(content)
+    usage = {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
+    if body.get("stream"):
+        include_usage = (body.get("stream_options") or {}).get("include_usage")
+        return StreamingResponse(
+            _stream(content, body.get("model", "stub"), usage if include_usage else None),
+            media_type="text/event-stream",
+        )
+
+    return {
+        "id": f"stub-{_seed(user):x}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "stub"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }],
+        "usage": usage,
+    }
+
+
+async def _stream(content: str, model: str, usage: Optional[dict]):
+    """SSE chunks of ~4 characters, paced like token output."""
+    def event(delta: Optional[dict], finish=None, usage=None) -> str:
+        chunk = {
+            "id": "stub-stream",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [] if delta is None else [{"index": 0, "delta": delta, "finish_reason": finish}],
+            "usage": usage,
+        }
+        return f"data: {json.dumps(chunk)}\n\n"
+
+    yield event({"role": "assistant", "content": ""})
+    for i in range(0, len(content), 4):
+        await asyncio.sleep(STREAM_CHUNK_DELAY)
+        yield event({"content": content[i:i + 4]})
+    yield event({}, finish="stop")
+    if usage is not None:
+        yield event(None, usage=usage)   # stream_options.include_usage: trailing usage-only chunk
+    yield "data: [DONE]\n\n"
+
+
+@app.post("/v1/embeddings")
+async def embeddings(request: Request):
+    body = await request.json()
+    error = await _simulate()
+    if error is not None:
+        return error
+
+    inputs = body.get("input", [])
+    if isinstance(inputs, str):
+        inputs = [inputs]
+
+    data = []
+    for i, text in enumerate(inputs):
+        vector = np.random.default_rng(_seed(text)).standard_normal(EMBEDDING_DIM).astype(np.float32)
+        vector /= np.linalg.norm(vector)
+        data.append({"object": "embedding", "index": i, "embedding": vector.tolist()})
+
+    tokens = sum(_tokens(t) for t in inputs)
+    return {
+        "object": "list",
+        "data": data,
+        "model": body.get("model", "stub"),
+        "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+    }
@@ -0,0 +1,123 @@
+# services/deck_sessions.py
+
+
+import secrets
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+from fastapi import HTTPException
+from schemas.match_schema import MatchResponse
+from services.discovery_feed import discovery_feed, FEED_SIZE
+from services.exclusion_index import exclusion_index
+
+
+DECK_SESSION_SIZE = FEED_SIZE            # ranked once per session (served from the feed)
+DECK_SESSION_TTL = timedelta(minutes=30) # sliding: every page extends it
+MAX_DECK_SESSIONS = 100_000
+
+
+@dataclass
+class DeckSession:
+    owner_id: str
+    mode: str
+    params: tuple
+    items: List[MatchResponse]
+    expires_at: datetime
+
+
+class DeckSessions:
+    """
+    Cursor pagination over a ranking snapshot.
+
+    The first page ranks (up to DECK_SESSION_SIZE) once and stores the
+    ordered deck under an opaque token; the cursor handed back is
+    "<token>.<offset>", so later pages are plain slices and retrying a page
+    returns the same people. Entries excluded since the snapshot (swiped,
+    matched, blocked) are skipped on the way out.
+    """
+
+    def __init__(self):
+        self._sessions: "OrderedDict[str, DeckSession]" = OrderedDict()
+
+    def _evict(self, now: datetime):
+        while self._sessions:
+            token, session = next(iter(self._sessions.items()))
+            if session.expires_at > now and len(self._sessions) <= MAX_DECK_SESSIONS:
+                break
+            self._sessions.pop(token)
+
+    def _resolve(
+        self, cursor: str, owner_id: str, mode: str, params: tuple, now: datetime
+    ) -> Tuple[str, DeckSession, int]:
+        token, _, raw_offset = cursor.partition(".")
+        session = self._sessions.get(token)
+        if (
+            session is None
+            or session.expires_at <= now
+            or session.owner_id != owner_id
+            or session.mode != mode
+            or session.params != params   # filters changed: the snapshot no longer applies
+            or not raw_offset.isdigit()
+        ):
+            raise HTTPException(status_code=410, detail="Cursor expired. Reload recommendations.")
+        return token, session, int(raw_offset)
+
+    async def page(
+        self,
+        db,
+        current_user,
+        mode: str,
+        limit: int,
+        cursor: Optional[str] = None,
+        **params,
+    ) -> Tuple[List[MatchResponse], Optional[str]]:
+        """Return (items, next_cursor); next_cursor is None once the deck is exhausted."""
+        owner_id = str(current_user.id)
+        now = datetime.now(timezone.utc)
+        key_params = tuple(sorted(params.items()))
+
+        if cursor is None:
+            # snapshot whatever the feed holds; only re-rank once it can't fill this page
+            items = await discovery_feed.get(
+                db, current_user, mode, limit=max(limit, DECK_SESSION_SIZE), refill_below=limit, **params
+            )
+            token = secrets.token_urlsafe(16)
+            session = DeckSession(
+                owner_id=owner_id,
+                mode=mode,
+                params=key_params,
+                items=list(items),
+                expires_at=now + DECK_SESSION_TTL,
+            )
+            self._sessions[token] = session
+            self._evict(now)
+            offset = 0
+        else:
+            token, session, offset = self._resolve(cursor, owner_id, mode, key_params, now)
+            session.expires_at = now + DECK_SESSION_TTL
+            self._sessions.move_to_end(token)
+
+        # skip people swiped / matched / blocked since the snapshot
+        remaining = session.items[offset:]
+        excluded = await exclusion_index.get(db, owner_id)
+        if len(excluded) and remaining:
+            drop = excluded.mask(exclusion_index.ordinals.many(m.user_id for m in remaining))
+        else:
+            drop = [False] * len(remaining)
+
+        page: List[MatchResponse] = []
+        consumed = 0
+        for item, skip in zip(remaining, drop):
+            if len(page) >= limit:
+                break
+            consumed += 1
+            if not skip:
+                page.append(item)
+
+        offset += consumed
+        next_cursor = f"{token}.{offset}" if offset < len(session.items) else None
+        return page, next_cursor
+
+
+deck_sessions = DeckSessions()
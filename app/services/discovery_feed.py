@@ -0,0 +1,249 @@
+# services/discovery_feed.py
+
+
+import asyncio
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from sqlalchemy import select
+from models.user_model import User
+from schemas.match_schema import MatchResponse
+
+
+FEED_SIZE = 200                 # candidates materialized per (user, mode, params)
+MAX_FEEDS = 50_000              # decks kept in memory (least recently read evicted first)
+SCHEDULER_INTERVAL_SECONDS = 60
+
+# Activity tiers: time since the owner last opened a deck -> rebuild interval.
+# Owners idle longer than the last tier are dropped and rebuilt lazily.
+ACTIVITY_TIERS = [
+    (timedelta(hours=1), timedelta(minutes=5)),    # hot
+    (timedelta(days=1), timedelta(hours=1)),       # warm
+    (timedelta(days=7), timedelta(hours=6)),       # cold
+]
+
+FeedKey = Tuple[str, str, tuple]   # (owner_id, mode, params)
+Builder = Callable[..., Awaitable[List[MatchResponse]]]
+
+
+@dataclass
+class FeedEntry:
+    items: List[MatchResponse]
+    params: dict
+    built_at: datetime
+    complete: bool = False     # builder returned fewer than FEED_SIZE: nothing more to rank
+    stale: bool = False
+
+
+@dataclass
+class OwnerState:
+    keys: Set[FeedKey] = field(default_factory=set)
+    last_read_at: Optional[datetime] = None
+
+
+def _ttl_for(last_read_at: Optional[datetime], now: datetime) -> Optional[timedelta]:
+    if last_read_at is None:
+        return ACTIVITY_TIERS[-1][1]
+    idle = now - last_read_at
+    for max_idle, ttl in ACTIVITY_TIERS:
+        if idle <= max_idle:
+            return ttl
+    return None
+
+
+class DiscoveryFeed:
+    """
+    In-process materialized top-N decks per user.
+
+    - `get()` serves a slice of the precomputed deck; it only ranks when the
+      deck is missing, stale or past its activity-tier TTL.
+    - swipes / likes / blocks patch decks in place (`remove_candidate`)
+    - profile or location changes and undone swipes mark decks stale
+      (`invalidate_user` / `invalidate_owner`); a stale deck is re-ranked by
+      the next `get()` or scheduler pass, whichever comes first
+    - a background scheduler rebuilds decks of recently active owners
+    - at most MAX_FEEDS decks are kept (LRU by last read)
+    """
+
+    def __init__(self):
+        self._builders: Dict[str, Builder] = {}
+        self._feeds: "OrderedDict[FeedKey, FeedEntry]" = OrderedDict()
+        self._owners: Dict[str, OwnerState] = {}
+        self._holders: Dict[str, Set[FeedKey]] = {}     # candidate_id -> decks containing it
+        self._task: Optional[asyncio.Task] = None
+
+    def register(self, mode: str, builder: Builder):
+        """builder(db, current_user, limit=..., **params) -> ranked MatchResponse list"""
+        self._builders[mode] = builder
+
+    # -------------------------------
+    # 🔹 Internal helpers
+    # -------------------------------
+    def _drop(self, key: FeedKey):
+        entry = self._feeds.pop(key, None)
+        if not entry:
+            return
+        for item in entry.items:
+            holders = self._holders.get(item.user_id)
+            if holders:
+                holders.discard(key)
+                if not holders:
+                    self._holders.pop(item.user_id, None)
+        owner = self._owners.get(key[0])
+        if owner:
+            owner.keys.discard(key)
+
+    def _store(self, key: FeedKey, items: List[MatchResponse], params: dict, now: datetime):
+        self._drop(key)
+        self._feeds[key] = FeedEntry(
+            items=items,
+            params=params,
+            built_at=now,
+            complete=len(items) < FEED_SIZE,
+        )
+        self._owners.setdefault(key[0], OwnerState()).keys.add(key)
+        for item in items:
+            self._holders.setdefault(item.user_id, set()).add(key)
+        while len(self._feeds) > MAX_FEEDS:
+            self._drop(next(iter(self._feeds)))
+
+    async def _build(self, db, current_user, key: FeedKey, params: dict, now: datetime):
+        builder = self._builders[key[1]]
+        items = await builder(db, current_user, limit=FEED_SIZE, **params)
+        self._store(key, list(items), params, now)
+        return self._feeds[key]
+
+    # -------------------------------
+    # 🔹 Read path
+    # -------------------------------
+    async def get(
+        self, db, current_user, mode: str, limit: int, refill_below: Optional[int] = None, **params
+    ) -> List[MatchResponse]:
+        """
+        Up to `limit` ranked candidates. A deck swiped down below
+        `refill_below` items (default `limit`) is re-ranked, unless the
+        builder had nothing more to give.
+        """
+        owner_id = str(current_user.id)
+        key: FeedKey = (owner_id, mode, tuple(sorted(params.items())))
+        now = datetime.now(timezone.utc)
+
+        owner = self._owners.setdefault(owner_id, OwnerState())
+        ttl = _ttl_for(owner.last_read_at, now)
+        owner.last_read_at = now
+
+        if limit > FEED_SIZE:
+            # larger than the materialized deck: rank directly
+            return await self._builders[mode](db, current_user, limit=limit, **params)
+
+        entry = self._feeds.get(key)
+        if (
+            entry is None
+            or entry.stale
+            or ttl is None
+            or now - entry.built_at > ttl
+            or (len(entry.items) < (refill_below or limit) and not entry.complete)   # swiped through it
+        ):
+            entry = await self._build(db, current_user, key, params, now)
+        else:
+            self._feeds.move_to_end(key)
+
+        return entry.items[:limit]
+
+    # -------------------------------
+    # 🔹 Event-driven invalidation
+    # -------------------------------
+    def remove_candidate(self, owner_id, candidate_id):
+        """Patch: candidate must not appear again in owner's decks (swipe / like / block)."""
+        owner = self._owners.get(str(owner_id))
+        if not owner:
+            return
+        cid = str(candidate_id)
+        for key in list(owner.keys):
+            entry = self._feeds.get(key)
+            if entry:
+                entry.items = [m for m in entry.items if m.user_id != cid]
+        holders = self._holders.get(cid)
+        if holders:
+            holders.difference_update(owner.keys)
+
+    def invalidate_owner(self, owner_id):
+        """Owner's own decks need re-ranking (e.g. a swipe was undone): next read or scheduler pass rebuilds them."""
+        owner = self._owners.get(str(owner_id))
+        if not owner:
+            return
+        for key in owner.keys:
+            entry = self._feeds.get(key)
+            if entry:
+                entry.stale = True
+
+    def invalidate_user(self, user_id):
+        """
+        A user's profile / location changed: their own decks and every deck
+        that shows them carry stale scores, bios or distances.
+        """
+        uid = str(user_id)
+        self.invalidate_owner(uid)
+        for key in self._holders.get(uid, ()):
+            entry = self._feeds.get(key)
+            if entry:
+                entry.stale = True
+
+    # -------------------------------
+    # 🔹 Scheduled rebuilds
+    # -------------------------------
+    async def refresh_due(self, session_factory):
+        """Rebuild decks whose activity-tier TTL has passed; evict idle owners."""
+        now = datetime.now(timezone.utc)
+        due: Dict[str, List[FeedKey]] = {}
+
+        for owner_id, owner in list(self._owners.items()):
+            ttl = _ttl_for(owner.last_read_at, now)
+            if ttl is None:
+                for key in list(owner.keys):
+                    self._drop(key)
+                self._owners.pop(owner_id, None)
+                continue
+            for key in owner.keys:
+                entry = self._feeds.get(key)
+                if entry and (entry.stale or now - entry.built_at > ttl):
+                    due.setdefault(owner_id, []).append(key)
+
+        # one short session per owner: a slow or failing rebuild doesn't hold
+        # a connection (or poison a transaction) for everyone else's decks
+        for owner_id, keys in due.items():
+            try:
+                async with session_factory() as db:
+                    user = await db.scalar(select(User).where(User.id == owner_id))
+                    if user is None:
+                        continue
+                    for key in keys:
+                        entry = self._feeds.get(key)
+                        if not entry:
+                            continue
+                        try:
+                            await self._build(db, user, key, entry.params, now)
+                        except Exception as e:
+                            print(f"⚠️ Feed rebuild failed for {key}: {e}")
+                            self._drop(key)
+            except Exception as e:
+                print(f"⚠️ Feed refresh failed for owner {owner_id}: {e}")
+
+    def start_scheduler(self, session_factory):
+        if self._task and not self._task.done():
+            return self._task
+
+        async def _loop():
+            while True:
+                await asyncio.sleep(SCHEDULER_INTERVAL_SECONDS)
+                try:
+                    await self.refresh_due(session_factory)
+                except Exception as e:
+                    print(f"⚠️ Feed scheduler error: {e}")
+
+        self._task = asyncio.create_task(_loop())
+        return self._task
+
+
+discovery_feed = DiscoveryFeed()
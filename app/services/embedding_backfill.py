@@ -0,0 +1,190 @@
+# services/embedding_backfill.py
+#
+# Batched backfills for derived embedding columns. Run from app/:
+#
+#   python -m services.embedding_backfill [half|coarse|reembed ...]
+#
+# `reembed` regenerates every profile embedding (e.g. after changing
+# EMBEDDING_MODEL); `reembed-local` only the ones produced by the local
+# fallback provider while the remote one was down. Run this way, other app
+# processes pick the new vectors up on restart; run in-process, the
+# embedding index is updated as each batch commits.
+
+
+import asyncio
+import sys
+from sqlalchemy import cast, select, true, update
+from pgvector.sqlalchemy import HALFVEC  # type: ignore
+from models.profile_model import Profile
+from models.user_model import User
+from services.embedding_index import coarse_projection, embedding_index
+from services.embedding_providers import primary_embedding_provider
+from utils.prompts import make_embedding_text
+
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+async def backfill_half_embeddings(session_factory, batch_size: int = BACKFILL_BATCH_SIZE) -> int:
+    """
+    Fill profiles.embedding_half from profiles.embedding (cast in Postgres,
+    no vectors cross the wire). Keyset batches, one short transaction each,
+    so it can run against a live database; safe to re-run.
+    """
+    last_id = None
+    converted = 0
+
+    async with session_factory() as db:
+        while True:
+            batch = (
+                select(Profile.user_id)
+                .where(Profile.embedding.isnot(None), Profile.embedding_half.is_(None))
+                .order_by(Profile.user_id)
+                .limit(batch_size)
+            )
+            if last_id is not None:
+                batch = batch.where(Profile.user_id > last_id)
+
+            result = await db.execute(
+                update(Profile)
+                .where(Profile.user_id.in_(batch.scalar_subquery()))
+                .values(embedding_half=cast(Profile.embedding, HALFVEC(1536)))
+                .returning(Profile.user_id)
+                .execution_options(synchronize_session=False)
+            )
+            ids = result.scalars().all()
+            await db.commit()
+            if not ids:
+                break
+
+            converted += len(ids)
+            last_id = max(ids)
+            print(f"🔁 embedding_half backfilled: {converted}")
+
+    print(f"✅ embedding_half backfill done ({converted} profiles)")
+    return converted
+
+
+async def backfill_coarse_embeddings(session_factory, batch_size: int = BACKFILL_BATCH_SIZE) -> int:
+    """
+    Fill profiles.embedding_coarse (256-d projection) for existing rows.
+    The projection is computed in Python, so vectors are read in keyset
+    batches and written back with one executemany per batch.
+    """
+    last_id = None
+    projected = 0
+
+    async with session_factory() as db:
+        while True:
+            stmt = (
+                select(Profile.user_id, Profile.embedding)
+                .where(Profile.embedding.isnot(None), Profile.embedding_coarse.is_(None))
+                .order_by(Profile.user_id)
+                .limit(batch_size)
+            )
+            if last_id is not None:
+                stmt = stmt.where(Profile.user_id > last_id)
+
+            rows = (await db.execute(stmt)).all()
+            if not rows:
+                break
+
+            await db.execute(
+                update(Profile),
+                [
+                    {"user_id": user_id, "embedding_coarse": coarse_projection(embedding).tolist()}
+                    for user_id, embedding in rows
+                ],
+            )
+            await db.commit()
+
+            projected += len(rows)
+            last_id = rows[-1][0]
+            print(f"🔁 embedding_coarse backfilled: {projected}")
+
+    print(f"✅ embedding_coarse backfill done ({projected} profiles)")
+    return projected
+
+
+async def reembed_profiles(session_factory, batch_size: int = BACKFILL_BATCH_SIZE, only_local: bool = False) -> int:
+    """
+    Recompute profiles.embedding (+ halfvec copy and coarse projection) for
+    every processed profile with the configured provider (no local
+    fallback). Texts are rebuilt from the stored summary/traits/prompts, so
+    no chat calls are made; each keyset batch costs batch_size /
+    EMBEDDING_BATCH_SIZE embeddings requests instead of one per profile.
+    `only_local` limits it to profiles embedded by the local provider.
+    """
+    scope = Profile.embedding_model.like("local-%") if only_local else true()
+    last_id = None
+    embedded = 0
+
+    async with session_factory() as db:
+        while True:
+            stmt = (
+                select(
+                    Profile.user_id, Profile.ai_summary, Profile.mini_traits,
+                    Profile.raw_prompts, Profile.preferences,
+                    User.gender, User.age, User.is_active, User.is_profile_hidden,
+                )
+                .join(User, User.id == Profile.user_id)
+                .where(Profile.raw_prompts.isnot(None), Profile.ai_summary.isnot(None), scope)
+                .order_by(Profile.user_id)
+                .limit(batch_size)
+            )
+            if last_id is not None:
+                stmt = stmt.where(Profile.user_id > last_id)
+
+            rows = (await db.execute(stmt)).all()
+            if not rows:
+                break
+
+            vectors, model = await primary_embedding_provider.embed_many([
+                make_embedding_text(r.ai_summary, r.mini_traits, r.raw_prompts, r.preferences)
+                for r in rows
+            ])
+            await db.execute(
+                update(Profile),
+                [
+                    {
+                        "user_id": r.user_id,
+                        "embedding": vector,
+                        "embedding_half": vector,
+                        "embedding_coarse": coarse_projection(vector).tolist(),
+                        "embedding_model": model,
+                    }
+                    for r, vector in zip(rows, vectors)
+                ],
+            )
+            await db.commit()
+
+            # in-process matrix (when run inside the app): replaces fallback-space rows
+            for r, vector in zip(rows, vectors):
+                if r.is_active and not r.is_profile_hidden:
+                    embedding_index.upsert(r.user_id, vector, gender=r.gender, age=r.age)
+
+            embedded += len(rows)
+            last_id = rows[-1].user_id
+            print(f"🔁 profiles re-embedded: {embedded} (last {last_id})")
+
+    print(f"✅ re-embed done ({embedded} profiles)")
+    return embedded
+
+
+JOBS = {
+    "half": backfill_half_embeddings,
+    "coarse": backfill_coarse_embeddings,
+    "reembed": reembed_profiles,
+    "reembed-local": lambda session_factory: reembed_profiles(session_factory, only_local=True),
+}
+DEFAULT_JOBS = ["half", "coarse"]   # reembed costs API calls: run it explicitly
+
+
+async def run(names, session_factory):
+    for name in names:
+        await JOBS[name](session_factory)
+
+
+if __name__ == "__main__":
+    from db.session import async_session
+    asyncio.run(run(sys.argv[1:] or DEFAULT_JOBS, async_session))
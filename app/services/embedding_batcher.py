@@ -0,0 +1,114 @@
+# services/embedding_batcher.py
+
+
+import asyncio
+from typing import Dict, List, Optional, Sequence, Tuple
+from services.ai_gateway import ai_gateway
+from utils.config import settings
+
+
+class EmbeddingBatcher:
+    """
+    Micro-batching front for the gateway's `embeddings` call.
+
+    Callers `await embed(text)` as if it were a single request; texts are
+    collected for up to `window` seconds (or until `max_batch` are waiting)
+    and sent as ONE request with an array input. Each caller's future gets
+    its own vector back (`data[i].index` -> caller), or the request's
+    exception if it failed. Identical texts in a batch are embedded once.
+
+    `embed_many` is the bulk path (backfills): pre-chunked requests with
+    bounded concurrency, no window.
+    """
+
+    def __init__(
+        self,
+        gateway,
+        model: str,
+        max_batch: int = settings.EMBEDDING_BATCH_SIZE,
+        window: float = settings.EMBEDDING_BATCH_WINDOW_MS / 1000,
+        concurrency: int = settings.EMBEDDING_BATCH_CONCURRENCY,
+    ):
+        self.gateway = gateway
+        self.model = model
+        self.max_batch = max_batch
+        self.window = window
+        self.concurrency = concurrency
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._inflight: set = set()
+
+    async def _request(self, texts: Sequence[str]) -> List[List[float]]:
+        response = await self.gateway.embeddings(
+            site="embeddings",
+            model=self.model,
+            input=list(texts),
+            encoding_format="float",
+        )
+        vectors: List[Optional[List[float]]] = [None] * len(texts)
+        for item in response.data:
+            vectors[item.index] = item.embedding
+        if any(v is None for v in vectors):
+            raise RuntimeError("Embeddings response is missing inputs")
+        return vectors
+
+    # -------------------------------
+    # 🔹 Online path (request handlers)
+    # -------------------------------
+    async def embed(self, text: str) -> List[float]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending[: self.max_batch], self._pending[self.max_batch:]
+        if self._pending:
+            self._timer = asyncio.get_running_loop().call_later(self.window, self._flush)
+        if batch:
+            task = asyncio.create_task(self._send(batch))
+            self._inflight.add(task)   # keep a reference until it finishes
+            task.add_done_callback(self._inflight.discard)
+
+    async def _send(self, batch: List[Tuple[str, asyncio.Future]]):
+        unique: Dict[str, int] = {}
+        for text, _ in batch:
+            unique.setdefault(text, len(unique))
+
+        try:
+            vectors = await self._request(list(unique))
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for text, future in batch:
+            if not future.done():   # caller may have been cancelled
+                future.set_result(vectors[unique[text]])
+
+    # -------------------------------
+    # 🔹 Bulk path (backfills / re-embeds)
+    # -------------------------------
+    async def embed_many(self, texts: Sequence[str]) -> List[List[float]]:
+        """Embed every text in order: max_batch inputs per request, `concurrency` at a time."""
+        semaphore = asyncio.Semaphore(self.concurrency)
+        chunks = [texts[i:i + self.max_batch] for i in range(0, len(texts), self.max_batch)]
+
+        async def run(chunk):
+            async with semaphore:
+                return await self._request(chunk)
+
+        results = await asyncio.gather(*(run(c) for c in chunks))
+        return [vector for chunk in results for vector in chunk]
+
+
+embedding_batcher = EmbeddingBatcher(ai_gateway, settings.EMBEDDING_MODEL)
@@ -0,0 +1,111 @@
+# services/embedding_cache.py
+
+
+import asyncio
+import hashlib
+import json
+from datetime import datetime, timedelta, timezone
+from typing import List
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.profile_model import EmbeddingCache
+from services.embedding_batcher import embedding_batcher
+from utils.config import settings
+from services.ai_metrics import ai_metrics
+
+
+PRUNE_INTERVAL_SECONDS = 6 * 3600
+TOUCH_AFTER = timedelta(hours=1)   # don't rewrite last_used_at on every hit
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def prompts_hash(raw_prompts) -> str:
+    """Stable hash of a raw_prompts dict (key order doesn't matter)."""
+    return text_hash(json.dumps(raw_prompts or {}, sort_keys=True, ensure_ascii=False))
+
+
+async def cached_embedding(db: AsyncSession, text: str, model: str = settings.EMBEDDING_MODEL) -> List[float]:
+    """
+    Embedding for `text`, from embedding_cache when this exact input was
+    embedded before with `model` (no network call), otherwise via the
+    batcher and stored. Does not commit; the caller's commit persists it.
+    """
+    if not settings.EMBEDDING_CACHE_ENABLED:
+        return await embedding_batcher.embed(text)
+
+    key = text_hash(text)
+    now = datetime.now(timezone.utc)
+    hit = (await db.execute(
+        select(EmbeddingCache.embedding, EmbeddingCache.last_used_at)
+        .where(EmbeddingCache.text_hash == key, EmbeddingCache.model == model)
+    )).first()
+
+    if hit is not None:
+        ai_metrics.record_event("embeddings", "cache_hit")
+        if hit.last_used_at is None or now - hit.last_used_at > TOUCH_AFTER:
+            await db.execute(
+                update(EmbeddingCache)
+                .where(EmbeddingCache.text_hash == key, EmbeddingCache.model == model)
+                .values(last_used_at=now)
+            )
+        return list(hit.embedding)
+
+    embedding = await embedding_batcher.embed(text)
+    await db.execute(
+        insert(EmbeddingCache)
+        .values(text_hash=key, model=model, embedding=embedding, last_used_at=now)
+        .on_conflict_do_update(
+            index_elements=[EmbeddingCache.text_hash, EmbeddingCache.model],
+            set_={"embedding": embedding, "last_used_at": now},
+        )
+    )
+    return embedding
+
+
+# -------------------------------
+# 🔹 Eviction
+# -------------------------------
+async def prune_embedding_cache(db: AsyncSession) -> int:
+    """Drop entries unused for EMBEDDING_CACHE_TTL_DAYS, then the LRU tail beyond MAX_ROWS."""
+    cutoff = datetime.now(timezone.utc) - timedelta(days=settings.EMBEDDING_CACHE_TTL_DAYS)
+    expired = await db.execute(delete(EmbeddingCache).where(EmbeddingCache.last_used_at < cutoff))
+    removed = expired.rowcount or 0
+
+    total = await db.scalar(select(func.count()).select_from(EmbeddingCache))
+    overflow = (total or 0) - settings.EMBEDDING_CACHE_MAX_ROWS
+    if overflow > 0:
+        lru = (
+            select(EmbeddingCache.text_hash, EmbeddingCache.model)
+            .order_by(EmbeddingCache.last_used_at)
+            .limit(overflow)
+            .subquery()
+        )
+        evicted = await db.execute(
+            delete(EmbeddingCache).where(
+                EmbeddingCache.text_hash == lru.c.text_hash,
+                EmbeddingCache.model == lru.c.model,
+            )
+        )
+        removed += evicted.rowcount or 0
+
+    await db.commit()
+    return removed
+
+
+def start_cache_pruner(session_factory) -> asyncio.Task:
+    async def loop():
+        while True:
+            try:
+                async with session_factory() as db:
+                    removed = await prune_embedding_cache(db)
+                if removed:
+                    print(f"🧹 embedding cache pruned: {removed} entries")
+            except Exception as e:
+                print(f"⚠️ embedding cache prune failed: {e}")
+            await asyncio.sleep(PRUNE_INTERVAL_SECONDS)
+
+    return asyncio.create_task(loop())
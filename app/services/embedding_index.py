@@ -0,0 +1,378 @@
+# services/embedding_index.py
+
+
+import asyncio
+from typing import Iterable, Optional, Tuple
+import numpy as np
+from sqlalchemy import select
+from models.user_model import User
+from models.profile_model import Profile
+from utils.config import settings
+from utils.gender import canonical_gender
+from services.embedding_providers import comparable_embedding
+
+
+EMBEDDING_DIM = 1536
+COARSE_DIM = 256           # leading dims of text-embedding-3 vectors (Matryoshka-trained)
+LOAD_BATCH_SIZE = 5000
+SCORE_CHUNK_ROWS = 65536   # float16 / int8 rows are upcast to float32 in chunks this size
+INT8_MAX = 127
+
+
+def coarse_projection(embedding, dim: int = COARSE_DIM) -> np.ndarray:
+    """
+    Low-dimensional projection for the coarse retrieval stage: prefix
+    truncation of the text-embedding-3 vector, re-normalized to unit length.
+    """
+    v = np.asarray(embedding, dtype=np.float32).reshape(-1)[:dim]
+    norm = np.linalg.norm(v)
+    return v / norm if norm > 0 else v
+
+
+class EmbeddingIndex:
+    """
+    In-process matrix of active users' (L2-normalized) profile embeddings.
+
+    - row i holds the embedding of `self._ids[i]`
+    - `self._rows` maps user_id -> row
+    - removed rows are zeroed, masked out via `self._live` and recycled
+      through `self._free`
+    - dtype "int8" stores symmetric scalar-quantized rows with a per-row
+      scale in `self._scales` (4x smaller than float32)
+    - `self._coarse` holds the COARSE_DIM projection of every row for
+      two-stage `top_k(..., shortlist=n)`
+    - `self._gender` (canonical gender code) and `self._age` partition the
+      rows, so filtered `top_k(..., genders=, age_range=)` only scores the
+      matching sub-matrix and is exact regardless of selectivity
+
+    Because rows are unit length, `matrix @ query` is cosine similarity,
+    so scoring a whole candidate batch is a single BLAS mat-vec.
+    """
+
+    def __init__(self, dim: int = EMBEDDING_DIM, dtype: str = "float32"):
+        self.dim = dim
+        self.dtype = np.dtype(dtype)
+        self._matrix = np.zeros((0, dim), dtype=self.dtype)
+        self._scales = np.zeros(0, dtype=np.float32)
+        self._coarse = np.zeros((0, COARSE_DIM), dtype=np.float32)
+        self._gender = np.zeros(0, dtype=np.int16)
+        self._age = np.zeros(0, dtype=np.int16)
+        self._gender_codes: dict[str, int] = {}
+        self._ids: list[Optional[str]] = []
+        self._live = np.zeros(0, dtype=bool)
+        self._written = np.zeros(0, dtype=np.int64)   # per row: `_writes` value of its last write
+        self._writes = 0
+        self._rows: dict[str, int] = {}
+        self._free: list[int] = []
+        self._load_task: Optional[asyncio.Task] = None
+        self._touched: Optional[set] = None   # user ids written during a `load()`
+        self.ready = False
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, user_id) -> bool:
+        return str(user_id) in self._rows
+
+    # -------------------------------
+    # 🔹 Internal helpers
+    # -------------------------------
+    def _normalize(self, vec) -> np.ndarray:
+        v = np.asarray(vec, dtype=np.float32).reshape(-1)
+        if v.shape[0] != self.dim:
+            raise ValueError(f"Expected {self.dim}-d embedding, got {v.shape[0]}")
+        norm = np.linalg.norm(v)
+        return v / norm if norm > 0 else v
+
+    def _grow(self):
+        capacity = max(1024, self._matrix.shape[0] * 2)
+        grown = np.zeros((capacity, self.dim), dtype=self.dtype)
+        grown[: self._matrix.shape[0]] = self._matrix
+        live = np.zeros(capacity, dtype=bool)
+        live[: self._live.shape[0]] = self._live
+        self._live = live
+        written = np.zeros(capacity, dtype=np.int64)
+        written[: self._written.shape[0]] = self._written
+        self._written = written
+        scales = np.zeros(capacity, dtype=np.float32)
+        scales[: self._scales.shape[0]] = self._scales
+        self._scales = scales
+        coarse = np.zeros((capacity, COARSE_DIM), dtype=np.float32)
+        coarse[: self._coarse.shape[0]] = self._coarse
+        self._coarse = coarse
+        gender = np.full(capacity, -1, dtype=np.int16)
+        gender[: self._gender.shape[0]] = self._gender
+        self._gender = gender
+        age = np.zeros(capacity, dtype=np.int16)
+        age[: self._age.shape[0]] = self._age
+        self._age = age
+        self._free.extend(range(capacity - 1, self._matrix.shape[0] - 1, -1))
+        self._ids.extend([None] * (capacity - self._matrix.shape[0]))
+        self._matrix = grown
+
+    def _store_row(self, row: int, vec: np.ndarray):
+        if self.dtype == np.int8:
+            peak = float(np.abs(vec).max())
+            scale = peak / INT8_MAX if peak > 0 else 0.0
+            self._scales[row] = scale
+            self._matrix[row] = np.rint(vec / scale) if scale else 0
+        else:
+            self._matrix[row] = vec
+
+    def _matvec(self, matrix: np.ndarray, query: np.ndarray, scales: Optional[np.ndarray] = None) -> np.ndarray:
+        if matrix.dtype == np.float32:
+            return matrix @ query
+        out = np.empty(matrix.shape[0], dtype=np.float32)
+        for start in range(0, matrix.shape[0], SCORE_CHUNK_ROWS):
+            chunk = matrix[start:start + SCORE_CHUNK_ROWS].astype(np.float32)
+            out[start:start + SCORE_CHUNK_ROWS] = chunk @ query
+        if matrix.dtype == np.int8:
+            out *= scales
+        return out
+
+    def _gender_code(self, gender: Optional[str]) -> int:
+        key = canonical_gender(gender)
+        if key is None:
+            return -1
+        return self._gender_codes.setdefault(key, len(self._gender_codes))
+
+    def _gender_filter(self, genders: Optional[Iterable[str]]) -> Optional[list]:
+        if genders is None:
+            return None
+        return [self._gender_codes[g] for g in map(canonical_gender, genders) if g in self._gender_codes]
+
+    # -------------------------------
+    # 🔹 Incremental updates
+    # -------------------------------
+    def set_partition(self, user_id, gender: Optional[str], age: Optional[int]):
+        """Gender / age changed without a new embedding."""
+        row = self._rows.get(str(user_id))
+        if row is not None:
+            self._gender[row] = self._gender_code(gender)
+            self._age[row] = age or 0
+
+    def upsert(self, user_id, embedding, gender: Optional[str] = None, age: Optional[int] = None):
+        """Insert or replace a user's embedding (call after the DB commit)."""
+        if embedding is None:
+            self.remove(user_id)
+            return
+        uid = str(user_id)
+        if self._touched is not None:
+            self._touched.add(uid)
+        self._upsert(uid, embedding, gender, age)
+
+    def _touch(self, row: int):
+        self._writes += 1
+        self._written[row] = self._writes
+
+    def _upsert(self, uid: str, embedding, gender: Optional[str], age: Optional[int]):
+        row = self._rows.get(uid)
+        if row is None:
+            if not self._free:
+                self._grow()
+            row = self._free.pop()
+            self._rows[uid] = row
+            self._ids[row] = uid
+            self._live[row] = True
+        self._touch(row)
+
+        vec = self._normalize(embedding)
+        self._store_row(row, vec)
+        self._coarse[row] = coarse_projection(vec)
+        self._gender[row] = self._gender_code(gender)
+        self._age[row] = age or 0
+
+    def remove(self, user_id):
+        """Drop a user (profile hidden / deactivated / deleted)."""
+        uid = str(user_id)
+        if self._touched is not None:
+            self._touched.add(uid)
+        row = self._rows.pop(uid, None)
+        if row is None:
+            return
+        self._touch(row)
+        self._matrix[row] = 0
+        self._scales[row] = 0
+        self._coarse[row] = 0
+        self._gender[row] = -1
+        self._age[row] = 0
+        self._ids[row] = None
+        self._live[row] = False
+        self._free.append(row)
+
+    def sync_user(self, user, embedding=None):
+        """Keep the index consistent with a user's visibility flags."""
+        if not user.is_active or user.is_profile_hidden:
+            self.remove(user.id)
+        elif embedding is not None:
+            self.upsert(user.id, embedding, gender=user.gender, age=user.age)
+        else:
+            self.set_partition(user.id, user.gender, user.age)
+
+    # -------------------------------
+    # 🔹 Scoring
+    # -------------------------------
+    def vector(self, user_id) -> Optional[np.ndarray]:
+        row = self._rows.get(str(user_id))
+        if row is None:
+            return None
+        vec = self._matrix[row].astype(np.float32)
+        if self.dtype == np.int8:
+            vec *= self._scales[row]
+        return vec
+
+    def similarities(self, query, user_ids: Iterable) -> np.ndarray:
+        """
+        Cosine similarity of `query` to each of `user_ids`, in order.
+        Users not in the index score NaN.
+        """
+        q = self._normalize(query)
+        rows = np.array([self._rows.get(str(u), -1) for u in user_ids], dtype=np.int64)
+        out = np.full(rows.shape[0], np.nan, dtype=np.float32)
+        known = rows >= 0
+        if known.any():
+            picked = rows[known]
+            out[known] = self._matvec(self._matrix[picked], q, self._scales[picked])
+        return out
+
+    async def top_k(
+        self,
+        query,
+        k: int,
+        exclude: Optional[set] = None,
+        shortlist: int = 0,
+        genders: Optional[Iterable[str]] = None,
+        age_range: Optional[Tuple[int, int]] = None,
+    ) -> list[tuple[str, float]]:
+        """
+        Return up to k (user_id, similarity) pairs, most similar first.
+
+        shortlist > 0 makes it two-stage: the best `shortlist` rows by the
+        COARSE_DIM projection (~6x less memory traffic than a full pass),
+        re-ranked by full-precision similarity.
+
+        genders / age_range restrict scoring to that partition (exact, so a
+        selective filter never costs recall).
+
+        The scoring runs in a worker thread (NumPy releases the GIL), on the
+        arrays as they are when the call starts. Rows upserted / removed
+        while it runs (possibly recycled for another user) are dropped from
+        the result, so a score is never reported under the wrong id.
+        """
+        if not self._rows or k <= 0:
+            return []
+
+        q = self._normalize(query)
+        excluded = [row for row in map(self._rows.get, map(str, exclude or ())) if row is not None]
+        arrays = (self._matrix, self._scales, self._coarse, self._live, self._gender, self._age)
+        started_at = self._writes
+        top, scores = await asyncio.to_thread(
+            self._score, arrays, q, min(k, len(self._rows)), excluded, shortlist,
+            self._gender_filter(genders), age_range,
+        )
+        ids = self._ids
+        return [
+            (ids[i], float(score))
+            for i, score in zip(top, scores)
+            if ids[i] is not None and np.isfinite(score) and self._written[i] <= started_at
+        ]
+
+    def _score(self, arrays, q, k, excluded, shortlist, gender_codes, age_range):
+        matrix, scales, coarse_matrix, live, gender, age = arrays
+
+        part = None
+        if gender_codes is not None or age_range is not None:
+            allowed = live.copy()
+            if gender_codes is not None:
+                allowed &= np.isin(gender, gender_codes)
+            if age_range is not None:
+                allowed &= (age >= age_range[0]) & (age <= age_range[1])
+            part = np.flatnonzero(allowed)
+            if not len(part):
+                return [], []
+
+        def mask(scores):
+            scores[~live] = -np.inf   # empty rows must never win
+            scores[excluded] = -np.inf
+
+        if shortlist:
+            if part is None:
+                coarse = coarse_matrix @ coarse_projection(q)
+            else:
+                coarse = np.full(coarse_matrix.shape[0], -np.inf, dtype=np.float32)
+                coarse[part] = coarse_matrix[part] @ coarse_projection(q)
+            mask(coarse)
+            n = min(max(shortlist, k), coarse.shape[0])
+            rows = np.argpartition(-coarse, n - 1)[:n]
+            rows = rows[np.isfinite(coarse[rows])]
+            scores = np.full(matrix.shape[0], -np.inf, dtype=np.float32)
+            scores[rows] = self._matvec(matrix[rows], q, scales[rows])
+        elif part is None:
+            scores = self._matvec(matrix, q, scales)
+            mask(scores)
+        else:
+            scores = np.full(matrix.shape[0], -np.inf, dtype=np.float32)
+            scores[part] = self._matvec(matrix[part], q, scales[part])
+            mask(scores)
+
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return top.tolist(), scores[top].tolist()
+
+    # -------------------------------
+    # 🔹 Bulk load
+    # -------------------------------
+    async def load(self, session_factory):
+        """Stream every active, visible embedding from the DB (keyset batches)."""
+        last_id = None
+        loaded = 0
+        self._touched = set()   # written by upsert/remove while loading: newer than the snapshot
+
+        async with session_factory() as db:
+            while True:
+                stmt = (
+                    select(Profile.user_id, Profile.embedding, User.gender, User.age)
+                    .join(User, User.id == Profile.user_id)
+                    .where(
+                        User.is_active.is_(True),
+                        User.is_profile_hidden.is_(False),
+                        Profile.embedding.isnot(None),
+                        comparable_embedding(),
+                    )
+                    .order_by(Profile.user_id)
+                    .limit(LOAD_BATCH_SIZE)
+                )
+                if last_id is not None:
+                    stmt = stmt.where(Profile.user_id > last_id)
+
+                rows = (await db.execute(stmt)).all()
+                if not rows:
+                    break
+
+                for user_id, embedding, gender, age in rows:
+                    if str(user_id) not in self._touched:
+                        self._upsert(str(user_id), embedding, gender, age)
+
+                loaded += len(rows)
+                last_id = rows[-1][0]
+
+        self._touched = None
+        self.ready = True
+        print(f"✅ Embedding index loaded ({loaded} profiles)")
+
+    def start_background_load(self, session_factory):
+        """Kick off `load()` without blocking startup; modes fall back to SQL until ready."""
+        if self._load_task and not self._load_task.done():
+            return self._load_task
+
+        async def _run():
+            try:
+                await self.load(session_factory)
+            except Exception as e:
+                print(f"⚠️ Embedding index load failed: {e}")
+
+        self._load_task = asyncio.create_task(_run())
+        return self._load_task
+
+
+embedding_index = EmbeddingIndex(dtype=settings.EMBEDDING_INDEX_DTYPE)
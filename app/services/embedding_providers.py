@@ -0,0 +1,165 @@
+# services/embedding_providers.py
+
+
+import hashlib
+import re
+from functools import lru_cache
+from typing import List, Optional, Sequence, Tuple
+import numpy as np
+from sqlalchemy import or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.profile_model import Profile
+from utils.config import settings
+from services.ai_gateway import AIUnavailable, is_transient
+from services.ai_metrics import ai_metrics
+from services.embedding_batcher import embedding_batcher
+from services.embedding_cache import cached_embedding
+
+
+EMBEDDING_DIM = 1536
+LOCAL_EMBEDDING_MODEL = "local-hash-1536-v1"   # stored in profiles.embedding_model
+TOKEN_RE = re.compile(r"[a-z0-9']+")
+
+Embedded = Tuple[List[float], str]   # (vector, model that produced it)
+
+
+class EmbeddingProvider:
+    """
+    Where profile embeddings come from. `embed` is the online path
+    (run_ai_profile_process), `embed_many` the bulk one (backfills); both
+    also return the model name so profiles record which space they're in.
+    """
+
+    model: str
+    local = False
+
+    async def embed(self, db: AsyncSession, text: str) -> Embedded:
+        raise NotImplementedError
+
+    async def embed_many(self, texts: Sequence[str]) -> Tuple[List[List[float]], str]:
+        raise NotImplementedError
+
+
+class RemoteEmbeddingProvider(EmbeddingProvider):
+    """The provider API behind the gateway: content-hash cache, then the micro-batcher."""
+
+    def __init__(self, model: str = settings.EMBEDDING_MODEL):
+        self.model = model
+
+    async def embed(self, db: AsyncSession, text: str) -> Embedded:
+        return await cached_embedding(db, text, self.model), self.model
+
+    async def embed_many(self, texts: Sequence[str]) -> Tuple[List[List[float]], str]:
+        return await embedding_batcher.embed_many(texts), self.model
+
+
+@lru_cache(maxsize=200_000)
+def _feature(token: str) -> Tuple[int, float]:
+    digest = hashlib.blake2b(token.encode(), digest_size=8).digest()
+    value = int.from_bytes(digest, "big")
+    return value % EMBEDDING_DIM, 1.0 if value >> 63 else -1.0
+
+
+class LocalHashingEmbeddingProvider(EmbeddingProvider):
+    """
+    Deterministic CPU embeddings: signed feature hashing of word unigrams and
+    bigrams into 1536 dims, sublinear term weights, L2-normalised. No
+    network, no model files; texts sharing words land close together, which
+    is enough for CI, load tests and degraded mode. Not comparable with the
+    remote model's vectors: profiles record embedding_model, retrieval skips
+    them (`comparable_embedding`) and `embedding_backfill reembed-local`
+    moves them back.
+    """
+
+    local = True
+
+    def __init__(self, model: str = LOCAL_EMBEDDING_MODEL):
+        self.model = model
+
+    def vector(self, text: str) -> np.ndarray:
+        tokens = TOKEN_RE.findall((text or "").lower())
+        features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        if not features:
+            features = [f"<empty:{text}>"]   # still a unit vector (cosine distance needs one)
+
+        hashed = [_feature(f) for f in features]
+        index = np.fromiter((i for i, _ in hashed), dtype=np.int64, count=len(hashed))
+        sign = np.fromiter((s for _, s in hashed), dtype=np.float32, count=len(hashed))
+        vector = np.zeros(EMBEDDING_DIM, dtype=np.float32)
+        np.add.at(vector, index, sign)
+        vector = np.sign(vector) * np.log1p(np.abs(vector))
+        norm = np.linalg.norm(vector)
+        if norm == 0:   # every feature cancelled out
+            vector[index[0]] = norm = 1.0
+        return vector / norm
+
+    async def embed(self, db: AsyncSession, text: str) -> Embedded:
+        return self.vector(text).tolist(), self.model
+
+    async def embed_many(self, texts: Sequence[str]) -> Tuple[List[List[float]], str]:
+        return [self.vector(t).tolist() for t in texts], self.model
+
+
+class FallbackEmbeddingProvider(EmbeddingProvider):
+    """`primary`, or `fallback` when the remote provider is down (circuit open / transient errors)."""
+
+    def __init__(self, primary: EmbeddingProvider, fallback: EmbeddingProvider):
+        self.primary = primary
+        self.fallback = fallback
+        self.model = primary.model
+
+    def _should_fall_back(self, e: Exception) -> bool:
+        return isinstance(e, AIUnavailable) or is_transient(e)
+
+    async def embed(self, db: AsyncSession, text: str) -> Embedded:
+        try:
+            return await self.primary.embed(db, text)
+        except Exception as e:
+            if not self._should_fall_back(e):
+                raise
+            print(f"⚠️ Embedding provider unavailable, using {self.fallback.model}: {e}")
+            ai_metrics.record_event("embeddings", "fallback")
+            return await self.fallback.embed(db, text)
+
+    async def embed_many(self, texts: Sequence[str]) -> Tuple[List[List[float]], str]:
+        try:
+            return await self.primary.embed_many(texts)
+        except Exception as e:
+            if not self._should_fall_back(e):
+                raise
+            ai_metrics.record_event("embeddings", "fallback", len(texts))
+            return await self.fallback.embed_many(texts)
+
+
+PROVIDERS = {
+    "remote": RemoteEmbeddingProvider,
+    "local": LocalHashingEmbeddingProvider,
+}
+
+
+def _configured() -> EmbeddingProvider:
+    if settings.EMBEDDING_PROVIDER not in PROVIDERS:
+        raise ValueError(f"Unknown EMBEDDING_PROVIDER '{settings.EMBEDDING_PROVIDER}'")
+    return PROVIDERS[settings.EMBEDDING_PROVIDER]()
+
+
+primary_embedding_provider = _configured()   # backfills: never degrade silently
+embedding_provider = (
+    FallbackEmbeddingProvider(primary_embedding_provider, LocalHashingEmbeddingProvider())
+    if settings.EMBEDDING_LOCAL_FALLBACK and not primary_embedding_provider.local
+    else primary_embedding_provider
+)
+
+
+def is_comparable(model: Optional[str]) -> bool:
+    """Vector in the configured provider's space (None: rows from before embedding_model existed)."""
+    return model is None or model == primary_embedding_provider.model
+
+
+def comparable_embedding():
+    """
+    SQL condition for profiles whose embedding retrieval may use: fallback
+    vectors written in degraded mode live in another space and stay out of
+    every ranking until they are re-embedded.
+    """
+    return or_(Profile.embedding_model.is_(None), Profile.embedding_model == primary_embedding_provider.model)
@@ -0,0 +1,157 @@
+# services/exclusion_index.py
+
+
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Set
+import numpy as np
+from sqlalchemy import select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.match_model import Match, Swipe
+from models.block_model import UserBlock
+
+
+MAX_CACHED_USERS = 50_000
+COMPACT_AFTER = 64      # pending adds merged into the sorted array past this size
+
+
+class UserOrdinals:
+    """
+    Process-local compact int ordinal per user UUID (assigned on first sight).
+
+    Never evicted (ordinals must stay stable while any ExclusionSet holds
+    them), so it is bounded by the number of distinct user ids the process
+    has seen, i.e. the users table: roughly 150 bytes per user.
+    """
+
+    def __init__(self):
+        self._ordinals: Dict[str, int] = {}
+        self._ids: List[str] = []
+
+    def of(self, user_id) -> int:
+        uid = str(user_id)
+        ordinal = self._ordinals.get(uid)
+        if ordinal is None:
+            ordinal = len(self._ordinals)
+            self._ordinals[uid] = ordinal
+            self._ids.append(uid)
+        return ordinal
+
+    def many(self, user_ids: Iterable) -> np.ndarray:
+        return np.fromiter((self.of(u) for u in user_ids), dtype=np.int32)
+
+    def ids(self, ordinals: np.ndarray) -> List[str]:
+        return [self._ids[o] for o in ordinals]
+
+
+class ExclusionSet:
+    """
+    Sorted int32 ordinal array + small pending set.
+    Membership is O(1) for fresh adds and O(log n) otherwise; `mask()`
+    tests a whole candidate batch in one vectorized call.
+    """
+
+    def __init__(self, ordinals: np.ndarray):
+        self._sorted = np.unique(ordinals.astype(np.int32))
+        self._pending: Set[int] = set()
+
+    def __len__(self) -> int:
+        return len(self._sorted) + len(self._pending)
+
+    def _compact(self):
+        if self._pending:
+            merged = np.fromiter(self._pending, dtype=np.int32, count=len(self._pending))
+            self._sorted = np.union1d(self._sorted, merged)
+            self._pending.clear()
+
+    def add(self, ordinal: int):
+        self._pending.add(ordinal)
+        if len(self._pending) > COMPACT_AFTER:
+            self._compact()
+
+    def contains(self, ordinal: int) -> bool:
+        if ordinal in self._pending:
+            return True
+        i = np.searchsorted(self._sorted, ordinal)
+        return i < len(self._sorted) and self._sorted[i] == ordinal
+
+    def ordinals(self) -> np.ndarray:
+        self._compact()
+        return self._sorted
+
+    def mask(self, ordinals: np.ndarray) -> np.ndarray:
+        """Boolean array: True where the candidate is excluded."""
+        self._compact()
+        return np.isin(ordinals, self._sorted, assume_unique=False)
+
+
+class ExclusionIndex:
+    """
+    Per-user set of people who must never appear in their decks:
+    swiped (left or right, not undone), actively matched, blocked either
+    way, or hidden by them. Loaded with one UNION query on first use, then
+    patched as swipes / matches / blocks happen.
+    """
+
+    def __init__(self):
+        self.ordinals = UserOrdinals()
+        self._sets: "OrderedDict[str, ExclusionSet]" = OrderedDict()
+
+    async def _load(self, db: AsyncSession, uid: str) -> ExclusionSet:
+        stmt = union_all(
+            select(Swipe.swiped_id).where(Swipe.swiper_id == uid, Swipe.undone.is_(False)),
+            select(Match.target_id).where(Match.user_id == uid, Match.is_active.is_(True)),
+            select(Match.user_id).where(Match.target_id == uid, Match.is_active.is_(True)),
+            select(UserBlock.blocked_id).where(UserBlock.blocker_id == uid),
+            select(UserBlock.blocker_id).where(
+                UserBlock.blocked_id == uid, UserBlock.hide_only.is_(False)
+            ),
+        )
+        rows = (await db.execute(stmt)).all()
+        return ExclusionSet(self.ordinals.many(r[0] for r in rows))
+
+    async def get(self, db: AsyncSession, user_id) -> ExclusionSet:
+        uid = str(user_id)
+        excluded = self._sets.get(uid)
+        if excluded is None:
+            excluded = await self._load(db, uid)
+            self._sets[uid] = excluded
+            if len(self._sets) > MAX_CACHED_USERS:
+                self._sets.popitem(last=False)
+        else:
+            self._sets.move_to_end(uid)
+        return excluded
+
+    async def excluded_ids(self, db: AsyncSession, user_id) -> List[str]:
+        """The user's exclusions as id strings (pushed into retrieval queries)."""
+        excluded = await self.get(db, user_id)
+        return self.ordinals.ids(excluded.ordinals())
+
+    async def filter(self, db: AsyncSession, user_id, candidates: List, key=lambda c: c.id) -> List:
+        """Drop excluded candidates from an already-fetched batch (order kept)."""
+        if not candidates:
+            return candidates
+        excluded = await self.get(db, user_id)
+        if not len(excluded):
+            return list(candidates)
+        drop = excluded.mask(self.ordinals.many(key(c) for c in candidates))
+        return [c for c, d in zip(candidates, drop) if not d]
+
+    # -------------------------------
+    # 🔹 Event hooks
+    # -------------------------------
+    def exclude(self, user_id, other_id):
+        """user_id must no longer see other_id (only patches already-loaded sets)."""
+        excluded = self._sets.get(str(user_id))
+        if excluded is not None:
+            excluded.add(self.ordinals.of(other_id))
+
+    def exclude_pair(self, user_a, user_b):
+        self.exclude(user_a, user_b)
+        self.exclude(user_b, user_a)
+
+    def invalidate(self, user_id: Optional[str]):
+        """Something was undone (undo swipe / unblock): reload on next use."""
+        self._sets.pop(str(user_id), None)
+
+
+exclusion_index = ExclusionIndex()
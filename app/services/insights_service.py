@@ -2,18 +2,29 @@
 
 
 
-from typing import Optional, Dict, Any
-from sqlalchemy import select
+import asyncio
+import json
+from typing import Optional, Dict, Any, List
+import numpy as np
+from sqlalchemy import select, case, or_, and_
 from sqlalchemy.ext.asyncio import AsyncSession
 from utils.prompts import (
-    AI_PROFILE_SYSTEM_PROMPT, make_compatibility_user_prompt,
-    STARTER_SYSTEM_PROMPT, make_starter_user_prompt
+    AI_PROFILE_SYSTEM_PROMPT, make_compatibility_user_prompt, COMPATIBILITY_PROMPT_VERSION,
+    STARTER_SYSTEM_PROMPT, make_starter_user_prompt, STARTER_PROMPT_VERSION,
+    BATCH_INSIGHTS_SYSTEM_PROMPT, make_batch_insights_user_prompt
 )
 from models.profile_model import Profile
 from models.message_model import Message
 from models.user_model import User, UserMedia # adjust imports to your project layout
-from db.session import client  # your OpenAI client wrapper used earlier
+from services.ai_gateway import ai_gateway
+from services.ai_metrics import ai_metrics
 from utils.socket_manager import manager  # if you expose online status; adjust import
+from services.llm_cache import llm_cache, profile_version
+from services.vector_search import embedding_similarity
+from services.embedding_providers import comparable_embedding
+from services.sampling import sample_users, session_seed
+from utils.location import haversine_distances
+from utils.config import settings
 
 
 # ---- helper queries ----
@@ -21,20 +32,6 @@ async def _fetch_profile(db: AsyncSession, user_id: str) -> Optional[Profile]:
     res = await db.execute(select(Profile).where(Profile.user_id == user_id))
     return res.scalar_one_or_none()
 
-async def _fetch_user(db: AsyncSession, user_id: str) -> Optional[User]:
-    res = await db.execute(select(User).where(User.id == user_id))
-    return res.scalar_one_or_none()
-
-async def _fetch_avatar(db: AsyncSession, user_id: str) -> Optional[str]:
-    res = await db.execute(
-        select(UserMedia.file_path)
-        .where(UserMedia.user_id == user_id)
-        .order_by(UserMedia.created_at)
-        .limit(1)
-    )
-    row = res.first()
-    return row[0] if row else None
-
 async def _fetch_last_message(db: AsyncSession, user_a: str, user_b: str) -> Optional[Dict[str, Any]]:
     res = await db.execute(
         select(Message)
@@ -77,10 +74,16 @@ def _compute_overlap_and_conflict(a_p: Dict, b_p: Dict):
     return overlap, conflicts
 
 # ---- AI wrappers ----
-async def _call_ai_single_sentence(system_prompt: str, user_prompt: str, timeout: int = 15) -> str:
+async def _call_ai_single_sentence(system_prompt: str, user_prompt: str, timeout: int = 15,
+                                   user_id=None, priority: str = "enrichment",
+                                   site: str = "compatibility_reason") -> str:
     """Call chat completions and return plain text. Safe, with fallback."""
     try:
-        resp = await client.chat.completions.create(
+        resp = await ai_gateway.chat_completion(
+            site=site,
+            hedge=True,
+            priority=priority,
+            user_id=user_id,
             model="gpt-4o-mini",
             messages=[
                 {"role": "system", "content": system_prompt},
@@ -97,6 +100,86 @@ async def _call_ai_single_sentence(system_prompt: str, user_prompt: str, timeout
         print(f"[AI ERROR] {_call_ai_single_sentence.__name__}: {e}")
         return None
 
+# ---- Prompt builders (shared by the single-pair routes and the feed) ----
+def _profile_view(profile: Profile, with_about: bool = True) -> Dict:
+    view = {
+        "ai_summary": profile.ai_summary,
+        "mini_traits": profile.mini_traits or [],
+        "preferences": profile.preferences or {},
+    }
+    if with_about:
+        view["raw_about"] = (profile.raw_prompts or {}).get("about", "")
+    return view
+
+def _with_hints(user_prompt: str, overlap, conflicts) -> str:
+    # Add overlap/conflicts to prompt as internal-only hints (not returned)
+    if overlap:
+        user_prompt += f"\n\nInternal Overlap: {', '.join(overlap)}"
+    if conflicts:
+        user_prompt += f"\n\nInternal Conflicts: {', '.join(conflicts)}"
+    return user_prompt
+
+def _compatibility_prompt(a_profile: Profile, b_profile: Profile,
+                          embedding_similarity: Optional[float], distance_km: Optional[float]):
+    """(user_prompt, overlap) for the compatibility reason."""
+    a, b = _profile_view(a_profile), _profile_view(b_profile)
+    overlap, conflicts = _compute_overlap_and_conflict(a, b)
+    meta = {
+        "embedding_similarity": float(embedding_similarity) if embedding_similarity is not None else None,
+        "distance_km": distance_km,
+        "age_diff": None  # optional: populate if you pull ages
+    }
+    return _with_hints(make_compatibility_user_prompt(a, b, meta), overlap, conflicts), overlap
+
+def _starter_prompt(a_profile: Profile, b_profile: Profile, compatibility_reason: Optional[str]):
+    """(user_prompt, overlap) for the conversation starter."""
+    a, b = _profile_view(a_profile, with_about=False), _profile_view(b_profile, with_about=False)
+    overlap, conflicts = _compute_overlap_and_conflict(a, b)
+    return _with_hints(make_starter_user_prompt(a, b, compatibility_reason or ""), overlap, conflicts), overlap
+
+def _fallback_reason(overlap) -> str:
+    ai_metrics.record_event("compatibility_reason", "fallback")
+    # fallback deterministic summary
+    if overlap:
+        return f"You share {len(overlap)} interest(s) — this suggests shared activities and easy conversation."
+    return "Profiles show complementary traits that could lead to interesting conversations."
+
+def _fallback_starter(overlap) -> str:
+    ai_metrics.record_event("conversation_starter", "fallback")
+    # fallback starter based on overlap or general deep-open
+    if overlap:
+        return "What's a small memory from the last trip you took that still makes you smile?"
+    return "Tell me about the last moment that surprised you — I love hearing small stories."
+
+async def _call_ai_json(system_prompt: str, user_prompt: str, max_tokens: int = 600, timeout: int = 20,
+                        user_id=None) -> Optional[Dict]:
+    """Chat completion in JSON mode; None on any failure (callers fall back)."""
+    try:
+        resp = await ai_gateway.chat_completion(
+            site="insights_batch",
+            priority="enrichment",
+            user_id=user_id,
+            model="gpt-4o-mini",
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt},
+            ],
+            response_format={"type": "json_object"},
+            max_tokens=max_tokens,
+            timeout=timeout
+        )
+        return json.loads(resp.choices[0].message.content)
+    except Exception as e:
+        print(f"[AI ERROR] {_call_ai_json.__name__}: {e}")
+        return None
+
+def _clean_sentence(value: Any) -> Optional[str]:
+    """Validate one generated text: a non-empty string, flattened to a single line."""
+    if not isinstance(value, str):
+        return None
+    text = " ".join(value.splitlines()).strip()
+    return text or None
+
 # ---- Public services ----
 async def generate_compatibility_reason(db: AsyncSession, current_user_id: str, target_user_id: str,
                                         embedding_similarity: Optional[float] = None,
@@ -111,43 +194,15 @@ async def generate_compatibility_reason(db: AsyncSession, current_user_id: str,
     if not a_profile or not b_profile:
         return "Not enough profile data to generate a compatibility reason."
 
-    # prepare minimal objects
-    a = {
-        "ai_summary": a_profile.ai_summary,
-        "mini_traits": a_profile.mini_traits or [],
-        "preferences": a_profile.preferences or {},
-        "raw_about": (a_profile.raw_prompts or {}).get("about", "")
-    }
-    b = {
-        "ai_summary": b_profile.ai_summary,
-        "mini_traits": b_profile.mini_traits or [],
-        "preferences": b_profile.preferences or {},
-        "raw_about": (b_profile.raw_prompts or {}).get("about", "")
-    }
-
-    overlap, conflicts = _compute_overlap_and_conflict(a, b)
-    meta = {
-        "embedding_similarity": float(embedding_similarity) if embedding_similarity is not None else None,
-        "distance_km": distance_km,
-        "age_diff": None  # optional: populate if you pull ages
-    }
+    user_prompt, overlap = _compatibility_prompt(a_profile, b_profile, embedding_similarity, distance_km)
 
-    user_prompt = make_compatibility_user_prompt(a, b, meta)
-    # Add overlap/conflicts to prompt as internal-only hints (not returned)
-    if overlap:
-        user_prompt += f"\n\nInternal Overlap: {', '.join(overlap)}"
-    if conflicts:
-        user_prompt += f"\n\nInternal Conflicts: {', '.join(conflicts)}"
-
-    reason = await _call_ai_single_sentence(AI_PROFILE_SYSTEM_PROMPT, user_prompt)
-    if not reason:
-        # fallback deterministic summary
-        if overlap:
-            reason = f"You share {len(overlap)} interest(s) — this suggests shared activities and easy conversation."
-        else:
-            reason = "Profiles show complementary traits that could lead to interesting conversations."
-
-    return reason
+    # cached per (pair, profile versions, prompt version); refreshed in the background when stale
+    reason = await llm_cache.get(
+        db, "compatibility_reason", current_user_id, target_user_id,
+        profile_version(a_profile), profile_version(b_profile), COMPATIBILITY_PROMPT_VERSION,
+        lambda: _call_ai_single_sentence(AI_PROFILE_SYSTEM_PROMPT, user_prompt, user_id=current_user_id),
+    )
+    return reason or _fallback_reason(overlap)
 
 async def generate_conversation_starter(db: AsyncSession, current_user_id: str, target_user_id: str,
                                         compatibility_reason: Optional[str] = None) -> str:
@@ -160,88 +215,254 @@ async def generate_conversation_starter(db: AsyncSession, current_user_id: str,
     if not a_profile or not b_profile:
         return "Let's start a conversation — ask about their favourite recent moment."
 
-    a = {
-        "ai_summary": a_profile.ai_summary,
-        "mini_traits": a_profile.mini_traits or [],
-        "preferences": a_profile.preferences or {},
-    }
-    b = {
-        "ai_summary": b_profile.ai_summary,
-        "mini_traits": b_profile.mini_traits or [],
-        "preferences": b_profile.preferences or {},
-    }
+    user_prompt, overlap = _starter_prompt(a_profile, b_profile, compatibility_reason)
 
-    user_prompt = make_starter_user_prompt(a, b, compatibility_reason or "")
-    # attach internal overlap/conflict as hint (not returned)
-    overlap, conflicts = _compute_overlap_and_conflict(a, b)
-    if overlap:
-        user_prompt += f"\n\nInternal Overlap: {', '.join(overlap)}"
-    if conflicts:
-        user_prompt += f"\n\nInternal Conflicts: {', '.join(conflicts)}"
+    starter = await llm_cache.get(
+        db, "conversation_starter", current_user_id, target_user_id,
+        profile_version(a_profile), profile_version(b_profile), STARTER_PROMPT_VERSION,
+        lambda: _call_ai_single_sentence(STARTER_SYSTEM_PROMPT, user_prompt, timeout=20,
+                                         user_id=current_user_id, site="conversation_starter"),
+    )
+    return starter or _fallback_starter(overlap)
 
-    starter = await _call_ai_single_sentence(STARTER_SYSTEM_PROMPT, user_prompt, timeout=20)
-    if not starter:
-        # fallback starter based on overlap or general deep-open
-        if overlap:
-            starter = f"What's a small memory from the last trip you took that still makes you smile?"
-        else:
-            starter = "Tell me about the last moment that surprised you — I love hearing small stories."
+# ---- Batched loaders (one query each, whatever the page size) ----
+async def _fetch_profiles(db: AsyncSession, user_ids: List) -> Dict[str, Profile]:
+    res = await db.execute(
+        select(Profile).where(Profile.user_id.in_(user_ids))
+    )
+    return {str(p.user_id): p for p in res.scalars().all()}
+
+async def _fetch_avatars(db: AsyncSession, user_ids: List) -> Dict[str, str]:
+    res = await db.execute(
+        select(UserMedia.user_id, UserMedia.file_path)
+        .where(UserMedia.user_id.in_(user_ids))
+        .order_by(UserMedia.user_id, UserMedia.created_at)
+        .distinct(UserMedia.user_id)
+    )
+    return {str(user_id): path for user_id, path in res.all()}
 
-    return starter
+async def _fetch_last_messages(db: AsyncSession, user_id, other_ids: List) -> Dict[str, str]:
+    other = case((Message.sender_id == user_id, Message.receiver_id), else_=Message.sender_id)
+    res = await db.execute(
+        select(other.label("other_id"), Message.content)
+        .where(or_(
+            and_(Message.sender_id == user_id, Message.receiver_id.in_(other_ids)),
+            and_(Message.receiver_id == user_id, Message.sender_id.in_(other_ids)),
+        ))
+        .order_by(other, Message.created_at.desc())
+        .distinct(other)
+    )
+    return {str(other_id): content for other_id, content in res.all()}
 
-# ---- Final enriched feed (used by /insights/me) ----
-async def build_enriched_match_item(db: AsyncSession, current_user_id: str, candidate_row: Any,
-                                    embedding_similarity: float, distance_km: Optional[float]) -> Dict:
+
+# ---- Concurrent enriched feed (used by /insights/me) ----
+async def build_enriched_feed(db: AsyncSession, current_user: User, my_profile: Profile,
+                              limit: int, min_age: int, max_age: int, max_distance_km: float) -> List[Dict]:
     """
-    Given a SQLAlchemy row (user fields) and embedding similarity, return the enriched match dict.
-    candidate_row expected to contain at least user id, name, age, bio fields (adapt to your select).
+    /insights/me in a fixed number of queries: one candidate query (with
+    similarity), then batched profile / avatar / last-message / LLM-cache
+    loads. Cache misses go to the LLM in batched JSON prompts
+    (INSIGHTS_LLM_BATCH_SIZE candidates each, INSIGHTS_LLM_CONCURRENCY in
+    flight); entries a batch gets wrong are retried one pair at a time.
+    Whatever isn't back by INSIGHTS_DEADLINE_SECONDS gets the deterministic
+    fallback text and is cached when it finishes.
     """
-    target_id = str(candidate_row.id)
-    # fetch user/profile/media
-    profile = await _fetch_profile(db, target_id)
-    user = await _fetch_user(db, target_id)
-    avatar = await _fetch_avatar(db, target_id)
-
-    # required minimal sanity checks
-    if not profile or not user:
-        return None
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.INSIGHTS_DEADLINE_SECONDS
+    me = str(current_user.id)
 
-    # compute compatibility reason (AI call) - internal overlap/conflict used
-    try:
-        compatibility_reason = await generate_compatibility_reason(
-            db, current_user_id, target_id, embedding_similarity=embedding_similarity, distance_km=distance_km
+    # 1) candidates + similarity in one query
+    rows = await sample_users(
+        db,
+        columns=[
+            User.id, User.full_name, User.age, User.latitude, User.longitude, User.last_active,
+            embedding_similarity(my_profile.embedding).label("similarity"),
+        ],
+        conditions=[
+            User.id != current_user.id,
+            User.is_profile_hidden.is_(False),
+            User.age >= min_age,
+            User.age <= max_age,
+            Profile.embedding.isnot(None),
+            comparable_embedding(),
+        ],
+        k=limit * 3,  # fetch extra to allow filtering
+        seed=session_seed(current_user.id, "insights"),
+        join_profile=True,
+    )
+    if not rows:
+        return []
+
+    # skip if far (unknown distance is kept)
+    distances = haversine_distances(
+        current_user.latitude, current_user.longitude,
+        [r.latitude for r in rows], [r.longitude for r in rows],
+    )
+    picked = [(r, float(d)) for r, d in zip(rows, distances) if not (np.isfinite(d) and d > max_distance_km)][:limit]
+    if not picked:
+        return []
+
+    # 2) batched loads
+    ids = [r.id for r, _ in picked]
+    profiles = await _fetch_profiles(db, ids)
+    avatars = await _fetch_avatars(db, ids)
+    last_messages = await _fetch_last_messages(db, current_user.id, ids)
+    cached = await llm_cache.preload(db, ("compatibility_reason", "conversation_starter"), me, ids)
+    my_version = profile_version(my_profile)
+
+    # 3) cache first; misses go to the LLM in batched prompts, concurrently
+    semaphore = asyncio.Semaphore(settings.INSIGHTS_LLM_CONCURRENCY)
+    texts: Dict[str, Dict[str, Optional[str]]] = {}
+    versions: Dict[str, str] = {}
+    inputs: Dict[str, tuple] = {}
+    misses: List[str] = []
+
+    for r, d in picked:
+        target = str(r.id)
+        profile = profiles.get(target)
+        if not profile:
+            continue
+        distance_km = None if np.isinf(d) else d
+        inputs[target] = (profile, r.similarity, distance_km)
+        versions[target] = version = profile_version(profile)
+
+        reason_prompt, _ = _compatibility_prompt(my_profile, profile, r.similarity, distance_km)
+        texts[target] = slot = {"reason": None, "starter": None}
+        slot["reason"] = llm_cache.peek(
+            cached.get(("compatibility_reason", target)), my_version, version, COMPATIBILITY_PROMPT_VERSION,
+            lambda p=reason_prompt: _call_ai_single_sentence(AI_PROFILE_SYSTEM_PROMPT, p, user_id=me,
+                                                             priority="background"),
         )
-    except Exception as e:
-        print(f"[compatibility error] {e}")
-        compatibility_reason = "A promising connection based on personality and interests."
+        if target not in last_messages:
+            starter_prompt, _ = _starter_prompt(my_profile, profile, slot["reason"])
+            slot["starter"] = llm_cache.peek(
+                cached.get(("conversation_starter", target)), my_version, version, STARTER_PROMPT_VERSION,
+                lambda p=starter_prompt: _call_ai_single_sentence(STARTER_SYSTEM_PROMPT, p, timeout=20, user_id=me,
+                                                                  site="conversation_starter",
+                                                                  priority="background"),
+            )
+        if slot["reason"] is None or (slot["starter"] is None and target not in last_messages):
+            misses.append(target)
+
+    def _answers(target: str) -> List[tuple]:
+        """Cache rows for whatever was freshly generated for target."""
+        slot, version = texts[target], versions[target]
+        rows = []
+        if slot.get("new_reason"):
+            rows.append(("compatibility_reason", me, target, my_version, version,
+                         COMPATIBILITY_PROMPT_VERSION, slot["reason"]))
+        if slot.get("new_starter"):
+            rows.append(("conversation_starter", me, target, my_version, version,
+                         STARTER_PROMPT_VERSION, slot["starter"]))
+        return rows
 
-    # conversation starter or last message override
-    last_msg = await _fetch_last_message(db, current_user_id, target_id)
-    if last_msg:
-        conversation_text = last_msg["content"]
+    async def single(target: str) -> List[tuple]:
+        """One call per missing text for this pair (also the per-entry fallback of a batch)."""
+        profile, similarity, distance_km = inputs[target]
+        slot = texts[target]
+        if slot["reason"] is None:
+            prompt, _ = _compatibility_prompt(my_profile, profile, similarity, distance_km)
+            async with semaphore:
+                slot["reason"] = await _call_ai_single_sentence(AI_PROFILE_SYSTEM_PROMPT, prompt, user_id=me)
+            slot["new_reason"] = bool(slot["reason"])
+        if slot["starter"] is None and target not in last_messages:
+            prompt, _ = _starter_prompt(my_profile, profile, slot["reason"])
+            async with semaphore:
+                slot["starter"] = await _call_ai_single_sentence(STARTER_SYSTEM_PROMPT, prompt, user_id=me,
+                                                                 site="conversation_starter")
+            slot["new_starter"] = bool(slot["starter"])
+        return _answers(target)
+
+    async def batch(targets: List[str]) -> List[tuple]:
+        """One prompt for several candidates; entries that fail validation fall back to single()."""
+        candidates = []
+        for target in targets:
+            profile, similarity, distance_km = inputs[target]
+            view = _profile_view(profile)
+            overlap, conflicts = _compute_overlap_and_conflict(_profile_view(my_profile), view)
+            meta = {
+                "embedding_similarity": float(similarity) if similarity is not None else None,
+                "distance_km": distance_km,
+            }
+            hints = "; ".join(filter(None, [
+                f"overlap: {', '.join(overlap)}" if overlap else "",
+                f"conflicts: {', '.join(conflicts)}" if conflicts else "",
+            ]))
+            candidates.append((target, view, meta, hints))
+
+        async with semaphore:
+            data = await _call_ai_json(
+                BATCH_INSIGHTS_SYSTEM_PROMPT,
+                make_batch_insights_user_prompt(_profile_view(my_profile), candidates),
+                max_tokens=120 * len(targets),
+                timeout=20,
+                user_id=me,
+            )
+        entries = data.get("candidates") if isinstance(data, dict) else None
+        if not isinstance(entries, dict):
+            entries = {}
+
+        generated, retry = [], []
+        for target in targets:
+            entry = entries.get(target)
+            reason = _clean_sentence(entry.get("compatibility_reason")) if isinstance(entry, dict) else None
+            starter = _clean_sentence(entry.get("conversation_starter")) if isinstance(entry, dict) else None
+            slot = texts[target]
+            if slot["reason"] is None and reason:
+                slot["reason"], slot["new_reason"] = reason, True
+            if slot["starter"] is None and target not in last_messages and starter:
+                slot["starter"], slot["new_starter"] = starter, True
+            if slot["reason"] is None or (slot["starter"] is None and target not in last_messages):
+                retry.append(target)
+            else:
+                generated += _answers(target)
+
+        for rows in await asyncio.gather(*(single(t) for t in retry)):
+            generated += rows
+        return generated
+
+    size = max(1, settings.INSIGHTS_LLM_BATCH_SIZE)
+    if size == 1:
+        tasks = [asyncio.create_task(single(t)) for t in misses]
     else:
-        try:
-            conversation_text = await generate_conversation_starter(db, current_user_id, target_id, compatibility_reason)
-        except Exception as e:
-            print(f"[starter error] {e}")
-            conversation_text = "Say hi — ask about what made their week interesting."
+        tasks = [asyncio.create_task(batch(misses[i:i + size])) for i in range(0, len(misses), size)]
+    done, pending = await asyncio.wait(tasks, timeout=max(0.0, deadline - loop.time())) if tasks else (set(), set())
 
-    # online status (if you have manager)
-    try:
-        is_online = bool(manager.active_connections.get(target_id))
-    except Exception:
-        is_online = False
-
-    item = {
-        "user_id": target_id,
-        "full_name": user.full_name or "",
-        "age": user.age,
-        "avatar": avatar or "/images/default-avatar.png",
-        "mini_traits": profile.mini_traits or [],
-        "ai_summary": profile.ai_summary or "",
-        "compatibility_reason": compatibility_reason,
-        "conversation_starter": conversation_text,
-        "last_active": getattr(user, "last_active", None),
-        "is_online": is_online
-    }
-    return item
+    # finished answers are cached now; late ones are cached when they land
+    fresh = [item for t in done if not t.exception() for item in t.result()]
+    if fresh:
+        await llm_cache.store_many(db, fresh)
+    for t in pending:
+        t.add_done_callback(lambda t: None if t.cancelled() or t.exception() else llm_cache.store_later(t.result()))
+
+    # 4) assemble (fallback text for anything still missing)
+    results = []
+    for r, _ in picked:
+        target = str(r.id)
+        profile = profiles.get(target)
+        if not profile:
+            continue
+        slot = texts[target]
+        overlap, _ = _compute_overlap_and_conflict(_profile_view(my_profile), _profile_view(profile))
+        reason = slot.get("reason") or _fallback_reason(overlap)
+        if target in last_messages:
+            conversation_text = last_messages[target]
+        else:
+            conversation_text = slot.get("starter") or _fallback_starter(overlap)
+
+        results.append({
+            "user_id": target,
+            "full_name": r.full_name or "",
+            "age": r.age,
+            "avatar": avatars.get(target) or "/images/default-avatar.png",
+            "mini_traits": profile.mini_traits or [],
+            "ai_summary": profile.ai_summary or "",
+            "compatibility_reason": reason,
+            "conversation_starter": conversation_text,
+            "last_active": r.last_active,
+            "is_online": bool(manager.active_connections.get(target)),
+        })
+
+    # sort by internal heuristic: online first then by presence of compatibility text
+    results.sort(key=lambda x: (not x["is_online"], 0 if x["compatibility_reason"] else 1))
+    return results
@@ -0,0 +1,252 @@
+# services/job_queue.py
+
+
+import asyncio
+import random
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, Optional
+from sqlalchemy import and_, exists, func, select, text, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+from models.job_model import AIJob
+from models.user_model import User
+from utils.config import settings
+
+
+MAX_BACKOFF_SECONDS = 600
+PERMANENT_ERRORS = (ValueError, LookupError)   # bad input: retrying won't help
+
+JobHandler = Callable[[AsyncSession, object], Awaitable[Optional[dict]]]
+
+
+# -------------------------------
+# 🔹 Handlers
+# -------------------------------
+async def _profile_ai(db: AsyncSession, job) -> dict:
+    from services.ai_service import run_ai_profile_process
+    from services.discovery_feed import discovery_feed
+
+    user = await db.get(User, job.user_id)
+    if not user:
+        raise LookupError("User not found")
+    result = await run_ai_profile_process(db, user, force=bool((job.payload or {}).get("force")))
+    discovery_feed.invalidate_user(user.id)   # decks ranked with the old embedding are stale
+    return result
+
+
+JOB_HANDLERS: Dict[str, JobHandler] = {
+    "profile_ai": _profile_ai,
+}
+
+
+def _backoff(attempts: int) -> timedelta:
+    delay = min(settings.AI_JOB_BACKOFF_SECONDS * 2 ** max(attempts - 1, 0), MAX_BACKOFF_SECONDS)
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def job_status(job: AIJob) -> dict:
+    return {
+        "job_id": str(job.id),
+        "kind": job.kind,
+        "status": job.status,
+        "attempts": job.attempts,
+        "error": job.last_error if job.status == "failed" else None,
+        "result": job.result,
+        "created_at": job.created_at,
+        "finished_at": job.finished_at,
+    }
+
+
+class JobQueue:
+    """
+    Postgres-backed job queue (ai_jobs) with an in-process asyncio worker pool.
+
+    - enqueue() is idempotent per (kind, user): while a job is still queued,
+      enqueueing again returns its id instead of adding another.
+    - Workers claim with UPDATE ... WHERE id = (SELECT ... FOR UPDATE SKIP
+      LOCKED), so any number of workers / app processes can poll the same
+      table; a user never has two jobs of one kind running at once.
+    - Failures retry with jittered exponential backoff up to
+      AI_JOB_MAX_ATTEMPTS; jobs whose worker died are requeued after
+      AI_JOB_LEASE_SECONDS.
+    - The user gets a WS notification when their job is done (or gives up).
+    """
+
+    def __init__(self):
+        self._tasks: list = []
+        self._wake = asyncio.Event()
+
+    # -------------------------------
+    # 🔹 Producer side
+    # -------------------------------
+    async def enqueue(self, db: AsyncSession, kind: str, user_id, payload: Optional[dict] = None) -> uuid.UUID:
+        """Queue `kind` for `user_id` (commits) and return the job id."""
+        for _ in range(3):
+            job_id = await db.scalar(
+                insert(AIJob)
+                .values(id=uuid.uuid4(), kind=kind, user_id=user_id, payload=payload, status="queued", attempts=0)
+                .on_conflict_do_nothing(
+                    index_elements=[AIJob.kind, AIJob.user_id],
+                    index_where=text("status = 'queued'"),
+                )
+                .returning(AIJob.id)
+            )
+            if job_id is None:
+                # already queued: that job will see the latest profile when it runs
+                job_id = await db.scalar(
+                    select(AIJob.id).where(AIJob.kind == kind, AIJob.user_id == user_id, AIJob.status == "queued")
+                )
+            if job_id is not None:
+                break
+        await db.commit()
+        self._wake.set()
+        return job_id
+
+    async def get(self, db: AsyncSession, job_id, user_id) -> Optional[AIJob]:
+        return await db.scalar(select(AIJob).where(AIJob.id == job_id, AIJob.user_id == user_id))
+
+    # -------------------------------
+    # 🔹 Worker side
+    # -------------------------------
+    async def _claim(self, db: AsyncSession):
+        running = aliased(AIJob)
+        due = (
+            select(AIJob.id)
+            .where(
+                AIJob.status == "queued",
+                AIJob.run_after <= func.now(),
+                ~exists().where(
+                    running.kind == AIJob.kind,
+                    running.user_id == AIJob.user_id,
+                    running.status == "running",
+                ),
+            )
+            .order_by(AIJob.run_after)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        )
+        job = (await db.execute(
+            update(AIJob)
+            .where(AIJob.id == due.scalar_subquery())
+            .values(status="running", attempts=AIJob.attempts + 1, locked_at=func.now())
+            .returning(AIJob.id, AIJob.kind, AIJob.user_id, AIJob.payload, AIJob.attempts)
+        )).first()
+        await db.commit()
+        return job
+
+    async def _complete(self, db: AsyncSession, job, status: str, result=None, error=None, retry_in=None):
+        values = {"locked_at": None, "last_error": error}
+        if retry_in is not None and await db.scalar(select(exists().where(
+            AIJob.kind == job.kind, AIJob.user_id == job.user_id, AIJob.status == "queued"
+        ))):
+            # a newer job for this user is already queued; it replaces the retry
+            retry_in, status = None, "failed"
+        if retry_in is not None:
+            values.update(status="queued", run_after=datetime.now(timezone.utc) + retry_in)
+        else:
+            values.update(status=status, result=result, finished_at=datetime.now(timezone.utc))
+        await db.execute(update(AIJob).where(AIJob.id == job.id).values(**values))
+        await db.commit()
+
+    async def _notify(self, db: AsyncSession, job, status: str):
+        from services.notification_service import create_and_push_notification
+        try:
+            await create_and_push_notification(
+                db=db,
+                recipient_id=str(job.user_id),
+                notif_type=f"{job.kind}_{status}",
+                meta={"job_id": str(job.id), "kind": job.kind, "status": status},
+            )
+        except Exception as e:
+            print(f"⚠️ Job {job.id} notification failed: {e}")
+
+    async def _run(self, session_factory, job):
+        handler = JOB_HANDLERS.get(job.kind)
+        try:
+            if handler is None:
+                raise LookupError(f"No handler for job kind '{job.kind}'")
+            async with session_factory() as db:
+                result = await handler(db, job)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            final = isinstance(e, PERMANENT_ERRORS) or job.attempts >= settings.AI_JOB_MAX_ATTEMPTS
+            async with session_factory() as db:
+                if final:
+                    await self._complete(db, job, "failed", error=error)
+                    await self._notify(db, job, "failed")
+                else:
+                    await self._complete(db, job, "queued", error=error, retry_in=_backoff(job.attempts))
+            print(f"⚠️ Job {job.id} ({job.kind}) attempt {job.attempts} failed: {error}")
+            return
+
+        async with session_factory() as db:
+            await self._complete(db, job, "done", result=result)
+            await self._notify(db, job, "done")
+        print(f"✅ Job {job.id} ({job.kind}) done")
+
+    async def _worker(self, session_factory):
+        while True:
+            try:
+                async with session_factory() as db:
+                    job = await self._claim(db)
+            except Exception as e:
+                print(f"⚠️ Job claim failed: {e}")
+                job = None
+
+            if job is not None:
+                try:
+                    await self._run(session_factory, job)
+                except Exception as e:
+                    # bookkeeping failed (DB down, commit error): the lease reaper requeues it
+                    print(f"⚠️ Job {job.id} ({job.kind}) left running: {e}")
+                continue
+
+            # idle: wait for an enqueue in this process or the next poll
+            try:
+                await asyncio.wait_for(self._wake.wait(), settings.AI_JOB_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    async def requeue_stale(self, db: AsyncSession) -> int:
+        """Jobs left 'running' by a dead worker go back to the queue (or fail if superseded)."""
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=settings.AI_JOB_LEASE_SECONDS)
+        stale = and_(AIJob.status == "running", AIJob.locked_at < cutoff)
+        queued = aliased(AIJob)
+        superseded = exists().where(
+            queued.kind == AIJob.kind, queued.user_id == AIJob.user_id, queued.status == "queued"
+        )
+        await db.execute(
+            update(AIJob)
+            .where(stale, superseded)
+            .values(status="failed", locked_at=None, last_error="superseded after lease expiry",
+                    finished_at=func.now())
+        )
+        requeued = await db.execute(
+            update(AIJob).where(stale).values(status="queued", locked_at=None, run_after=func.now())
+        )
+        await db.commit()
+        return requeued.rowcount or 0
+
+    async def _reaper(self, session_factory):
+        while True:
+            try:
+                async with session_factory() as db:
+                    count = await self.requeue_stale(db)
+                if count:
+                    print(f"♻️ Requeued {count} stale AI jobs")
+            except Exception as e:
+                print(f"⚠️ Stale job sweep failed: {e}")
+            await asyncio.sleep(settings.AI_JOB_LEASE_SECONDS / 2)
+
+    def start(self, session_factory, workers: int = settings.AI_JOB_WORKERS):
+        if any(not t.done() for t in self._tasks):
+            return self._tasks
+        self._tasks = [asyncio.create_task(self._worker(session_factory)) for _ in range(workers)]
+        self._tasks.append(asyncio.create_task(self._reaper(session_factory)))
+        return self._tasks
+
+
+job_queue = JobQueue()
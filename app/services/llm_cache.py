@@ -0,0 +1,185 @@
+# services/llm_cache.py
+
+
+import asyncio
+import hashlib
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.profile_model import LLMCacheEntry, Profile
+from models.match_model import Match
+from utils.config import settings
+from services.ai_metrics import ai_metrics
+
+
+# kind -> Match column the answer is written back to
+MATCH_COLUMNS = {
+    "compatibility_reason": Match.compatibility_reason,
+    "conversation_starter": Match.conversation_starter,
+}
+
+
+def profile_version(profile: Profile) -> str:
+    """Short hash of the profile fields LLM prompts read; changes when the profile is re-processed."""
+    fields = [
+        profile.ai_summary,
+        profile.mini_traits,
+        profile.preferences,
+        (profile.raw_prompts or {}).get("about", ""),
+    ]
+    blob = json.dumps(fields, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.blake2b(blob.encode("utf-8"), digest_size=8).hexdigest()
+
+
+class LLMCache:
+    """
+    Stale-while-revalidate cache for per-pair LLM answers.
+
+    One row per (kind, user_a, user_b) remembers which profile versions and
+    prompt version produced it:
+    - same versions (and younger than LLM_CACHE_MAX_AGE_DAYS): served, no call
+    - anything changed: the old answer is served immediately and a
+      background task regenerates it
+    - no row yet: generated inline and stored
+    Answers are also written to Match.<kind> for the a -> b match row.
+    Fallback text (generate() returning None) is never cached.
+    """
+
+    def __init__(self):
+        self._refreshing: set = set()
+        self._tasks: set = set()
+
+    async def preload(
+        self, db: AsyncSession, kinds: Iterable[str], user_a: str, user_bs: Iterable
+    ) -> Dict[Tuple[str, str], LLMCacheEntry]:
+        """All entries for user_a -> user_bs in one query, keyed by (kind, str(user_b))."""
+        entries = (await db.execute(
+            select(LLMCacheEntry).where(
+                LLMCacheEntry.kind.in_(list(kinds)),
+                LLMCacheEntry.user_a == user_a,
+                LLMCacheEntry.user_b.in_(list(user_bs)),
+            )
+        )).scalars().all()
+        return {(e.kind, str(e.user_b)): e for e in entries}
+
+    def peek(
+        self,
+        entry: Optional[LLMCacheEntry],
+        version_a: str,
+        version_b: str,
+        prompt_version: int,
+        generate: Callable[[], Awaitable[Optional[str]]],
+    ) -> Optional[str]:
+        """Cached value (None on a miss); a stale entry is returned and refreshed in the background."""
+        if entry is None:
+            return None
+        ai_metrics.record_event(entry.kind, "cache_hit")
+        fresh = (
+            (entry.version_a, entry.version_b, entry.prompt_version) == (version_a, version_b, prompt_version)
+            and entry.updated_at is not None
+            and datetime.now(timezone.utc) - entry.updated_at < timedelta(days=settings.LLM_CACHE_MAX_AGE_DAYS)
+        )
+        if not fresh:
+            self._revalidate(
+                entry.kind, entry.user_a, entry.user_b, version_a, version_b, prompt_version, generate
+            )
+        return entry.value
+
+    async def get(
+        self,
+        db: AsyncSession,
+        kind: str,
+        user_a: str,
+        user_b: str,
+        version_a: str,
+        version_b: str,
+        prompt_version: int,
+        generate: Callable[[], Awaitable[Optional[str]]],
+    ) -> Optional[str]:
+        entry = await db.get(LLMCacheEntry, (kind, user_a, user_b))
+        cached = self.peek(entry, version_a, version_b, prompt_version, generate)
+        if cached is not None:
+            return cached
+
+        value = await generate()
+        if value:
+            await self.store(db, kind, user_a, user_b, version_a, version_b, prompt_version, value)
+        return value
+
+    async def store(self, db, kind, user_a, user_b, version_a, version_b, prompt_version, value, commit: bool = True):
+        now = datetime.now(timezone.utc)
+        fields = {
+            "version_a": version_a,
+            "version_b": version_b,
+            "prompt_version": prompt_version,
+            "value": value,
+            "updated_at": now,
+        }
+        await db.execute(
+            insert(LLMCacheEntry)
+            .values(kind=kind, user_a=user_a, user_b=user_b, **fields)
+            .on_conflict_do_update(
+                index_elements=[LLMCacheEntry.kind, LLMCacheEntry.user_a, LLMCacheEntry.user_b],
+                set_=fields,
+            )
+        )
+        column = MATCH_COLUMNS.get(kind)
+        if column is not None:
+            await db.execute(
+                update(Match)
+                .where(Match.user_id == user_a, Match.target_id == user_b)
+                .values({column.key: value})
+            )
+        if commit:
+            await db.commit()
+
+    async def store_many(self, db: AsyncSession, items: List[tuple]):
+        """items: (kind, user_a, user_b, version_a, version_b, prompt_version, value); one commit."""
+        for item in items:
+            await self.store(db, *item, commit=False)
+        await db.commit()
+
+    def store_later(self, items: List[tuple]):
+        """store_many() in a background task with its own session (caller's session may be gone)."""
+        if not items:
+            return
+
+        async def _run():
+            from db.session import async_session
+            try:
+                async with async_session() as db:
+                    await self.store_many(db, items)
+            except Exception as e:
+                print(f"⚠️ LLM cache write failed: {e}")
+
+        task = asyncio.create_task(_run())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _revalidate(self, kind, user_a, user_b, version_a, version_b, prompt_version, generate):
+        key = (kind, str(user_a), str(user_b))
+        if key in self._refreshing:
+            return
+        self._refreshing.add(key)
+
+        async def _run():
+            from db.session import async_session
+            try:
+                value = await generate()
+                if value:
+                    async with async_session() as db:
+                        await self.store(db, kind, user_a, user_b, version_a, version_b, prompt_version, value)
+            except Exception as e:
+                print(f"⚠️ LLM cache refresh failed for {key}: {e}")
+            finally:
+                self._refreshing.discard(key)
+
+        task = asyncio.create_task(_run())
+        self._tasks.add(task)   # keep a reference until it finishes
+        task.add_done_callback(self._tasks.discard)
+
+
+llm_cache = LLMCache()
@@ -7,7 +7,7 @@ from fastapi import HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timezone, timedelta
 from sqlalchemy import select, and_, or_, delete, func, desc
-from services.ai_service import run_ai_profile_process
+from services.job_queue import job_queue
 from utils.match_logic import create_notification, generate_conversation_starters
 from sqlalchemy.future import select
 from utils.socket_manager import manager
@@ -15,6 +15,8 @@ from models.user_model import User, Notification, UserMedia
 from models.message_model import Message
 from models.profile_model import Profile
 from models.match_model import View, Match, Like, Swipe
+from services.discovery_feed import discovery_feed
+from services.exclusion_index import exclusion_index
 
 
 
@@ -64,12 +66,13 @@ async def get_user_matches(db: AsyncSession, user_id: str) -> List[Dict]:
             interests = profile.preferences.get("interests", [])
             values = profile.preferences.get("values", [])
         else:
-            try:
-                ai_data = await run_ai_profile_process(db, match_user)
-                interests = ai_data["preferences"].get("interests", [])
-                values = ai_data["preferences"].get("values", [])
-            except Exception:
-                interests, values = [], []
+            # not processed yet: queue it (idempotent) instead of blocking this request
+            interests, values = [], []
+            if profile and profile.raw_prompts:
+                try:
+                    await job_queue.enqueue(db, "profile_ai", match_user.id)
+                except Exception as e:
+                    print(f"⚠️ Could not queue AI processing for {match_user.id}: {e}")
 
         # Compute mutual interests and values with current user
         mutual_interests, common_values = [], []
@@ -190,6 +193,7 @@ async def create_match(db: AsyncSession, user_a_id: str, user_b_id: str, score:
         db.add_all([match_ab, match_ba])
         await db.commit()
         await db.refresh(match_ab)
+        exclusion_index.exclude_pair(user_a_id, user_b_id)
         # Notify both
         await create_notification(db, user_id=user_a_id, type="match", payload={"with_user": str(user_b_id)})
         await create_notification(db, user_id=user_b_id, type="match", payload={"with_user": str(user_a_id)})
@@ -212,6 +216,7 @@ async def create_match(db: AsyncSession, user_a_id: str, user_b_id: str, score:
         db.add(existing_ba)
 
     await db.commit()
+    exclusion_index.exclude_pair(user_a_id, user_b_id)
     # send notifications only if this transition marks a new mutual state
     # (simple strategy: notify both anyway; advanced: check previous is_mutual)
     await create_notification(db, user_id=user_a_id, type="match", payload={"with_user": str(user_b_id)})
@@ -310,6 +315,8 @@ async def record_like(db: AsyncSession, liker_id: str, liked_id: str):
     await db.commit()
     await db.refresh(like)
 
+    discovery_feed.remove_candidate(liker_id, liked_id)
+
     # Notify liked user
     await create_notification(db, user_id=liked_id, type="like", payload={"from": str(liker_id)})
 
@@ -11,6 +11,8 @@ from models.match_model import View, Swipe, Like, Match
 from models.user_model import User, Notification, UserMedia
 from models.message_model import Message
 from models.block_model import UserBlock
+from services.discovery_feed import discovery_feed
+from services.exclusion_index import exclusion_index
 
 
 MAX_VIEWS_PER_MINUTE = 20
@@ -92,6 +94,10 @@ async def record_swipe(
         await db.commit()
         await db.refresh(swipe_obj)
 
+    # swiped users never come back in the swiper's decks
+    discovery_feed.remove_candidate(swiper_id, swiped_id)
+    exclusion_index.exclude(swiper_id, swiped_id)
+
     # 5️⃣ Left swipe → nothing else
     if not liked:
         return {"created": True, "is_mutual": False, "swipe_id": str(swipe_obj.id)}
@@ -180,6 +186,7 @@ async def record_swipe(
             db.add(match)
             await db.commit()
             await db.refresh(match)
+            exclusion_index.exclude_pair(swiper_id, swiped_id)
 
             # Fetch image for *target user* too
             media_res2 = await db.execute(
@@ -298,6 +305,11 @@ async def undo_last_swipe(db: AsyncSession, user_id: str):
     await db.commit()
     await db.refresh(last_swipe)
 
+    # rewound user is eligible again → re-rank the swiper's decks
+    discovery_feed.invalidate_owner(user_id)
+    exclusion_index.invalidate(user_id)
+    exclusion_index.invalidate(last_swipe.swiped_id)
+
     # 6️⃣ If it was a right swipe, deactivate match silently
     if last_swipe.liked:
         match = await db.scalar(
@@ -391,6 +403,8 @@ async def undo_like(db: AsyncSession, liker_id: str, liked_id: str):
         match.unmatched_at = now
         db.add(match)
         await db.commit()
+        exclusion_index.invalidate(liker_id)
+        exclusion_index.invalidate(liked_id)
 
         # ❌ DO NOT notify the other user
         # REMOVE THIS:
@@ -471,6 +485,11 @@ async def unmatch_user(db: AsyncSession, user_id: str, target_id: str):
 
     await db.commit()
 
+    # blocked pair must not see each other in precomputed decks
+    discovery_feed.remove_candidate(user_id, target_id)
+    discovery_feed.remove_candidate(target_id, user_id)
+    exclusion_index.exclude_pair(user_id, target_id)
+
     # 5) Notify self only
     await create_and_push_notification(
         db=db,
@@ -576,6 +595,7 @@ async def create_match(db: AsyncSession, user_a_id: str, user_b_id: str, score:
 
         await db.commit()
         await db.refresh(existing_ab)
+        exclusion_index.exclude_pair(user_a_id, user_b_id)
 
     except Exception as e:
         await db.rollback()
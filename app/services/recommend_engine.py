@@ -0,0 +1,401 @@
+# services/recommend_engine.py
+
+
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from functools import cached_property
+from typing import Awaitable, Callable, List, Optional, Tuple
+import numpy as np
+from fastapi import HTTPException
+from sqlalchemy import select, and_, or_, all_, bindparam
+from sqlalchemy.dialects.postgresql import ARRAY, UUID as PG_UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.user_model import User
+from models.profile_model import Profile
+from schemas.match_schema import MatchResponse
+from utils.location import haversine_distances
+from utils.geohash import covering_cells, prefix_range
+from utils.gender import canonical_genders
+from utils.match_logic import preference_alignment_scores
+from services.vector_search import embedding_similarity, similar_candidates
+from services.embedding_providers import comparable_embedding
+from services.exclusion_index import exclusion_index
+from services.sampling import sample_users, session_seed
+
+
+MAX_RADIUS_KM = 200.0      # geo_cells radius cap (the routers validate against it)
+GEO_MAX_SCAN_ROWS = 5000   # id/lat/lon rows read from the covering cells per request
+
+# every retriever hydrates the same columns so scorers never refetch
+CANDIDATE_COLUMNS = [
+    User.id,
+    User.full_name,
+    User.age,
+    User.bio,
+    User.gender,
+    User.preference,
+    User.gender_code,
+    User.preference_mask,
+    User.latitude,
+    User.longitude,
+    User.last_active,
+    User.premium_tier,
+]
+
+
+@dataclass
+class RankContext:
+    db: AsyncSession
+    user: User
+    mode: str
+    params: dict
+    embedding: Optional[list] = None
+    excluded: List[str] = field(default_factory=list)   # swiped / matched / blocked user ids
+    now: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+class Candidates:
+    """
+    One retrieved batch. Rows keep the hydrated columns; features are
+    exposed as NumPy arrays (computed once, shared by every scorer).
+    """
+
+    def __init__(self, ctx: RankContext, rows: List):
+        self.ctx = ctx
+        self.rows = rows
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def _floats(self, attr: str) -> np.ndarray:
+        return np.array(
+            [getattr(r, attr, None) for r in self.rows], dtype=np.float64
+        )
+
+    @cached_property
+    def similarity(self) -> np.ndarray:
+        return np.nan_to_num(self._floats("similarity"), nan=0.0)
+
+    @cached_property
+    def distance_km(self) -> np.ndarray:
+        """inf where either side has no location."""
+        user = self.ctx.user
+        return haversine_distances(
+            user.latitude, user.longitude, self._floats("latitude"), self._floats("longitude")
+        )
+
+    @cached_property
+    def idle_hours(self) -> np.ndarray:
+        """Hours since last activity (NaN when unknown)."""
+        now = self.ctx.now.timestamp()
+        seen = np.array(
+            [r.last_active.timestamp() if r.last_active else np.nan for r in self.rows],
+            dtype=np.float64,
+        )
+        return (now - seen) / 3600
+
+    @cached_property
+    def age(self) -> np.ndarray:
+        return self._floats("age")
+
+    @cached_property
+    def gender_code(self) -> np.ndarray:
+        return np.array([r.gender_code or 0 for r in self.rows], dtype=np.int64)
+
+    @cached_property
+    def preference_mask(self) -> np.ndarray:
+        return np.array([r.preference_mask or 0 for r in self.rows], dtype=np.int64)
+
+    @cached_property
+    def premium_tier(self) -> np.ndarray:
+        return np.nan_to_num(self._floats("premium_tier"), nan=0.0)
+
+
+Retriever = Callable[[RankContext, list, int], Awaitable[List]]
+Filter = Callable[[RankContext], list]
+Scorer = Callable[[RankContext, Candidates], np.ndarray]
+
+
+@dataclass
+class RecommendationMode:
+    """
+    A recommendation mode is pure configuration:
+    retriever (SQL filters and exclusions pushed into it)
+    -> weighted vectorized scorers (+ optional premium boost) -> top-K.
+    """
+    name: str
+    retriever: Retriever
+    scorers: List[Tuple[float, Scorer]]
+    filters: List[Filter] = field(default_factory=list)
+    pool_size: Callable[[int], int] = lambda limit: limit * 3
+    premium_boost: bool = False
+    needs_embedding: bool = True
+    strict_profile: bool = False        # 400 instead of [] when the caller has no embedding
+    show_distance: bool = False
+    max_photos: Optional[int] = 1       # None = whole gallery
+
+
+# -------------------------------
+# 🔹 Retrievers
+# -------------------------------
+def vector_ann(two_stage: bool = False, partitioned: bool = False) -> Retriever:
+    """
+    Nearest profiles by cosine (in-memory matrix, HNSW fallback).
+    two_stage: shortlist on the 256-d projection, re-rank at 1536-d.
+    partitioned: search only the gender / age partition named by the
+    request params instead of post-filtering a global top-K.
+    """
+    async def retrieve(ctx: RankContext, conditions: list, k: int) -> List:
+        if ctx.embedding is None:
+            return []
+        partition = {}
+        if partitioned:
+            partition = {
+                "genders": canonical_genders(ctx.params.get("gender")),
+                "age_range": (ctx.params.get("min_age", 18), ctx.params.get("max_age", 100)),
+            }
+        return await similar_candidates(
+            ctx.db, ctx.embedding, CANDIDATE_COLUMNS, conditions, k,
+            two_stage=two_stage, exclude=set(ctx.excluded), **partition,
+        )
+    return retrieve
+
+
+def geo_cells(radius_param: str = "radius_km", default_radius_km: float = 5.0) -> Retriever:
+    """
+    Everyone inside the radius, nearest first: ids + coordinates from the
+    covering geohash cells, exact distances in one NumPy pass, then only
+    the nearest k are hydrated. The radius is capped at MAX_RADIUS_KM and
+    the cell scan at GEO_MAX_SCAN_ROWS (in dense areas the nearest k are
+    then taken from that subset).
+    """
+    async def retrieve(ctx: RankContext, conditions: list, k: int) -> List:
+        user = ctx.user
+        if not (user.latitude and user.longitude):
+            return []
+        radius_km = min(ctx.params.get(radius_param, default_radius_km), MAX_RADIUS_KM)
+
+        cell_ranges = []
+        for cell in covering_cells(user.latitude, user.longitude, radius_km):
+            lo, hi = prefix_range(cell)
+            cell_ranges.append(and_(User.geohash >= lo, User.geohash < hi))
+
+        points = (await ctx.db.execute(
+            select(User.id, User.latitude, User.longitude)
+            .where(*conditions, or_(*cell_ranges))
+            .limit(GEO_MAX_SCAN_ROWS)
+        )).all()
+        if not points:
+            return []
+
+        distances = haversine_distances(
+            user.latitude, user.longitude,
+            [p.latitude for p in points], [p.longitude for p in points],
+        )
+        inside = np.flatnonzero(distances <= radius_km)
+        nearest = inside[np.argsort(distances[inside], kind="stable")][:k]
+        if not len(nearest):
+            return []
+
+        ids = [points[i].id for i in nearest]
+        if ctx.embedding is None:
+            stmt = select(*CANDIDATE_COLUMNS).where(User.id.in_(ids))
+        else:
+            stmt = (
+                select(*CANDIDATE_COLUMNS, embedding_similarity(ctx.embedding).label("similarity"))
+                .join(Profile, Profile.user_id == User.id)
+                .where(User.id.in_(ids), Profile.embedding.isnot(None), comparable_embedding())
+            )
+        return (await ctx.db.execute(stmt)).all()
+    return retrieve
+
+
+def random_sample(with_similarity: bool = True) -> Retriever:
+    """Seeded keyset sample (services/sampling.py), stable within a session."""
+    async def retrieve(ctx: RankContext, conditions: list, k: int) -> List:
+        columns = list(CANDIDATE_COLUMNS)
+        join_profile = with_similarity and ctx.embedding is not None
+        if join_profile:
+            columns.append(embedding_similarity(ctx.embedding).label("similarity"))
+            conditions = [*conditions, Profile.embedding.isnot(None), comparable_embedding()]
+        return await sample_users(
+            ctx.db,
+            columns=columns,
+            conditions=conditions,
+            k=k,
+            seed=session_seed(ctx.user.id, ctx.mode),
+            join_profile=join_profile,
+        )
+    return retrieve
+
+
+def recently_active(hours: int = 24) -> Retriever:
+    """Random sample restricted to users seen in the last `hours`."""
+    sample = random_sample(with_similarity=False)
+
+    async def retrieve(ctx: RankContext, conditions: list, k: int) -> List:
+        cutoff = ctx.now - timedelta(hours=hours)
+        return await sample(ctx, [*conditions, User.last_active >= cutoff], k)
+    return retrieve
+
+
+# -------------------------------
+# 🔹 Filters (SQL conditions, pushed into the retriever)
+# -------------------------------
+def age_range(ctx: RankContext) -> list:
+    return [User.age.between(ctx.params.get("min_age", 18), ctx.params.get("max_age", 100))]
+
+
+def gender_in(ctx: RankContext) -> list:
+    normalized = canonical_genders(ctx.params.get("gender"))
+    if not normalized:
+        return []
+    return [User.gender.in_(normalized)]
+
+
+def not_excluded(ids: List[str]) -> list:
+    """`users.id <> ALL(:ids)`: one array parameter however long the list."""
+    if not ids:
+        return []
+    excluded = bindparam(
+        "excluded_ids", [uuid.UUID(i) for i in ids], type_=ARRAY(PG_UUID(as_uuid=True)), unique=True
+    )
+    return [User.id != all_(excluded)]
+
+
+# -------------------------------
+# 🔹 Scorers (whole batch at once, each returns 0.0–1.0)
+# -------------------------------
+def embedding_score(ctx: RankContext, c: Candidates) -> np.ndarray:
+    return np.clip(c.similarity, 0, 1)
+
+
+def proximity_score(radius_param: str, default_km: float, missing: float = 0.5) -> Scorer:
+    """Linear falloff to 0 at the radius; `missing` when either side has no location."""
+    def score(ctx: RankContext, c: Candidates) -> np.ndarray:
+        max_km = ctx.params.get(radius_param, default_km)
+        d = c.distance_km
+        return np.where(np.isfinite(d), np.clip(1 - d / max_km, 0, 1), missing)
+    return score
+
+
+def recency_score(ctx: RankContext, c: Candidates) -> np.ndarray:
+    """1.0 if active right now, decaying to a 0.5 floor after 12h."""
+    return np.nan_to_num(np.clip(1 - c.idle_hours / 24, 0.5, 1.0), nan=0.5)
+
+
+def preference_alignment(ctx: RankContext, c: Candidates) -> np.ndarray:
+    """Gender ↔ preference both ways plus a soft age gap; 0.5 when nothing is known."""
+    user = ctx.user
+    return preference_alignment_scores(
+        user.gender_code, user.preference_mask, user.age,
+        c.gender_code, c.preference_mask, c.age,
+    )
+
+
+def constant_score(value: float) -> Scorer:
+    def score(ctx: RankContext, c: Candidates) -> np.ndarray:
+        return np.full(len(c), value)
+    return score
+
+
+def premium_boost(ctx: RankContext, c: Candidates, scores: np.ndarray) -> np.ndarray:
+    """+15% if both sides are premium, +10% if either is (capped at 1.0)."""
+    mine = (ctx.user.premium_tier or 0) > 0
+    theirs = c.premium_tier > 0
+    factor = np.where(theirs & mine, 1.15, np.where(theirs | mine, 1.10, 1.0))
+    return np.minimum(1.0, scores * factor)
+
+
+# -------------------------------
+# 🔹 Top-K
+# -------------------------------
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k best scores, best first (ties keep retrieval order)."""
+    if k <= 0 or not len(scores):
+        return np.array([], dtype=np.int64)
+    if len(scores) > k:
+        picked = np.sort(np.argpartition(-scores, k - 1)[:k])
+    else:
+        picked = np.arange(len(scores))
+    return picked[np.argsort(-scores[picked], kind="stable")]
+
+
+# -------------------------------
+# 🔹 Engine
+# -------------------------------
+async def recommend(
+    db: AsyncSession,
+    current_user: User,
+    mode: RecommendationMode,
+    limit: int = 20,
+    **params,
+) -> List[MatchResponse]:
+    from services.notification_service import fetch_user_media_map
+
+    ctx = RankContext(db=db, user=current_user, mode=mode.name, params=params)
+
+    if mode.needs_embedding:
+        ctx.embedding = await db.scalar(
+            select(Profile.embedding).where(Profile.user_id == current_user.id, comparable_embedding())
+        )
+        if ctx.embedding is None:
+            if mode.strict_profile:
+                raise HTTPException(
+                    status_code=400,
+                    detail="User profile not ready. Please complete profile creation first.",
+                )
+            return []
+
+    # 1️⃣ Retrieve (visibility, swiped / matched / blocked and mode filters
+    #    pushed into the retriever, so the pool is never spent on exclusions)
+    ctx.excluded = await exclusion_index.excluded_ids(db, current_user.id)
+    conditions = [
+        User.id != current_user.id,
+        User.is_active.is_(True),
+        User.is_profile_hidden.is_(False),
+        *not_excluded(ctx.excluded),
+    ]
+    for f in mode.filters:
+        conditions.extend(f(ctx))
+
+    rows = await mode.retriever(ctx, conditions, mode.pool_size(limit))
+    if not rows:
+        return []
+
+    # 2️⃣ Score the whole batch
+    batch = Candidates(ctx, rows)
+    scores = np.zeros(len(batch))
+    for weight, scorer in mode.scorers:
+        scores += weight * scorer(ctx, batch)
+    if mode.premium_boost:
+        scores = premium_boost(ctx, batch, scores)
+
+    # 3️⃣ Top-K, then media only for the survivors
+    picked = top_k(scores, limit)
+    chosen = [rows[i] for i in picked]
+    media_map = await fetch_user_media_map(db, [str(r.id) for r in chosen])
+    distances = batch.distance_km if mode.show_distance else None
+
+    matches = []
+    for i, r in zip(picked, chosen):
+        uid = str(r.id)
+        photos = media_map.get(uid, [])
+        distance_km = None
+        if distances is not None and np.isfinite(distances[i]):
+            distance_km = round(float(distances[i]), 2)
+
+        matches.append(
+            MatchResponse(
+                user_id=uid,
+                full_name=r.full_name or "",
+                age=r.age or 0,
+                bio=r.bio or "",
+                match_score=int(np.floor(scores[i] * 100)),
+                distance_km=distance_km,
+                photos=photos if mode.max_photos is None else photos[:mode.max_photos],
+            )
+        )
+
+    return matches
@@ -0,0 +1,177 @@
+# services/reply_speculation.py
+
+
+import asyncio
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.profile_model import AIUsage
+from utils.config import settings
+from utils.premium_utils import is_premium_user
+from services.ai_metrics import ai_metrics
+from services.ai_service import generate_replies, record_reply_usage, usage_today
+
+
+DEFAULT_TONE = "flirty"          # the WS handler's default for ai_request
+BUDGET_RECHECK_SECONDS = 600     # how long a user's speculate / don't decision is reused
+INFLIGHT_WAIT_SECONDS = 2.0      # an ai_request waits this long for a speculation still running
+MAX_ENTRIES = 10_000             # speculations held at once (oldest dropped first)
+MAX_TRACKED_USERS = 50_000       # last-tone / budget decisions remembered (LRU)
+
+
+def _remember(cache: OrderedDict, key, value, limit: int):
+    cache[key] = value
+    cache.move_to_end(key)
+    while len(cache) > limit:
+        cache.popitem(last=False)
+
+
+class ReplySpeculator:
+    """
+    Pre-generates reply suggestions for premium users when a text message is
+    delivered to them, so the ai_request that usually follows is served from
+    memory instead of waiting on the provider.
+
+    - Entries are keyed by (message_id, tone) (tone = the user's last used
+      one), expire after AI_SPECULATION_TTL_SECONDS and are served once;
+      at most MAX_ENTRIES are held, and per-user state is an LRU of
+      MAX_TRACKED_USERS.
+    - An ai_request arriving while the speculation is still running waits for
+      it (briefly) instead of starting a second generation.
+    - Budget guard: only users who have requested suggestions within
+      AI_SPECULATION_LOOKBACK_DAYS, and whose speculation hit rate there
+      (ai_usage.speculation_hits / speculated_count) is at least
+      AI_SPECULATION_MIN_HIT_RATE once past the warm-up, are speculated for.
+    - Generation runs at background priority in the AI scheduler.
+    """
+
+    def __init__(self, ttl: int = settings.AI_SPECULATION_TTL_SECONDS):
+        self.ttl = ttl
+        # (message_id, tone) -> (owner user id, expires_at, future with the replies or None)
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[str, float, asyncio.Future]]" = OrderedDict()
+        self._last_tone: "OrderedDict[str, str]" = OrderedDict()
+        self._budget: "OrderedDict[str, Tuple[bool, float]]" = OrderedDict()
+        self._tasks: set = set()
+
+    # -------------------------------
+    # 🔹 Budget guard
+    # -------------------------------
+    async def _allowed(self, db: AsyncSession, user_id: str) -> bool:
+        now = time.monotonic()
+        cached = self._budget.get(user_id)
+        if cached and now - cached[1] < BUDGET_RECHECK_SECONDS:
+            return cached[0]
+
+        allowed = False
+        if await is_premium_user(db, user_id):
+            since = datetime.now(timezone.utc) - timedelta(days=settings.AI_SPECULATION_LOOKBACK_DAYS)
+            requests, speculated, hits = (await db.execute(
+                select(
+                    func.coalesce(func.sum(AIUsage.ai_generated_count), 0),
+                    func.coalesce(func.sum(AIUsage.speculated_count), 0),
+                    func.coalesce(func.sum(AIUsage.speculation_hits), 0),
+                ).where(AIUsage.user_id == user_id, AIUsage.last_generated_at >= since)
+            )).one()
+            if requests == 0:
+                allowed = False   # doesn't use suggestions: nothing to speculate for
+            elif speculated < settings.AI_SPECULATION_WARMUP:
+                allowed = True
+            else:
+                allowed = hits / speculated >= settings.AI_SPECULATION_MIN_HIT_RATE
+
+        _remember(self._budget, user_id, (allowed, now), MAX_TRACKED_USERS)
+        return allowed
+
+    # -------------------------------
+    # 🔹 Producer (message delivery)
+    # -------------------------------
+    def speculate(self, user_id, message_id, content: Optional[str]):
+        """Fire-and-forget from the delivery path: user_id is the receiver."""
+        if not settings.AI_SPECULATION_ENABLED or not content:
+            return
+        task = asyncio.create_task(self._speculate(str(user_id), str(message_id), content))
+        self._tasks.add(task)   # keep a reference until it finishes
+        task.add_done_callback(self._tasks.discard)
+
+    async def _speculate(self, user_id: str, message_id: str, content: str):
+        from db.session import async_session
+
+        tone = self._last_tone.get(user_id, DEFAULT_TONE)
+        key = (message_id, tone)
+        if key in self._entries:
+            return
+        try:
+            async with async_session() as db:
+                if not await self._allowed(db, user_id):
+                    return
+        except Exception as e:
+            print(f"⚠️ Speculation budget check failed for {user_id}: {e}")
+            return
+
+        self._evict()
+        future = asyncio.get_running_loop().create_future()
+        _remember(self._entries, key, (user_id, time.monotonic() + self.ttl, future), MAX_ENTRIES)
+        try:
+            replies = await generate_replies(content, tone, user_id, priority="background", hedge=False,
+                                             site="reply_speculation")
+        except Exception as e:
+            print(f"⚠️ Speculative replies failed for {message_id}: {e}")
+            replies = None
+        if not replies:
+            self._entries.pop(key, None)
+            future.set_result(None)   # waiting requests fall through to a normal generation
+            return
+        future.set_result(replies)
+
+        try:
+            async with async_session() as db:
+                usage = await usage_today(db, user_id)
+                if usage:
+                    usage.speculated_count = (usage.speculated_count or 0) + 1
+                else:
+                    db.add(AIUsage(user_id=user_id, ai_generated_count=0, speculated_count=1,
+                                   last_generated_at=datetime.now(timezone.utc)))
+                await db.commit()
+        except Exception as e:
+            print(f"⚠️ Speculation usage update failed for {user_id}: {e}")
+
+    def _evict(self):
+        """Drop expired, settled entries (entries are stored in expiry order, so stop at the first live one)."""
+        now = time.monotonic()
+        for key, (_, expires_at, future) in list(self._entries.items()):
+            if expires_at >= now:
+                break
+            if future.done():
+                del self._entries[key]
+
+    # -------------------------------
+    # 🔹 Consumer (ai_request)
+    # -------------------------------
+    async def serve(self, db: AsyncSession, user_id, message_id, tone: str) -> Optional[dict]:
+        """The ai_request response from a speculation, or None (caller generates as usual)."""
+        user_id = str(user_id)
+        _remember(self._last_tone, user_id, tone, MAX_TRACKED_USERS)
+        self._evict()
+        key = (str(message_id), tone)
+        entry = self._entries.get(key)
+        if not entry or entry[0] != user_id or entry[1] < time.monotonic():
+            return None
+
+        try:
+            replies = await asyncio.wait_for(asyncio.shield(entry[2]), INFLIGHT_WAIT_SECONDS)
+        except asyncio.TimeoutError:
+            return None
+        if not replies or self._entries.pop(key, None) is None:
+            return None   # failed, or another request already took it
+
+        ai_metrics.record_event("reply_speculation", "speculation_hit")
+        premium = await is_premium_user(db, user_id)
+        remaining = await record_reply_usage(db, user_id, premium, await usage_today(db, user_id),
+                                             speculation_hit=True)
+        return {"replies": replies, "remaining_today": remaining}
+
+
+reply_speculator = ReplySpeculator()
@@ -0,0 +1,58 @@
+# services/sampling.py
+
+
+import hashlib
+import time
+from typing import List
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.user_model import User
+from models.profile_model import Profile
+
+
+SESSION_WINDOW_SECONDS = 30 * 60   # same seed (= same shuffle) for 30 minutes
+
+
+def session_seed(user_id, salt: str = "", window: int = SESSION_WINDOW_SECONDS) -> float:
+    """
+    Deterministic seed in [0, 1) for (user, time window, salt).
+    Pages requested within one window walk the same shuffle.
+    """
+    bucket = int(time.time() // window)
+    digest = hashlib.blake2b(f"{user_id}:{bucket}:{salt}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big") / 2 ** 64
+
+
+async def sample_users(
+    db: AsyncSession,
+    columns: list,
+    conditions: list,
+    k: int,
+    seed: float,
+    join_profile: bool = False,
+) -> List:
+    """
+    Random sample of up to k rows that costs O(k), not O(table).
+
+    Every user carries an indexed, uniformly random `random_key`; a sample
+    is a keyset walk of that index starting at `seed` (wrapping around at
+    1.0). Rows come back in random_key order, i.e. already shuffled, and the
+    same seed always yields the same sequence (paging over it is done on
+    ranked snapshots, services/deck_sessions.py).
+    """
+    def _page(lower, upper, n):
+        stmt = select(*columns, User.random_key)
+        if join_profile:
+            stmt = stmt.join(Profile, Profile.user_id == User.id)
+        bounds = [User.random_key >= lower]
+        if upper is not None:
+            bounds.append(User.random_key < upper)
+        return stmt.where(*conditions, *bounds).order_by(User.random_key).limit(n)
+
+    rows = (await db.execute(_page(seed, None, k))).all()
+
+    # wrap around: [0, seed) once the tail of the keyspace is exhausted
+    if len(rows) < k:
+        rows += (await db.execute(_page(0.0, seed, k - len(rows)))).all()
+
+    return rows
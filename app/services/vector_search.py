@@ -0,0 +1,266 @@
+# services/vector_search.py
+
+
+from types import SimpleNamespace
+from typing import List, Optional, Tuple
+from sqlalchemy import select, text, update, literal_column
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.user_model import User
+from models.profile_model import Profile
+from utils.config import settings
+from utils.gender import PARTITION_GENDERS, canonical_gender
+from services.embedding_index import embedding_index, coarse_projection
+from services.embedding_providers import comparable_embedding
+
+
+INDEX_OVERFETCH = 4   # in-memory top-K is over-fetched to survive SQL filters
+HNSW_MAX_EF_SEARCH = 1000   # pgvector's upper bound for hnsw.ef_search
+
+
+# -------------------------------
+# 🔹 Distance / similarity expressions
+# -------------------------------
+def embedding_distance(embedding):
+    """
+    Full-precision cosine distance to `embedding` (scoring / re-ranking).
+    ANN ordering uses `_ann_column()`, which idx_profiles_embedding_half_hnsw covers.
+    """
+    return Profile.embedding.cosine_distance(embedding)
+
+
+def embedding_similarity(embedding):
+    """Cosine similarity (-1..1; text-embedding-3 vectors are unit length)."""
+    return 1 - embedding_distance(embedding)
+
+
+def _ann_column():
+    """Column the ANN index covers (see VECTOR_STORAGE)."""
+    if settings.VECTOR_STORAGE == "halfvec":
+        return Profile.embedding_half
+    return Profile.embedding
+
+
+def store_embedding(profile: Profile, embedding, user: Optional[User] = None, model: Optional[str] = None):
+    """
+    Write the full-precision vector with its halfvec copy and coarse
+    projection (and the gender partition key when `user` is given, the
+    producing model when `model` is).
+    """
+    if model is not None:
+        profile.embedding_model = model
+    profile.embedding = embedding
+    profile.embedding_half = embedding
+    profile.embedding_coarse = None if embedding is None else coarse_projection(embedding).tolist()
+    if user is not None:
+        profile.search_gender = canonical_gender(user.gender)
+
+
+async def sync_search_partition(db: AsyncSession, user: User):
+    """users.gender / age changed: keep profiles.search_gender and the in-process partitions in step."""
+    await db.execute(
+        update(Profile)
+        .where(Profile.user_id == user.id)
+        .values(search_gender=canonical_gender(user.gender))
+    )
+    await db.commit()
+    embedding_index.set_partition(user.id, user.gender, user.age)
+
+
+# -------------------------------
+# 🔹 Index tuning
+# -------------------------------
+async def tune_vector_search(db: AsyncSession, k: int = 0, iterative: bool = False):
+    """
+    Apply HNSW query-time tuning for the current transaction only.
+    Higher ef_search = better recall, slower queries. An HNSW scan returns
+    at most ef_search rows, so it is raised to the query's LIMIT `k`.
+
+    iterative=True keeps walking the graph until enough rows pass the
+    WHERE clause (pgvector >= 0.8; a no-op on older versions).
+    """
+    await db.execute(
+        text("SELECT set_config('hnsw.ef_search', :value, true)"),
+        {"value": str(min(max(settings.VECTOR_HNSW_EF_SEARCH, k), HNSW_MAX_EF_SEARCH))},
+    )
+    if not iterative:
+        return
+    try:
+        async with db.begin_nested():
+            await db.execute(
+                text(
+                    "SELECT set_config('hnsw.iterative_scan', :mode, true), "
+                    "set_config('hnsw.max_scan_tuples', :tuples, true)"
+                ),
+                {"mode": settings.VECTOR_ITERATIVE_SCAN, "tuples": str(settings.VECTOR_MAX_SCAN_TUPLES)},
+            )
+    except Exception as e:
+        print(f"⚠️ HNSW iterative scan unavailable: {e}")
+
+
+# -------------------------------
+# 🔹 Top-K nearest profiles
+# -------------------------------
+def _reranked(ann) -> bool:
+    return ann is Profile.embedding_half and settings.VECTOR_RERANK_OVERFETCH > 0
+
+
+def _ann_fetch(k: int) -> int:
+    """Rows the HNSW walk must return for a top-k (LIMIT of `_ann_query`)."""
+    return k * settings.VECTOR_RERANK_OVERFETCH if _reranked(_ann_column()) else k
+
+
+async def _ann_query(db: AsyncSession, embedding, columns: list, conditions: list, k: int):
+    ann = _ann_column()
+    rerank = _reranked(ann)
+    fetch = _ann_fetch(k)
+    similarity = (
+        embedding_similarity(embedding) if rerank or ann is Profile.embedding
+        else 1 - ann.cosine_distance(embedding)
+    )
+
+    stmt = (
+        select(*columns, similarity.label("similarity"))
+        .join(Profile, Profile.user_id == User.id)
+        .where(ann.isnot(None), comparable_embedding(), *conditions)
+        .order_by(ann.cosine_distance(embedding))
+        .limit(fetch)
+    )
+
+    rows = (await db.execute(stmt)).all()
+    if rerank:
+        rows = sorted(rows, key=lambda r: r.similarity, reverse=True)[:k]
+    return rows
+
+
+async def nearest_profiles(
+    db: AsyncSession,
+    embedding,
+    columns: list,
+    conditions: list,
+    k: int,
+    genders: Optional[List[str]] = None,
+):
+    """
+    Return the k rows nearest to `embedding` (closest first).
+    `columns` / `conditions` are User/Profile expressions (users ⋈ profiles);
+    a `similarity` column is always appended.
+
+    With halfvec storage the index walk runs on the float16 copy and the
+    over-fetched candidates are re-ranked by full-precision similarity.
+
+    `genders` (canonical) routes each gender to its partial HNSW index.
+    When the filters leave fewer than k rows, the search is repeated with
+    an iterative index scan instead of silently returning a short list.
+    """
+    await tune_vector_search(db, _ann_fetch(k))
+
+    partitions = [[]]
+    if genders and set(genders) <= set(PARTITION_GENDERS):
+        # literal (not a bind param) so the planner can match the partial index predicate
+        partitions = [[Profile.search_gender == literal_column(f"'{g}'")] for g in genders]
+
+    async def _search():
+        found = []
+        for extra in partitions:
+            found += await _ann_query(db, embedding, columns, [*conditions, *extra], k)
+        return found
+
+    rows = await _search()
+    if len(rows) < k:
+        await tune_vector_search(db, _ann_fetch(k), iterative=True)
+        rows = await _search()
+
+    if len(partitions) > 1:
+        rows = sorted(rows, key=lambda r: r.similarity, reverse=True)
+    return rows[:k]
+
+
+# -------------------------------
+# 🔹 Two-stage: coarse projection shortlist, full-precision re-rank
+# -------------------------------
+async def two_stage_profiles(
+    db: AsyncSession,
+    embedding,
+    columns: list,
+    conditions: list,
+    k: int,
+):
+    """
+    Same contract as `nearest_profiles`. The HNSW walk runs on the 256-d
+    `embedding_coarse` projection to shortlist VECTOR_COARSE_SHORTLIST
+    profiles; only those are re-ranked by full 1536-d similarity
+    (one round trip: the shortlist is a subquery).
+    """
+    size = max(k, settings.VECTOR_COARSE_SHORTLIST)
+    await tune_vector_search(db, size)
+
+    coarse = coarse_projection(embedding).tolist()
+    shortlist = (
+        select(Profile.user_id)
+        .join(User, User.id == Profile.user_id)
+        .where(Profile.embedding_coarse.isnot(None), comparable_embedding(), *conditions)
+        .order_by(Profile.embedding_coarse.cosine_distance(coarse))
+        .limit(size)
+    )
+
+    stmt = (
+        select(*columns, embedding_similarity(embedding).label("similarity"))
+        .join(Profile, Profile.user_id == User.id)
+        .where(User.id.in_(shortlist.scalar_subquery()))
+        .order_by(embedding_distance(embedding))
+        .limit(k)
+    )
+
+    result = await db.execute(stmt)
+    return result.all()
+
+
+# -------------------------------
+# 🔹 Top-K via in-process matrix (HNSW fallback)
+# -------------------------------
+async def similar_candidates(
+    db: AsyncSession,
+    embedding,
+    columns: list,
+    conditions: list,
+    k: int,
+    two_stage: bool = False,
+    genders: Optional[List[str]] = None,
+    age_range: Optional[Tuple[int, int]] = None,
+    exclude: Optional[set] = None,
+):
+    """
+    Same contract as `nearest_profiles`, but when the in-process embedding
+    matrix is loaded the similarity is one mat-vec in NumPy and Postgres
+    only hydrates / filters the winning ids (no vector math in SQL).
+    Falls back to the HNSW path while the matrix is loading or when the
+    filters reject too many of the over-fetched ids.
+
+    two_stage=True shortlists on the coarse projection first (both paths).
+    genders / age_range (already part of `conditions`) let the matrix score
+    only that partition and route SQL to the per-gender partial indexes.
+    exclude (user ids, also in `conditions`) is masked out of the matrix
+    scores so excluded users never take a slot of the over-fetch.
+    """
+    if settings.EMBEDDING_INDEX_ENABLED and embedding_index.ready:
+        fetch = k * INDEX_OVERFETCH
+        shortlist = max(fetch, settings.VECTOR_COARSE_SHORTLIST) if two_stage else 0
+        ranked = await embedding_index.top_k(
+            embedding, fetch, exclude=exclude, shortlist=shortlist, genders=genders, age_range=age_range
+        )
+        if ranked:
+            sims = dict(ranked)
+            result = await db.execute(
+                select(*columns).where(User.id.in_(list(sims)), *conditions)
+            )
+            rows = [
+                SimpleNamespace(**row._mapping, similarity=sims[str(row.id)])
+                for row in result
+            ]
+            if len(rows) >= k or len(ranked) < fetch:
+                rows.sort(key=lambda r: r.similarity, reverse=True)
+                return rows[:k]
+
+    if two_stage and not genders:
+        return await two_stage_profiles(db, embedding, columns, conditions, k)
+    return await nearest_profiles(db, embedding, columns, conditions, k, genders=genders)
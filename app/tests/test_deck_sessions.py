@@ -0,0 +1,43 @@
+# tests/test_deck_sessions.py
+
+
+import asyncio
+from types import SimpleNamespace
+import numpy as np
+from schemas.match_schema import MatchResponse
+from services.discovery_feed import DiscoveryFeed, FEED_SIZE
+from services.exclusion_index import ExclusionSet
+import services.deck_sessions as deck_sessions_module
+
+
+def _match(i: int) -> MatchResponse:
+    return MatchResponse(user_id=f"c{i}", full_name="", age=30, bio="", match_score=50, photos=[])
+
+
+def test_swipe_does_not_rerank_the_deck(monkeypatch):
+    feed = DiscoveryFeed()
+    calls = []
+
+    async def builder(db, current_user, limit, **params):
+        calls.append(limit)
+        return [_match(i) for i in range(limit)]
+
+    async def no_exclusions(db, user_id):
+        return ExclusionSet(np.array([], dtype=np.int32))
+
+    feed.register("default", builder)
+    monkeypatch.setattr(deck_sessions_module, "discovery_feed", feed)
+    monkeypatch.setattr(deck_sessions_module.exclusion_index, "get", no_exclusions)
+    sessions = deck_sessions_module.DeckSessions()
+    owner = SimpleNamespace(id="owner")
+
+    async def scenario():
+        first, _ = await sessions.page(None, owner, "default", limit=20)
+        feed.remove_candidate("owner", first[0].user_id)   # swipe
+        again, _ = await sessions.page(None, owner, "default", limit=20)
+        return first, again
+
+    first, again = asyncio.run(scenario())
+
+    assert calls == [FEED_SIZE]
+    assert again[0].user_id == first[1].user_id
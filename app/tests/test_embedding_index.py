@@ -0,0 +1,55 @@
+# tests/test_embedding_index.py
+
+
+import asyncio
+import threading
+import numpy as np
+from services.embedding_index import EmbeddingIndex
+
+
+def _index(n: int = 500, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((n, 1536)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    index = EmbeddingIndex()
+    for i, v in enumerate(vectors):
+        index.upsert(f"u{i}", v)
+    return index, vectors
+
+
+def test_top_k_matches_brute_force():
+    index, vectors = _index()
+    ranked = asyncio.run(index.top_k(vectors[7], 5))
+    expected = np.argsort(-(vectors @ vectors[7]))[:5]
+    assert [uid for uid, _ in ranked] == [f"u{i}" for i in expected]
+
+
+def test_concurrent_upsert_never_mislabels_scores():
+    index, vectors = _index()
+    query = vectors[7]
+    scored, mutated = threading.Event(), threading.Event()
+    score = index._score
+
+    def slow_score(*args):
+        result = score(*args)
+        scored.set()
+        mutated.wait(5)   # the event loop rewrites rows before the result is used
+        return result
+
+    index._score = slow_score
+    replacement = -query   # opposite vector, recycled into u7's row
+
+    async def scenario():
+        search = asyncio.create_task(index.top_k(query, 5))
+        await asyncio.to_thread(scored.wait, 5)
+        index.remove("u7")
+        index.upsert("new", replacement)   # reuses the freed row
+        mutated.set()
+        return await search
+
+    ranked = asyncio.run(scenario())
+
+    assert index._rows["new"] == 7 and "u7" not in index
+    for uid, similarity in ranked:
+        assert uid not in ("u7", "new")
+        assert np.isclose(similarity, float(index.vector(uid) @ query), atol=1e-5)
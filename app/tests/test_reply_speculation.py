@@ -0,0 +1,43 @@
+# tests/test_reply_speculation.py
+
+
+import asyncio
+import time
+import services.reply_speculation as speculation
+
+
+def _settled(loop, value=None):
+    future = loop.create_future()
+    future.set_result(value)
+    return future
+
+
+def test_state_is_bounded(monkeypatch):
+    monkeypatch.setattr(speculation, "MAX_ENTRIES", 3)
+    monkeypatch.setattr(speculation, "MAX_TRACKED_USERS", 2)
+    speculator = speculation.ReplySpeculator()
+
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        for i in range(5):
+            speculation._remember(speculator._entries, (f"m{i}", "flirty"),
+                                  ("u", time.monotonic() + 60, _settled(loop)), speculation.MAX_ENTRIES)
+        for i in range(4):
+            await speculator.serve(None, f"u{i}", "nope", "funny")
+
+    asyncio.run(scenario())
+    assert list(speculator._entries) == [("m2", "flirty"), ("m3", "flirty"), ("m4", "flirty")]
+    assert list(speculator._last_tone) == ["u2", "u3"]
+
+
+def test_expired_entries_are_swept_on_serve():
+    speculator = speculation.ReplySpeculator()
+
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        speculator._entries[("old", "flirty")] = ("u", time.monotonic() - 1, _settled(loop, ["hi"]))
+        speculator._entries[("new", "flirty")] = ("u", time.monotonic() + 60, _settled(loop, None))
+        return await speculator.serve(None, "other", "unrelated", "flirty")
+
+    assert asyncio.run(scenario()) is None
+    assert list(speculator._entries) == [("new", "flirty")]
@@ -0,0 +1,24 @@
+# tests/test_reply_stream.py
+
+
+import asyncio
+from types import SimpleNamespace
+import pytest
+import services.ai_service as ai_service
+
+
+def test_on_reply_errors_propagate_without_fallback(monkeypatch):
+    async def context(db, user_id, message_id):
+        return SimpleNamespace(content="Hey, how was the hike?"), True, None
+
+    monkeypatch.setattr(ai_service, "_reply_context", context)
+    sent = []
+
+    async def on_reply(index, text):
+        sent.append(text)
+        raise ConnectionError("socket closed")
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(ai_service.stream_ai_replies_service(None, "u1", "m1", "flirty", on_reply))
+
+    assert len(sent) == 1 and sent[0] not in ai_service.FALLBACK_REPLIES["flirty"]
@@ -15,6 +15,69 @@ class Settings(BaseSettings):
     # OpenAI
     OPENAI_API_KEY: str
 
+    # AI gateway (services/ai_gateway.py)
+    AI_BASE_URL: str = "https://openrouter.ai/api/v1"   # "stub" = in-process stub (services/ai_stub_server.py)
+    AI_TIMEOUT_SECONDS: float = 30.0
+    AI_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    AI_MAX_CONNECTIONS: int = 100
+    AI_MAX_KEEPALIVE: int = 20
+    AI_MAX_RETRIES: int = 1                 # transient failures only (timeouts, 429, 5xx)
+    AI_BREAKER_FAILURES: int = 5            # consecutive failures that open the circuit
+    AI_BREAKER_RESET_SECONDS: float = 30.0  # open -> half-open trial after this
+    AI_HEDGE_DELAY_MS: int = 1500           # interactive calls race a 2nd request after this
+    AI_SCHEDULER_CONCURRENCY: int = 16      # provider calls in flight, all classes
+    AI_SCHEDULER_INTERACTIVE_RESERVED: int = 4  # slots only chat suggestions may use
+    AI_SCHEDULER_BACKGROUND_SLOTS: int = 6  # ceiling for jobs/refreshes/embeddings (halved on 429)
+    AI_METRICS_LOG_PATH: Optional[str] = "logs/ai_calls.jsonl"   # one JSON line per AI call; "" disables
+    AI_METRICS_LOG_MAX_MB: int = 20
+    AI_METRICS_LOG_BACKUPS: int = 5
+    AI_SPECULATION_ENABLED: bool = True     # pre-generate reply suggestions for premium receivers
+    AI_SPECULATION_TTL_SECONDS: int = 300   # how long a pre-generated suggestion stays servable
+    AI_SPECULATION_LOOKBACK_DAYS: int = 14  # ai_usage history the budget guard looks at
+    AI_SPECULATION_WARMUP: int = 20         # speculations allowed before the hit rate is trusted
+    AI_SPECULATION_MIN_HIT_RATE: float = 0.15
+    AI_STUB_LATENCY_MS: int = 300
+    AI_STUB_JITTER_MS: int = 200
+    AI_STUB_FAILURE_RATE: float = 0.0       # share of stub calls answered with a 503
+
+    # Vector search (pgvector HNSW on profiles.embedding)
+    VECTOR_HNSW_EF_SEARCH: int = 40   # query-time candidate list; raise for recall
+    VECTOR_STORAGE: str = "halfvec"   # ANN column: "halfvec" (embedding_half) or "vector" (full precision)
+    VECTOR_RERANK_OVERFETCH: int = 4  # halfvec candidates per result re-ranked at full precision; 0 = no re-rank
+    VECTOR_COARSE_SHORTLIST: int = 300  # two-stage retrieval: 256-d shortlist size before the 1536-d re-rank
+    VECTOR_ITERATIVE_SCAN: str = "relaxed_order"  # filtered-search fallback (pgvector >= 0.8)
+    VECTOR_MAX_SCAN_TUPLES: int = 20000
+
+    # In-process embedding matrix (services/embedding_index.py)
+    EMBEDDING_INDEX_ENABLED: bool = True
+    EMBEDDING_INDEX_DTYPE: str = "float32"   # "float16" halves RAM, "int8" quarters it
+
+    # Embedding generation (services/embedding_batcher.py)
+    EMBEDDING_MODEL: str = "text-embedding-3-small"
+    EMBEDDING_PROVIDER: str = "remote"      # "local" = deterministic CPU hashing (CI, load tests, offline)
+    EMBEDDING_LOCAL_FALLBACK: bool = True   # embed locally while the remote provider is down
+    EMBEDDING_BATCH_SIZE: int = 64          # texts per embeddings request
+    EMBEDDING_BATCH_WINDOW_MS: int = 20     # how long a lone request waits for company
+    EMBEDDING_BATCH_CONCURRENCY: int = 4    # parallel requests for bulk re-embeds
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_TTL_DAYS: int = 30      # unused entries older than this are pruned
+    EMBEDDING_CACHE_MAX_ROWS: int = 200_000 # beyond this, least recently used go first
+
+    # LLM answer cache (services/llm_cache.py)
+    LLM_CACHE_MAX_AGE_DAYS: int = 30        # older entries are served, then refreshed in the background
+
+    # /insights/me enrichment (services/insights_service.py)
+    INSIGHTS_LLM_CONCURRENCY: int = 8       # LLM calls in flight per request
+    INSIGHTS_DEADLINE_SECONDS: float = 1.5  # after this, unfinished items get deterministic text
+    INSIGHTS_LLM_BATCH_SIZE: int = 5        # candidates per batched prompt; 1 = one call per pair
+
+    # Background AI jobs (services/job_queue.py)
+    AI_JOB_WORKERS: int = 4
+    AI_JOB_MAX_ATTEMPTS: int = 5
+    AI_JOB_BACKOFF_SECONDS: float = 5.0     # doubles per attempt, capped at 10 min
+    AI_JOB_POLL_SECONDS: float = 2.0
+    AI_JOB_LEASE_SECONDS: int = 300         # "running" longer than this = worker died, requeue
+
     class Config:
         env_file = ".env"
         extra = "ignore"
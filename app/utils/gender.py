@@ -0,0 +1,91 @@
+# utils/gender.py
+
+from typing import Iterable, List, Optional
+
+
+CANONICAL = {
+    "men": "male",
+    "man": "male",
+    "male": "male",
+
+    "women": "female",
+    "woman": "female",
+    "female": "female",
+
+    "non-binary": "non-binary",
+    "nonbinary": "non-binary",
+    "nb": "non-binary",
+    "other": "non-binary",
+}
+
+# genders with their own partial vector index (profiles.search_gender)
+PARTITION_GENDERS = ("male", "female", "non-binary")
+
+
+def canonical_gender(value: Optional[str]) -> Optional[str]:
+    """'Women' -> 'female'; unknown values pass through lower-cased."""
+    if not value:
+        return None
+    v = value.strip().lower()
+    return CANONICAL.get(v, v)
+
+
+def canonical_genders(values: Optional[Iterable[str]]) -> Optional[List[str]]:
+    if not values:
+        return None
+    return sorted({canonical_gender(v) for v in values if v})
+
+
+# -------------------------------
+# 🔹 Integer codes (users.gender_code / users.preference_mask)
+# -------------------------------
+# gender_code: 0 = unknown, custom text = GENDER_OTHER
+GENDER_CODES = {"male": 1, "female": 2, "non-binary": 3}
+GENDER_OTHER = 4
+ANY_GENDER = sum(1 << c for c in GENDER_CODES.values())
+
+# preference words -> genders they accept; "straight" / "gay" depend on own gender
+_PREFERENCE_WORDS = {
+    "both": ANY_GENDER & ~(1 << GENDER_CODES["non-binary"]),
+    "everyone": ANY_GENDER,
+    "anyone": ANY_GENDER,
+    "all": ANY_GENDER,
+    "any": ANY_GENDER,
+    "bi": ANY_GENDER,
+    "bisexual": ANY_GENDER,
+    "pan": ANY_GENDER,
+    "pansexual": ANY_GENDER,
+    "queer": ANY_GENDER,
+    "lesbian": 1 << GENDER_CODES["female"],
+}
+_OPPOSITE = {"male": "female", "female": "male"}
+
+
+def gender_code(value: Optional[str]) -> int:
+    """Small int code for a free-text gender (0 when unset)."""
+    key = canonical_gender(value)
+    if not key:
+        return 0
+    return GENDER_CODES.get(key, GENDER_OTHER)
+
+
+def preference_mask(preference: Optional[str], gender: Optional[str] = None) -> int:
+    """
+    Bitmask (1 << gender_code) of the genders a preference accepts, e.g.
+    "women" -> female, "bi" -> everyone, "straight" for a man -> female.
+    0 when nothing in the text is recognised.
+    """
+    if not preference:
+        return 0
+    mine = canonical_gender(gender)
+    mask = 0
+    for word in preference.replace(",", " ").replace("/", " ").lower().split():
+        if word in _PREFERENCE_WORDS:
+            mask |= _PREFERENCE_WORDS[word]
+        elif word in ("straight", "hetero", "heterosexual") and mine in _OPPOSITE:
+            mask |= 1 << GENDER_CODES[_OPPOSITE[mine]]
+        elif word in ("gay", "homosexual") and mine in GENDER_CODES:
+            mask |= 1 << GENDER_CODES[mine]
+        elif CANONICAL.get(word) in GENDER_CODES:
+            mask |= 1 << GENDER_CODES[CANONICAL[word]]
+    return mask
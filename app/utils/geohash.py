@@ -0,0 +1,109 @@
+# utils/geohash.py
+
+import math
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+GEOHASH_PRECISION = 9      # stored on users (~4.8m x 4.8m cells)
+MAX_COVER_CELLS = 16       # upper bound on cells per proximity query
+
+
+def encode(lat: float, lon: float, precision: int = GEOHASH_PRECISION) -> str:
+    """Standard geohash (interleaved lon/lat bits, base32)."""
+    lat_lo, lat_hi = -90.0, 90.0
+    lon_lo, lon_hi = -180.0, 180.0
+    chars = []
+    bits = 0
+    ch = 0
+    even = True  # even bit -> longitude
+
+    while len(chars) < precision:
+        if even:
+            mid = (lon_lo + lon_hi) / 2
+            if lon >= mid:
+                ch = (ch << 1) | 1
+                lon_lo = mid
+            else:
+                ch <<= 1
+                lon_hi = mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if lat >= mid:
+                ch = (ch << 1) | 1
+                lat_lo = mid
+            else:
+                ch <<= 1
+                lat_hi = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[ch])
+            bits = 0
+            ch = 0
+
+    return "".join(chars)
+
+
+def prefix_range(cell: str) -> tuple[str, str]:
+    """[lo, hi) string range of every geohash under `cell` (needs C collation)."""
+    return cell, cell + "~"
+
+
+def cell_size_deg(precision: int) -> tuple[float, float]:
+    """(lat_degrees, lon_degrees) spanned by one cell at `precision`."""
+    total = 5 * precision
+    lon_bits = (total + 1) // 2
+    lat_bits = total // 2
+    return 180.0 / (2 ** lat_bits), 360.0 / (2 ** lon_bits)
+
+
+def _cells_for_bbox(lat_min, lat_max, lon_min, lon_max, precision) -> set[str]:
+    lat_step, lon_step = cell_size_deg(precision)
+    cells = set()
+
+    # snap to cell grid so every cell intersecting the box is sampled once
+    lat = math.floor((lat_min + 90) / lat_step) * lat_step - 90
+    while lat <= lat_max:
+        lon = math.floor((lon_min + 180) / lon_step) * lon_step - 180
+        while lon <= lon_max:
+            sample_lat = min(89.999999, max(-90.0, lat + lat_step / 2))
+            sample_lon = ((lon + lon_step / 2 + 180) % 360) - 180
+            cells.add(encode(sample_lat, sample_lon, precision))
+            lon += lon_step
+        lat += lat_step
+
+    return cells
+
+
+def covering_cells(lat: float, lon: float, radius_km: float) -> list[str]:
+    """
+    Geohash prefixes whose union covers the circle (via its bounding box).
+    Picks the finest precision that needs at most MAX_COVER_CELLS cells
+    (only precision 1 may exceed it: the box spans most of the globe).
+    """
+    lat_range = radius_km / 111
+    lon_range = radius_km / (111 * max(0.01, math.cos(math.radians(lat))))
+
+    lat_min, lat_max = max(-90.0, lat - lat_range), min(90.0, lat + lat_range)
+    lon_min, lon_max = lon - lon_range, lon + lon_range
+
+    if lon_range >= 180:
+        return list(_BASE32)
+
+    best = None
+    for precision in range(1, GEOHASH_PRECISION + 1):
+        lat_step, lon_step = cell_size_deg(precision)
+        estimate = (math.ceil((lat_max - lat_min) / lat_step) + 1) * (
+            math.ceil((lon_max - lon_min) / lon_step) + 1
+        )
+        if estimate > MAX_COVER_CELLS:
+            break
+        best = precision
+
+    # the estimate is a heuristic: boxes straddling cell edges need more, so enforce the cap
+    precision = best or 1
+    cells = _cells_for_bbox(lat_min, lat_max, lon_min, lon_max, precision)
+    while len(cells) > MAX_COVER_CELLS and precision > 1:
+        precision -= 1
+        cells = _cells_for_bbox(lat_min, lat_max, lon_min, lon_max, precision)
+    return sorted(cells)
@@ -0,0 +1,59 @@
+# utils/json_stream.py
+
+import json
+from typing import List
+
+
+class JSONArrayStreamParser:
+    """
+    Incremental reader for a streamed JSON object like {"replies": ["...", "..."]}.
+
+    feed() takes raw text deltas as they arrive and returns the string items
+    of the `key` array that were completed by that delta (decoded, in order).
+    Only string items are reported; anything outside the array is skipped.
+    """
+
+    def __init__(self, key: str = "replies"):
+        self.key = key
+        self._last_string = None   # last complete string seen outside the array (candidate key)
+        self._in_array = False
+        self._done = False
+        self._in_string = False
+        self._escape = False
+        self._buf: List[str] = []
+
+    def feed(self, delta: str) -> List[str]:
+        items = []
+        for ch in delta:
+            if self._done:
+                break
+            if self._in_string:
+                self._buf.append(ch)
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    value = self._decode()
+                    if self._in_array:
+                        if value is not None:
+                            items.append(value)
+                    else:
+                        self._last_string = value
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                self._buf = ['"']
+            elif ch == "[" and not self._in_array and self._last_string == self.key:
+                self._in_array = True
+            elif ch == "]" and self._in_array:
+                self._done = True
+        return items
+
+    def _decode(self):
+        try:
+            return json.loads("".join(self._buf))
+        except ValueError:
+            return None
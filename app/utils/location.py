@@ -1,15 +1,20 @@
 # utils/location.py
 
-from math import radians, cos, sin, asin, sqrt
+import numpy as np
+
+def haversine_distances(lat, lon, lats, lons):
+    """
+    Vectorized haversine: km from (lat, lon) to every (lats[i], lons[i]).
+    Missing coordinates (None / NaN) come back as inf.
+    """
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    if lat is None or lon is None:
+        return np.full(lats.shape, np.inf)
 
-def haversine_distance(lat1, lon1, lat2, lon2):
-    """Return distance in kilometers between two points"""
-    if None in (lat1, lon1, lat2, lon2):
-        return float('inf')
     R = 6371  # Earth radius in km
-    lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
-    dlat = lat2 - lat1
-    dlon = lon2 - lon1
-    a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-    c = 2 * asin(sqrt(a))
-    return R * c
\ No newline at end of file
+    lat1, lon1 = np.radians(lat), np.radians(lon)
+    lat2, lon2 = np.radians(lats), np.radians(lons)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    dist = 2 * R * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+    return np.where(np.isnan(dist), np.inf, dist)
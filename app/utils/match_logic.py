@@ -1,48 +1,52 @@
 # utils/match_logic.py
 
 
-import math
 import uuid
 import random
+import numpy as np
 from typing import List
 from models.message_model import Message
 from datetime import datetime, timezone
 from sqlalchemy import select, func, or_
-from utils.location import haversine_distance
 from models.message_model import Message
 from models.match_model import Match
 from models.profile_model import Profile
 from models.user_model import Notification, UserMedia, User
 from sqlalchemy.ext.asyncio import AsyncSession
 
-def compute_compatibility_score(user_a, user_b, embedding_similarity: float, max_distance_km: float = 50):
-    """Global logic for computing compatibility between two users."""
-    
-    # --- Handle missing location gracefully ---
-    if all([user_a.latitude, user_a.longitude, user_b.latitude, user_b.longitude]):
-        distance_km = haversine_distance(
-            user_a.latitude, user_a.longitude,
-            user_b.latitude, user_b.longitude
-        )
-        if distance_km > max_distance_km:
-            proximity_score = 0
-        else:
-            proximity_score = max(0, 1 - (distance_km / max_distance_km))
-    else:
-        distance_km = None
-        proximity_score = 0.5  # neutral fallback
-
-    # --- Core AI similarity ---
-    personality_score = max(0, min(1, embedding_similarity or 0))
-
-    # --- Weighted final compatibility ---
-    final_score = (personality_score * 0.7) + (proximity_score * 0.3)
-    match_score = math.floor(final_score * 100)
-
-    return {
-        "match_score": match_score,   # final compatibility %
-        "distance_km": round(distance_km, 2) if distance_km else None
-    }
+def preference_alignment_scores(gender_code: int, preference_mask: int, age, genders, preferences, ages):
+    """
+    Gender <-> preference (both ways) plus a soft age gap, for a whole batch.
+    `genders` / `preferences` are users.gender_code / users.preference_mask
+    arrays (utils/gender.py), `ages` floats with NaN when unknown.
+    Returns 0.0–1.0 per candidate; 0.5 when nothing is known.
+    """
+    genders = np.asarray(genders, dtype=np.int64)
+    preferences = np.asarray(preferences, dtype=np.int64)
+    ages = np.asarray(ages, dtype=np.float64)
+    score = np.zeros(genders.shape)
+    total = np.zeros(genders.shape)
+
+    # candidate gender vs. my preference
+    if preference_mask:
+        known = genders > 0
+        total += known
+        score += known & ((preference_mask >> genders) & 1).astype(bool)
+
+    # my gender vs. candidate preference
+    if gender_code:
+        known = preferences > 0
+        total += known
+        score += (preferences >> gender_code) & 1
+
+    # age compatibility (soft check)
+    if age:
+        known = np.isfinite(ages) & (ages > 0)
+        gap = np.abs(ages - age)
+        total += known
+        score += np.where(known, np.where(gap <= 5, 1.0, np.where(gap <= 10, 0.5, 0.0)), 0.0)
+
+    return np.where(total > 0, score / np.maximum(total, 1), 0.5)
 
 # -----------------------------
 # Helper: Create Notification
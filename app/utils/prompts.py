@@ -29,6 +29,10 @@ Return ONLY a JSON object in this exact format:
 """
 
 
+# bump when the prompt changes: cached reasons/starters are then regenerated (services/llm_cache.py)
+COMPATIBILITY_PROMPT_VERSION = 1
+
+
 def make_compatibility_user_prompt(a, b, meta):
     # a and b are dicts with ai_summary, mini_traits, preferences (interests/values/dealbreakers)
     return f"""
@@ -70,6 +74,9 @@ Return only the starter sentence.
 """
 
 
+STARTER_PROMPT_VERSION = 1
+
+
 def make_starter_user_prompt(a, b, compatibility_reason):
     return f"""
 User A summary: {a.get('ai_summary') or a.get('summary') or ''}
@@ -86,6 +93,61 @@ Task: Craft ONE short, specific conversation starter aligned with the compatibil
 """
 
 
+# -----------------------
+# Batched insights (one prompt, many candidates)
+# -----------------------
+# answers are cached under COMPATIBILITY_PROMPT_VERSION / STARTER_PROMPT_VERSION: bump those when editing this
+BATCH_INSIGHTS_SYSTEM_PROMPT = """
+You are an expert dating psychologist and conversation coach.
+You get one user (A) and several candidates, each with an id.
+For EVERY candidate write:
+- "compatibility_reason": ONE concise, specific sentence on why A and the candidate fit.
+  Avoid generic explanations. Use the psychological signals given.
+- "conversation_starter": ONE deeply personalized opener from A to the candidate,
+  aligned with that reason. Warm, curious, slightly vulnerable — not flirty-cringey.
+
+Return ONLY a JSON object in this exact format:
+{
+  "candidates": {
+    "<candidate id>": {"compatibility_reason": "...", "conversation_starter": "..."}
+  }
+}
+"""
+
+
+def make_batch_insights_user_prompt(a, candidates):
+    # candidates: [(candidate_id, profile_view, meta, hints)]
+    blocks = []
+    for candidate_id, b, meta, hints in candidates:
+        block = f"""
+Candidate id: {candidate_id}
+Summary: {b.get('ai_summary') or b.get('summary') or ''}
+Traits: {', '.join(b.get('mini_traits') or [])}
+Interests: {', '.join(b.get('preferences', {}).get('interests', []) or [])}
+Dealbreakers: {', '.join(b.get('preferences', {}).get('dealbreakers', []) or [])}
+Looking_for: {b.get('raw_about', '')}
+embedding_similarity: {meta.get('embedding_similarity')}
+distance_km: {meta.get('distance_km')}"""
+        if hints:
+            block += f"\nInternal hints: {hints}"
+        blocks.append(block)
+
+    return f"""
+User A summary: {a.get('ai_summary') or a.get('summary') or ''}
+User A traits: {', '.join(a.get('mini_traits') or [])}
+User A interests: {', '.join(a.get('preferences', {}).get('interests', []) or [])}
+User A dealbreakers: {', '.join(a.get('preferences', {}).get('dealbreakers', []) or [])}
+User A looking_for: {a.get('raw_about', '')}
+
+---
+{chr(10).join(blocks)}
+
+---
+
+Answer for every candidate id above.
+"""
+
+
 def make_single_user_prompt(raw):
     return f"""
 Analyze this user's self-submitted dating profile information and generate:
@@ -100,4 +162,18 @@ Interests: {', '.join(raw.get("interests", []))}
 Dealbreakers: {', '.join(raw.get("dealbreakers", []))}
 
 Return JSON matching the required schema.
-"""
\ No newline at end of file
+"""
+
+def make_embedding_text(summary, mini_traits, raw, preferences):
+    """Psychology-weighted text that gets embedded for matching."""
+    raw = raw or {}
+    preferences = preferences or {}
+    return (
+        f"Summary: {summary or ''} "
+        f"Traits: {', '.join(mini_traits or [])} "
+        f"About: {raw.get('about', '')} "
+        f"Looking for: {raw.get('looking_for', '')} "
+        f"Interests: {', '.join(preferences.get('interests', []))} "
+        f"Values: {', '.join(preferences.get('values', []))} "
+        f"Dealbreakers: {', '.join(preferences.get('dealbreakers', []))}"
+    )
@@ -13,6 +13,26 @@ interface Props {
   profileData: any; // merged object from previous steps
 }
 
+const JOB_POLL_MS = 1500;
+const JOB_TIMEOUT_MS = 120_000;
+
+// The AI summary runs as a background job: poll it until it settles
+const waitForJob = async (jobId: string, token: string) => {
+  const deadline = Date.now() + JOB_TIMEOUT_MS;
+  while (Date.now() < deadline) {
+    const res = await fetch(`${import.meta.env.VITE_API_URL}/profile/jobs/${jobId}`, {
+      headers: { Authorization: `Bearer ${token}` },
+    });
+    if (!res.ok) throw new Error("Could not check AI summary status");
+    const job = await res.json();
+
+    if (job.status === "done") return job.result;
+    if (job.status === "failed") throw new Error(job.error || "AI summary failed");
+    await new Promise((resolve) => setTimeout(resolve, JOB_POLL_MS));
+  }
+  throw new Error("AI summary timed out");
+};
+
 const SummaryStep: React.FC<Props> = ({ profileData }) => {
   const navigate = useNavigate();
   const [loading, setLoading] = useState(false);
@@ -41,8 +61,9 @@ const SummaryStep: React.FC<Props> = ({ profileData }) => {
 
       if (!res.ok) throw new Error("Profile setup failed");
       const data = await res.json();
+      const result = await waitForJob(data.job_id, token);
 
-      setSummary(data.summary);
+      setSummary(result.summary);
       confetti({ particleCount: 100, spread: 80, origin: { y: 0.6 } });
 
       toast.success("Profile created successfully! 🌟");